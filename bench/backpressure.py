@@ -0,0 +1,76 @@
+"""Agents flooding a book that can't keep up: what the watermark does to the orders they send.
+
+Hosted agents on an AgentPool send into an OrderRing this process takes --rate orders a second
+from, well below what they offer. Without flow control the ring fills and the agents' orders are
+dropped, with it they hold back their latest order until the book has caught up.
+
+python -m bench.backpressure [--agents 2000] [--interval 0.01] [--rate 20000] [--capacity 4096] [--seconds 5]
+"""
+import argparse
+import queue
+import time
+
+from synthetic_exchange.strategy import AgentPool, RandomNormal
+from synthetic_exchange.transport import OrderRing, Watermark
+
+
+def run(count: int, interval: float, rate: float, capacity: int, seconds: float, flowControl: bool) -> tuple:
+    """Returns (orders/sec taken by the book, orders each agent sent, throttled, coalesced and dropped in total)"""
+    orders = OrderRing(capacity, symbol="BENCH")
+    watermark = Watermark(capacity) if flowControl else None
+    pool = AgentPool(1)
+    for agent_id in range(count):
+        pool.add(
+            RandomNormal(
+                marketId=0,
+                agentId=agent_id,
+                symbol="BENCH",
+                initialPrice=100,
+                minQuantity=1,
+                maxQuantity=10,
+                queue=orders,
+                watermark=watermark,
+                wait=interval,
+                hosted=True,
+                seed=agent_id,
+            )
+        )
+    pool.start()
+    # The book takes a slice of orders every millisecond
+    taken, start = 0, time.monotonic()
+    while time.monotonic() - start < seconds:
+        due = int(rate * (time.monotonic() - start)) - taken
+        if due > 0:
+            try:
+                taken += len(orders.get_many(due, block=False))
+            except queue.Empty:
+                pass
+        time.sleep(1e-3)
+    elapsed = time.monotonic() - start
+    pool.stop()
+    flows = [agent.flow for agent in pool.agents]
+    orders.close()
+    totals = {key: sum(flow[key] for flow in flows) for key in flows[0]}
+    return taken / elapsed, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--rate", type=float, default=20000)
+    parser.add_argument("--capacity", type=int, default=4096)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'flow control':>12} {'taken/s':>9} {'sent':>9} {'throttled':>10} {'coalesced':>10} {'dropped':>9}")
+    for flow_control in [False, True]:
+        taken, totals = run(args.agents, args.interval, args.rate, args.capacity, args.seconds, flow_control)
+        print(
+            f"{str(flow_control):>12} {taken:>9,.0f} {totals['sent']:>9,} {totals['throttled']:>10,}"
+            f" {totals['coalesced']:>10,} {totals['dropped']:>9,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Execution reports from an order book back to the agents: latency of a fill, end to end.
+
+Agent 1 rests a sell and agent 2 crosses it with a buy, --rate pairs a second. The book runs on
+a BookWorker and sends the reports of each batch on a ReportRing, a receiver process plays the
+agents' process. Latency is from agent 2 sending its buy to holding its fill report, and the
+last leg alone, from the book sending the report.
+
+python -m bench.execution [--pairs 20000] [--rate 5000 0]
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import statistics
+import time
+
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.scheduler import BookWorker
+from synthetic_exchange.transport import OrderRing, ReportRing
+
+
+def _receive(reports: ReportRing, count: int, results: mp.Queue):
+    end_to_end, leg, batches = [], [], 0
+    while len(end_to_end) < count:
+        try:
+            received = reports.get_many(1 << 12, timeout=5.0)
+        except queue.Empty:
+            break
+        now = time.time()
+        batches += 1
+        for report in received:
+            if report["agent_id"] == 2:
+                end_to_end.append(now - report["timestamp"] / 1000)
+                leg.append(now - report["time"])
+    results.put((end_to_end, leg, batches))
+
+
+def run(pairs: int, rate: float) -> tuple:
+    """Returns (end to end latencies, book to agent latencies, report batches received)"""
+    orders, reports = OrderRing(1 << 16, symbol="BENCH"), ReportRing(1 << 16)
+    orderbook = OrderBook(marketId=0, symbol="BENCH", transactions=None, queue=orders, reports={1: reports, 2: reports})
+    worker = BookWorker([orderbook])
+    worker.start()
+    results = mp.Queue()
+    receiver = mp.Process(target=_receive, args=(reports, pairs, results))
+    receiver.start()
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_time = time.monotonic()
+    for _ in range(pairs):
+        if interval > 0:
+            next_time += interval
+            while time.monotonic() < next_time:
+                pass
+        orders.put({"marketid": 0, "agentid": 1, "symbol": "BENCH", "side": "SELL", "price": 100.0, "quantity": 1.0})
+        orders.put(
+            {
+                "marketid": 0,
+                "agentid": 2,
+                "symbol": "BENCH",
+                "side": "BUY",
+                "price": 100.0,
+                "quantity": 1.0,
+                "timestamp": time.time() * 1000,
+            }
+        )
+    end_to_end, leg, batches = results.get()
+    receiver.join()
+    worker.stop()
+    worker.join()
+    orders.close()
+    reports.close()
+    return end_to_end, leg, batches
+
+
+def _us(latencies: list, q: float) -> float:
+    return 1e6 * sorted(latencies)[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=20000)
+    parser.add_argument("--rate", type=float, nargs="+", default=[5000, 0])
+    args = parser.parse_args()
+
+    print(
+        f"{'pairs/s':>8} {'fills':>7} {'batches':>8} {'e2e p50 us':>11} {'e2e p99 us':>11}"
+        f" {'leg p50 us':>11} {'leg p99 us':>11}"
+    )
+    for rate in args.rate:
+        end_to_end, leg, batches = run(args.pairs, rate)
+        print(
+            f"{'max' if rate <= 0 else f'{rate:,.0f}':>8} {len(end_to_end):>7} {batches:>8}"
+            f" {statistics.median(end_to_end) * 1e6:>11,.0f} {_us(end_to_end, 0.99):>11,.0f}"
+            f" {statistics.median(leg) * 1e6:>11,.0f} {_us(leg, 0.99):>11,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
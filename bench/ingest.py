@@ -0,0 +1,67 @@
+"""OrderBook ingestion throughput from an agent process, by batch size.
+
+python -m bench.ingest [--messages 100000] [--batch-sizes 1 16 64 256]
+"""
+import argparse
+import multiprocessing as mp
+import random
+import time
+
+from synthetic_exchange.orderbook import OrderBook
+
+
+def _produce(queue: mp.Queue, count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        side = "BUY" if i % 2 == 0 else "SELL"
+        price = 100 + (rng.randint(-50, 5) if side == "BUY" else rng.randint(-5, 50))
+        queue.put(
+            {
+                "marketid": 0,
+                "agentid": rng.randrange(100),
+                "symbol": "BENCH",
+                "side": side,
+                "price": float(price),
+                "quantity": float(rng.randint(1, 10)),
+                "timestamp": 0.0,
+            }
+        )
+
+
+def run(batchSize: int, count: int, seed: int) -> tuple:
+    """Returns (messages/sec, order book process cpu microseconds per message)"""
+    queue = mp.Queue()
+    orderbook = OrderBook(marketId=0, symbol="BENCH", transactions=None, queue=queue, batchSize=batchSize)
+    producer = mp.Process(target=_produce, args=(queue, count, seed))
+    producer.start()
+    done = 0
+    batch = orderbook._next_batch()
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    while True:
+        orderbook._process_batch(batch)
+        done += len(batch)
+        if done >= count:
+            break
+        batch = orderbook._next_batch()
+    elapsed = time.perf_counter() - start
+    elapsed_cpu = time.process_time() - start_cpu
+    producer.join()
+    return (done - 1) / elapsed, elapsed_cpu / (done - 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'messages/sec':>14} {'cpu us/msg':>12}")
+    for batch_size in args.batch_sizes:
+        rate, cpu = run(batch_size, args.messages, args.seed)
+        print(f"{batch_size:>6} {rate:>14,.0f} {cpu:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Bytes retained per resting order and per recorded trade.
+
+python -m bench.memory [--orders 100000] [--trades 100000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from synthetic_exchange.book import PriceLevelBook
+from synthetic_exchange.order import Order
+from synthetic_exchange.tape import TradeTape
+from synthetic_exchange.transaction import Transaction
+
+
+def _order(rng: random.Random, side: str, price: float) -> Order:
+    return Order(
+        marketid=0,
+        agentid=rng.randrange(100),
+        symbol="BENCH",
+        side=side,
+        price=price,
+        quantity=float(rng.randint(1, 10)),
+        timestamp=0.0,
+    )
+
+
+def _measure(build) -> int:
+    """Bytes still allocated once build() returns, build's return value is kept alive while measuring"""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def run_orders(count: int, seed: int) -> float:
+    rng = random.Random(seed)
+    return _measure(lambda: [_order(rng, "BUY", 100.0 - rng.randint(1, 1000) * 0.5) for _ in range(count)]) / count
+
+
+def run_resting(count: int, seed: int) -> float:
+    def build():
+        rng = random.Random(seed)
+        book = PriceLevelBook()
+        for i in range(count):
+            offset = rng.randint(1, 1000) * 0.5
+            book.add(_order(rng, "BUY", 1000.0 - offset) if i % 2 == 0 else _order(rng, "SELL", 1000.0 + offset))
+        return book
+
+    return _measure(build) / count
+
+
+def run_trades(count: int, seed: int) -> float:
+    """Transactions as the history keeps them, the orders themselves are long gone from the book"""
+
+    def build():
+        rng = random.Random(seed)
+        trades = []
+        for _ in range(count):
+            price = 1000.0 + rng.randint(-10, 10) * 0.5
+            buy, sell = _order(rng, "BUY", price), _order(rng, "SELL", price)
+            trades.append(Transaction(buy, sell, 0, price, min(buy.quantity, sell.quantity)))
+        return trades
+
+    return _measure(build) / count
+
+
+def run_tape(count: int, seed: int) -> float:
+    """The same trades in the columns of a TradeTape"""
+
+    def build():
+        rng = random.Random(seed)
+        tape = TradeTape()
+        for i in range(count):
+            price = 1000.0 + rng.randint(-10, 10) * 0.5
+            buy, sell = _order(rng, "BUY", price), _order(rng, "SELL", price)
+            tape.append(i, 0.0, price, min(buy.quantity, sell.quantity), buy.agent_id, sell.agent_id, buy.id, sell.id)
+        return tape
+
+    return _measure(build) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--trades", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'what':>14} {'bytes/each':>12}")
+    print(f"{'order':>14} {run_orders(args.orders, args.seed):>12,.0f}")
+    print(f"{'resting order':>14} {run_resting(args.orders, args.seed):>12,.0f}")
+    print(f"{'trade':>14} {run_trades(args.trades, args.seed):>12,.0f}")
+    print(f"{'taped trade':>14} {run_tape(args.trades, args.seed):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Matching engine throughput at increasing numbers of resting orders.
+
+python -m bench.orderbook [--sizes 10000 100000 1000000] [--orders 50000] [--backends levels dense compiled]
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import operator
+import random
+import time
+
+from synthetic_exchange.book import CompiledBook, DenseBook, PriceLevelBook
+from synthetic_exchange.order import Order
+from synthetic_exchange.orderbook import OrderBook
+
+_mid = 1000.0
+_tick = 0.5
+_levels = 1000
+_agents = 100
+
+
+def _order(rng: random.Random, side: str, price: float) -> Order:
+    return Order(
+        marketid=0,
+        agentid=rng.randrange(_agents),
+        symbol="BENCH",
+        side=side,
+        price=price,
+        quantity=float(rng.randint(1, 10)),
+        timestamp=0.0,
+    )
+
+
+def _resting_orders(rng: random.Random, size: int) -> list:
+    orders = []
+    for i in range(size):
+        offset = _tick * rng.randint(1, _levels)
+        if i % 2 == 0:
+            orders.append(_order(rng, "BUY", _mid - offset))
+        else:
+            orders.append(_order(rng, "SELL", _mid + offset))
+    return orders
+
+
+def _incoming_orders(rng: random.Random, count: int) -> list:
+    """Half passive orders resting behind the touch, half marketable orders crossing a few levels"""
+    orders = []
+    for i in range(count):
+        side = "BUY" if i % 2 == 0 else "SELL"
+        sign = 1 if side == "BUY" else -1
+        if rng.random() < 0.5:
+            price = _mid - sign * _tick * rng.randint(1, _levels)
+        else:
+            price = _mid + sign * _tick * (_levels + 1)
+        orders.append(_order(rng, side, price))
+    return orders
+
+
+def _book(backend: str) -> PriceLevelBook:
+    if backend == "dense":
+        band = _tick * (_levels + 1)
+        return DenseBook(minPrice=_mid - band, maxPrice=_mid + band, tickSize=_tick)
+    if backend == "compiled":
+        return CompiledBook(tickSize=_tick)
+    return PriceLevelBook(tickSize=_tick)
+
+
+def run_price_level_book(resting: list, incoming: list, backend: str = "levels") -> float:
+    book = _book(backend)
+    for order in resting:
+        book.add(order)
+    gc.collect()
+    start = time.perf_counter()
+    for order in incoming:
+        book.match(order)
+        if order.remaining > 0:
+            book.add(order)
+    elapsed = time.perf_counter() - start
+    return len(incoming) / elapsed
+
+
+def run_matching_core(resting: list, incoming: list) -> float:
+    """The compiled core on its own, orders already in ticks and lots"""
+    from synthetic_exchange.detail.matching import MatchingCore
+
+    book = PriceLevelBook(tickSize=_tick)
+    for order in resting + incoming:
+        book.normalize(order)
+    core = MatchingCore()
+    for order in resting:
+        core.add(order.id, int(order.side_code), order.ticks, order.lots, order.agent_id)
+    messages = [(o.id, int(o.side_code), o.ticks, o.lots, o.agent_id) for o in incoming]
+    gc.collect()
+    start = time.perf_counter()
+    for order_id, side, ticks, lots, agent_id in messages:
+        remaining = core.match(side, ticks, lots, agent_id)[0]
+        if remaining > 0:
+            core.add(order_id, side, ticks, remaining, agent_id)
+    elapsed = time.perf_counter() - start
+    return len(incoming) / elapsed
+
+
+def run_l2(resting: list, backend: str, depth: int, count: int = 2_000) -> float:
+    """L2 snapshots of the top depth levels a side per second"""
+    book = _book(backend)
+    for order in resting:
+        book.add(order)
+    start = time.perf_counter()
+    for _ in range(count):
+        book.l2(depth)
+    elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def run_cancel_flow(rng: random.Random, resting: list, incoming: list, cancelRatio: float) -> float:
+    """Market-maker flow, cancelRatio of the messages cancel a random resting order"""
+    book = PriceLevelBook(tickSize=_tick)
+    for order in resting:
+        book.add(order)
+    live = [order.id for order in resting]
+    messages = []
+    cancels = round(cancelRatio / (1 - cancelRatio))
+    for order in incoming:
+        messages.extend([None] * cancels)
+        messages.append(order)
+    gc.collect()
+    start = time.perf_counter()
+    for order in messages:
+        if order is None:
+            i = rng.randrange(len(live))
+            live[i], live[-1] = live[-1], live[i]
+            book.cancel(live.pop())
+        else:
+            book.match(order)
+            if order.remaining > 0:
+                book.add(order)
+                live.append(order.id)
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed
+
+
+def run_orderbook(bookMode: str, resting: list, incoming: list) -> float:
+    """OrderBook.process, including what the book mode publishes for other processes"""
+    orderbook = OrderBook(marketId=0, symbol="BENCH", transactions=None, queue=mp.Queue(), bookMode=bookMode)
+    for order in resting:
+        orderbook.process(order)
+    start = time.perf_counter()
+    for order in incoming:
+        orderbook.process(order)
+        orderbook._publish()
+    elapsed = time.perf_counter() - start
+    return len(incoming) / elapsed
+
+
+def run_sorted_list(resting: list, incoming: list) -> float:
+    """The previous engine: filter and sort the opposite side for every fill"""
+    buys = [o for o in resting if o.side == "BUY"]
+    sells = [o for o in resting if o.side == "SELL"]
+    start = time.perf_counter()
+    for order in incoming:
+        is_buy = order.side == "BUY"
+        opposite, same = (sells, buys) if is_buy else (buys, sells)
+        while order.remaining > 0:
+            candidates = [o for o in opposite if o.agent_id != order.agent_id]
+            if len(candidates) == 0:
+                break
+            candidates = sorted(candidates, key=operator.attrgetter("price"), reverse=not is_buy)
+            best = candidates[0]
+            if (is_buy and order.price < best.price) or (not is_buy and order.price > best.price):
+                break
+            quantity = min(order.remaining, best.remaining)
+            order.remaining -= quantity
+            best.remaining -= quantity
+            if best.remaining <= 0:
+                opposite.remove(best)
+        if order.remaining > 0:
+            same.append(order)
+    elapsed = time.perf_counter() - start
+    return len(incoming) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--baseline-orders", type=int, default=200)
+    parser.add_argument("--cancel-ratio", type=float, default=0.9)
+    parser.add_argument("--backends", type=str, nargs="+", default=["levels", "dense", "compiled"])
+    parser.add_argument("--l2-depth", type=int, default=10)
+    parser.add_argument("--modes", type=str, nargs="*", default=["local", "shared"])
+    parser.add_argument("--mode-size", type=int, default=1_000)
+    parser.add_argument("--mode-orders", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'resting':>10} {'engine':>14} {'orders/sec':>12}")
+    for size in args.sizes:
+        for backend in args.backends:
+            if backend == "compiled" and not CompiledBook.available():
+                print(f"{size:>10} {backend:>14} {'not built':>12}")
+                continue
+            rng = random.Random(args.seed)
+            resting = _resting_orders(rng, size)
+            incoming = _incoming_orders(rng, args.orders)
+            print(f"{size:>10} {backend:>14} {run_price_level_book(resting, incoming, backend):>12,.0f}")
+            rate = run_l2(_resting_orders(random.Random(args.seed), size), backend, args.l2_depth)
+            print(f"{size:>10} {f'{backend} l2 {args.l2_depth}':>14} {rate:>12,.0f}")
+            if backend == "compiled":
+                rng = random.Random(args.seed)
+                resting = _resting_orders(rng, size)
+                incoming = _incoming_orders(rng, args.orders)
+                print(f"{size:>10} {'core only':>14} {run_matching_core(resting, incoming):>12,.0f}")
+        if args.cancel_ratio > 0:
+            rng = random.Random(args.seed)
+            resting = _resting_orders(rng, size)
+            # Never cancel more than half of the resting orders
+            incoming = _incoming_orders(rng, int(min(args.orders, size / 2) * (1 - args.cancel_ratio)))
+            rate = run_cancel_flow(rng, resting, incoming, args.cancel_ratio)
+            print(f"{size:>10} {f'cancel {args.cancel_ratio:.0%}':>14} {rate:>12,.0f}")
+        if size <= 100_000 and args.baseline_orders > 0:
+            rng = random.Random(args.seed)
+            resting = _resting_orders(rng, size)
+            incoming = _incoming_orders(rng, args.baseline_orders)
+            print(f"{size:>10} {'sorted-list':>14} {run_sorted_list(resting, incoming):>12,.0f}")
+        resting = incoming = None
+        gc.collect()
+
+    for mode in args.modes:
+        rng = random.Random(args.seed)
+        resting = _resting_orders(rng, args.mode_size)
+        incoming = _incoming_orders(rng, args.mode_orders)
+        rate = run_orderbook(mode, resting, incoming)
+        print(f"{args.mode_size:>10} {'book ' + mode:>14} {rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
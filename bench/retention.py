@@ -0,0 +1,93 @@
+"""Resident memory of a book matching a long stream of orders, with and without a history retention.
+
+Crossing orders from two agents go through a book run in this process, every order and trade is
+recorded. Without a retention its history keeps growing, with one the older trades, ledger samples
+and orders are sealed into segments in a temporary directory and the RSS levels off.
+
+python -m bench.retention [--orders 2000000] [--retention 65536] [--every 400000]
+"""
+import argparse
+import concurrent.futures
+import os
+import random
+import tempfile
+import time
+import types
+
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.transaction import Transactions
+from synthetic_exchange.transport import LocalQueue
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _agent(agentId: int) -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        id=agentId, position=0.0, quantity_bought=0.0, quantity_sold=0.0, value_bought=0.0, value_sold=0.0
+    )
+
+
+def run(count: int, retention: int, every: int, spillDir: str) -> list:
+    """RSS in bytes every every orders"""
+    agents = {1: _agent(1), 2: _agent(2)}
+    transactions = Transactions(agents, shared=False, retention=retention, spillDir=spillDir)
+    orders = LocalQueue()
+    orderbook = OrderBook(
+        marketId=0,
+        symbol="BENCH",
+        transactions=transactions,
+        queue=orders,
+        historyRetention=retention,
+        spillDir=spillDir,
+    )
+    rng = random.Random(1)
+    samples = []
+    for i in range(count):
+        # Every sell crosses the buy before it, the book itself stays empty
+        side = "BUY" if i % 2 == 0 else "SELL"
+        price = 100.0 + rng.randint(0, 2) if side == "BUY" else 100.0 - rng.randint(0, 2)
+        orders.put(
+            {
+                "marketid": 0,
+                "agentid": 1 if side == "BUY" else 2,
+                "symbol": "BENCH",
+                "side": side,
+                "price": price,
+                "quantity": 1.0,
+                "timestamp": float(i),
+            }
+        )
+        if orders.qsize() >= 256:
+            orderbook.drain()
+        if (i + 1) % every == 0:
+            samples.append(_rss())
+    orderbook.drain()
+    orderbook.flush()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=2_000_000)
+    parser.add_argument("--retention", type=int, default=1 << 16)
+    parser.add_argument("--every", type=int, default=400_000)
+    args = parser.parse_args()
+
+    checkpoints = range(args.every, args.orders + 1, args.every)
+    print(f"{'retention':>10} {'seconds':>8} " + " ".join(f"{f'MiB@{n // 1000}k':>10}" for n in checkpoints))
+    for retention in [None, args.retention]:
+        with tempfile.TemporaryDirectory() as spill:
+            start = time.monotonic()
+            # A fresh process each, the memory of the first run is not handed back to the system
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                spill_dir = spill if retention is not None else None
+                samples = executor.submit(run, args.orders, retention, args.every, spill_dir).result()
+            elapsed = time.monotonic() - start
+        print(f"{str(retention):>10} {elapsed:>8.1f} " + " ".join(f"{rss / (1 << 20):>10.1f}" for rss in samples))
+
+
+if __name__ == "__main__":
+    main()
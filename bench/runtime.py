@@ -0,0 +1,82 @@
+"""Agents hosted on AgentPool event loops: orders sent against the agents' schedule, and CPU used.
+
+Every agent sends an order each interval seconds to an OrderRing drained by this process. An
+agent count the workers keep up with delivers close to count / interval orders a second.
+
+python -m bench.runtime [--agents 1000 10000] [--workers 1] [--interval 1.0] [--seconds 10]
+"""
+import argparse
+import os
+import queue
+import time
+
+from synthetic_exchange.strategy import AgentPool, RandomNormal
+from synthetic_exchange.transport import OrderRing
+
+
+def run(count: int, workers: int, interval: float, seconds: float) -> tuple:
+    """Returns (orders/sec expected, orders/sec sent, CPU % of the workers, seconds to build the agents)"""
+    orders = OrderRing(1 << 20, symbol="BENCH")
+    start = time.perf_counter()
+    pool = AgentPool(workers)
+    for agent_id in range(count):
+        pool.add(
+            RandomNormal(
+                marketId=0,
+                agentId=agent_id,
+                symbol="BENCH",
+                initialPrice=100,
+                minQuantity=1,
+                maxQuantity=10,
+                queue=orders,
+                wait=interval,
+                hosted=True,
+                seed=agent_id,
+            )
+        )
+    build = time.perf_counter() - start
+    pool.start()
+    pids = [runtime.pid for runtime in pool.runtimes if runtime.pid is not None]
+    # Let every agent pass its random start before counting
+    time.sleep(interval)
+    while not orders.empty():
+        orders.get_many(1 << 16, block=False)
+    cpu_start, sent, start = _cpu(pids), 0, time.monotonic()
+    while time.monotonic() - start < seconds:
+        try:
+            sent += len(orders.get_many(1 << 16, timeout=0.1))
+        except queue.Empty:
+            pass
+    elapsed = time.monotonic() - start
+    cpu = _cpu(pids) - cpu_start
+    pool.stop()
+    orders.close()
+    return count / interval, sent / elapsed, 100 * cpu / elapsed, build
+
+
+def _cpu(pids: list) -> float:
+    """User and system CPU seconds of processes"""
+    retval = 0.0
+    for pid in pids:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        retval += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return retval
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'agents':>8} {'workers':>8} {'build s':>8} {'expected/s':>11} {'sent/s':>9} {'workers cpu %':>14}")
+    for count in args.agents:
+        expected, sent, cpu, build = run(count, args.workers, args.interval, args.seconds)
+        print(f"{count:>8} {args.workers:>8} {build:>8.1f} {expected:>11,.0f} {sent:>9,.0f} {cpu:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
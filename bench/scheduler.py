@@ -0,0 +1,87 @@
+"""Many markets on a BookScheduler against one process per order book.
+
+A producer process sends orders round-robin over the markets' rings, the time is until every
+ring has been drained.
+
+python -m bench.scheduler [--markets 10 100] [--messages 100000] [--workers 1]
+"""
+import argparse
+import multiprocessing as mp
+import random
+import time
+
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.scheduler import BookScheduler
+from synthetic_exchange.transport import OrderRing
+
+
+def _produce(rings: list, count: int):
+    rng = random.Random(1)
+    for i in range(count):
+        market_id = i % len(rings)
+        side = "BUY" if rng.random() < 0.5 else "SELL"
+        price = 100 + (rng.randint(-50, 5) if side == "BUY" else rng.randint(-5, 50))
+        rings[market_id].put(
+            {
+                "marketid": market_id,
+                "agentid": rng.randrange(100),
+                "symbol": f"BENCH{market_id}",
+                "side": side,
+                "price": float(price),
+                "quantity": float(rng.randint(1, 10)),
+                "timestamp": 0.0,
+            }
+        )
+
+
+def run(markets: int, messages: int, workers: int) -> float:
+    """Messages a second, one process per book when workers is 0"""
+    rings = [OrderRing(1 << 16, symbol=f"BENCH{market_id}") for market_id in range(markets)]
+    orderbooks = [
+        OrderBook(marketId=market_id, symbol=f"BENCH{market_id}", transactions=None, queue=rings[market_id])
+        for market_id in range(markets)
+    ]
+    scheduler = None
+    if workers > 0:
+        scheduler = BookScheduler(workers=workers)
+        for orderbook in orderbooks:
+            scheduler.add(orderbook)
+        scheduler.start()
+    else:
+        for orderbook in orderbooks:
+            orderbook.start()
+    producer = mp.Process(target=_produce, args=(rings, messages))
+    start = time.perf_counter()
+    producer.start()
+    producer.join()
+    while not all(ring.empty() for ring in rings):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    if scheduler is not None:
+        scheduler.stop()
+    else:
+        for orderbook in orderbooks:
+            orderbook.stop()
+            orderbook.join()
+    for ring in rings:
+        ring.close()
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--markets", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'markets':>8} {'processes':>18} {'messages/sec':>14}")
+    for markets in args.markets:
+        for workers in [0, args.workers]:
+            rate = run(markets, args.messages, workers)
+            processes = f"{markets} books" if workers == 0 else f"{workers} workers"
+            print(f"{markets:>8} {processes:>18} {rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Exchange(config) construction: time, processes it leaves behind and their memory, before start().
+The shared containers' manager process is started by the first exchange built and counted there.
+
+python -m bench.startup [--markets 2 4] [--agents 2 10]
+"""
+import argparse
+import multiprocessing as mp
+import time
+
+from synthetic_exchange.exchange import Exchange
+
+
+def _config(markets: int, agents: int) -> dict:
+    agent = {
+        "type": "randomnormal",
+        "initialPrice": 100.0,
+        "minPrice": 90.0,
+        "maxPrice": 110.0,
+        "tickSize": 1,
+        "minQuantity": 1.0,
+        "maxQuantity": 5.0,
+    }
+    market = {
+        "initialPrice": 100.0,
+        "minPrice": 1.0,
+        "maxPrice": 200.0,
+        "tickSize": 1,
+        "minQuantity": 0.5,
+        "maxQuantity": 5.0,
+        "agents": {f"agent_{i}": dict(agent, agentId=i) for i in range(agents)},
+    }
+    return {
+        "exchangeId": 0,
+        "exchange": "startup",
+        "markets": [dict(market, marketId=i, symbol=f"SMBL{i}") for i in range(markets)],
+    }
+
+
+def _pss(pid: int) -> int:
+    """Proportional resident memory of a process in KiB, pages shared with the parent after fork count once"""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(markets: int, agents: int) -> tuple:
+    """Returns (seconds, processes, PSS MiB of the processes)"""
+    before = {process.pid for process in mp.active_children()}
+    start = time.perf_counter()
+    exchange = Exchange(config=_config(markets, agents))
+    elapsed = time.perf_counter() - start
+    children = [process for process in mp.active_children() if process.pid not in before]
+    pss = sum(_pss(process.pid) for process in children)
+    del exchange
+    return elapsed, len(children), pss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--markets", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--agents", type=int, nargs="+", default=[2, 10])
+    args = parser.parse_args()
+
+    print(f"{'markets':>8} {'agents':>7} {'build s':>8} {'processes':>10} {'processes PSS MiB':>18}")
+    for markets, agents in zip(args.markets, args.agents):
+        elapsed, processes, pss = run(markets, agents)
+        print(f"{markets:>8} {agents:>7} {elapsed:>8.2f} {processes:>10} {pss:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Trades read by another process: from a shared TradeTape and from a MappedTradeTape.
+
+A writer process records --trades trades, stamped with time.perf_counter(), publishing the shared
+tape every --publish trades as an order book does. This process tails the tape and measures how
+long each trade takes to be seen, and the writer reports its cost a trade.
+
+python -m bench.tape [--trades 200000] [--publish 256]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic_exchange.tape import MappedTradeTape, TradeTape
+from synthetic_exchange.util import default_manager
+
+
+def _write(tape, count: int, publish: int, done):
+    start = time.perf_counter()
+    for i in range(count):
+        tape.append(i, time.perf_counter(), 100.0, 1.0, 1, 2, i, i)
+        if publish and (i + 1) % publish == 0:
+            tape.publish()
+    if publish:
+        tape.publish()
+    done.put((time.perf_counter() - start) / count)
+
+
+def _tail(tape, count: int) -> np.ndarray:
+    """Latency of every trade, from its append to this process seeing it"""
+    latencies, seen = [], 0
+    while seen < count:
+        if isinstance(tape, MappedTradeTape):
+            timestamps = tape.records(seen)["timestamp"]
+        else:
+            timestamps = tape.column("timestamp")[seen:]
+        if len(timestamps):
+            latencies.append(time.perf_counter() - timestamps)
+            seen += len(timestamps)
+    return np.concatenate(latencies)
+
+
+def run(tape, count: int, publish: int) -> tuple:
+    """(us a trade in the writer, median and p99 us to the reader)"""
+    done = mp.Queue()
+    writer = mp.Process(target=_write, args=(tape, count, publish, done))
+    writer.start()
+    latencies = _tail(tape, count)
+    cost = done.get()
+    writer.join()
+    return cost * 1e6, np.median(latencies) * 1e6, np.percentile(latencies, 99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--publish", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'tape':>8} {'us/append':>10} {'p50 us':>10} {'p99 us':>10}")
+    shared = TradeTape(shared=True, manager=default_manager())
+    print(f"{'shared':>8} " + " ".join(f"{v:>10.1f}" for v in run(shared, args.trades, args.publish)))
+    with tempfile.TemporaryDirectory() as directory:
+        mapped = MappedTradeTape(os.path.join(directory, "BENCH.tape"), create=True)
+        print(f"{'mapped':>8} " + " ".join(f"{v:>10.1f}" for v in run(mapped, args.trades, 0)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Order transport from agent processes to the order book: mp.Queue against OrderRing.
+
+Throughput has the producers send as fast as they can. Latency paces them and measures
+the time from put to the consumer holding the order kwargs.
+
+python -m bench.transport [--messages 100000] [--producers 1 4] [--rate 5000]
+"""
+import argparse
+import multiprocessing as mp
+import random
+import statistics
+import time
+
+from synthetic_exchange.transport import OrderRing
+
+
+def _kwargs(rng: random.Random, agentId: int) -> dict:
+    side = rng.choice(["BUY", "SELL"])
+    return {
+        "marketid": 0,
+        "agentid": agentId,
+        "symbol": "BENCH",
+        "side": side,
+        "price": float(100 + rng.randint(-50, 50)),
+        "quantity": float(rng.randint(1, 10)),
+        "timestamp": 0.0,
+    }
+
+
+def _produce(orders, agentId: int, count: int, interval: float):
+    rng = random.Random(agentId)
+    next_time = time.monotonic()
+    for _ in range(count):
+        kwargs = _kwargs(rng, agentId)
+        if interval > 0:
+            next_time += interval
+            while time.monotonic() < next_time:
+                pass
+        # Sent time in ms, CLOCK_MONOTONIC is shared by all processes
+        kwargs["timestamp"] = time.monotonic() * 1000
+        orders.put(kwargs)
+
+
+def _consume(orders, count: int) -> list:
+    """Latencies in microseconds of count orders"""
+    latencies = []
+    while len(latencies) < count:
+        batch = orders.get_many(256) if isinstance(orders, OrderRing) else [orders.get()]
+        now = time.monotonic() * 1000
+        latencies.extend((now - kwargs["timestamp"]) * 1000 for kwargs in batch)
+    return latencies
+
+
+def run(transport: str, producers: int, count: int, rate: float, capacity: int) -> tuple:
+    """Returns (messages/sec, median latency us, p99 latency us)"""
+    orders = OrderRing(capacity, symbol="BENCH") if transport == "ring" else mp.Queue(maxsize=capacity)
+    per_producer = count // producers
+    interval = producers / rate if rate > 0 else 0.0
+    processes = [
+        mp.Process(target=_produce, args=(orders, agent_id, per_producer, interval)) for agent_id in range(producers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    latencies = _consume(orders, per_producer * producers)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    if isinstance(orders, OrderRing):
+        orders.close()
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--producers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--transports", type=str, nargs="+", default=["queue", "ring"])
+    parser.add_argument("--capacity", type=int, default=1 << 16)
+    parser.add_argument("--rate", type=float, default=5_000, help="paced messages/sec for the latency runs")
+    args = parser.parse_args()
+
+    print(f"{'transport':>10} {'producers':>10} {'messages/sec':>14} {'paced p50 us':>14} {'paced p99 us':>14}")
+    for producers in args.producers:
+        for transport in args.transports:
+            rate, _, _ = run(transport, producers, args.messages, 0, args.capacity)
+            paced_count = min(args.messages, int(args.rate * 2))
+            _, p50, p99 = run(transport, producers, paced_count, args.rate, args.capacity)
+            print(f"{transport:>10} {producers:>10} {rate:>14,.0f} {p50:>14,.0f} {p99:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Order serialization: pickled kwargs dicts against wire frames.
+
+Codec measures CPU per order and bytes per order in this process, one order at a time and in
+batches of --batch. Queue sends --messages orders from a producer process through an mp.Queue of
+pickled dicts and through a BinaryQueue, one at a time and with put_many().
+
+python -m bench.wire [--messages 200000] [--batch 64]
+"""
+import argparse
+import multiprocessing as mp
+import pickle
+import random
+import time
+
+from synthetic_exchange import wire
+from synthetic_exchange.transport import BinaryQueue
+
+
+def _orders(count: int) -> list:
+    rng = random.Random(0)
+    return [
+        {
+            "marketid": 0,
+            "agentid": rng.randint(0, 100),
+            "symbol": "BENCH",
+            "side": rng.choice(["BUY", "SELL"]),
+            "price": float(100 + rng.randint(-50, 50)),
+            "quantity": float(rng.randint(1, 10)),
+            "timestamp": 1.7e12 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def _codec(orders: list, batch: int) -> list:
+    """[(name, us per order encode + decode, bytes per order)]"""
+    retval = []
+    start = time.perf_counter()
+    frames = [pickle.dumps(kwargs) for kwargs in orders]
+    _ = [pickle.loads(frame) for frame in frames]
+    retval.append(("pickle", time.perf_counter() - start, sum(map(len, frames))))
+    start = time.perf_counter()
+    frames = [wire.encode(wire.Message.NewOrder, [kwargs]) for kwargs in orders]
+    _ = [wire.decode_items(frame, "BENCH") for frame in frames]
+    retval.append(("wire x1", time.perf_counter() - start, sum(map(len, frames))))
+    start = time.perf_counter()
+    frames = [wire.encode(wire.Message.NewOrder, orders[i : i + batch]) for i in range(0, len(orders), batch)]
+    _ = [wire.decode_items(frame, "BENCH") for frame in frames]
+    retval.append((f"wire x{batch}", time.perf_counter() - start, sum(map(len, frames))))
+    start = time.perf_counter()
+    _ = [wire.decode(frame)[1]["price"].sum() for frame in frames]
+    retval.append((f"wire x{batch} columns", time.perf_counter() - start, sum(map(len, frames))))
+    return [(name, 1e6 * elapsed / len(orders), size / len(orders)) for name, elapsed, size in retval]
+
+
+def _produce(orders, items: list, batch: int):
+    if batch > 1:
+        for i in range(0, len(items), batch):
+            orders.put_many(items[i : i + batch])
+    else:
+        for kwargs in items:
+            orders.put(kwargs)
+
+
+def _queue(orders, items: list, batch: int) -> float:
+    """Orders a second through the queue"""
+    producer = mp.Process(target=_produce, args=(orders, items, batch))
+    start = time.perf_counter()
+    producer.start()
+    received = 0
+    if isinstance(orders, BinaryQueue):
+        while received < len(items):
+            received += len(orders.get_many(1 << 12))
+    else:
+        for _ in items:
+            orders.get()
+            received += 1
+    elapsed = time.perf_counter() - start
+    producer.join()
+    orders.close()
+    return received / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=64)
+    args = parser.parse_args()
+    orders = _orders(args.messages)
+
+    print(f"{'codec':>18} {'us/order':>9} {'bytes/order':>12}")
+    for name, us, size in _codec(orders, args.batch):
+        print(f"{name:>18} {us:>9.2f} {size:>12.1f}")
+    print()
+    print(f"{'queue':>18} {'orders/s':>11}")
+    for name, queue, batch in [
+        ("mp.Queue dicts", mp.Queue(), 1),
+        ("BinaryQueue x1", BinaryQueue(), 1),
+        (f"BinaryQueue x{args.batch}", BinaryQueue(), args.batch),
+    ]:
+        print(f"{name:>18} {_queue(queue, orders, batch):>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
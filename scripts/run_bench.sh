@@ -0,0 +1,13 @@
+#!/usr/bin/bash
+python -m bench.orderbook
+python -m bench.ingest
+python -m bench.memory
+python -m bench.transport
+python -m bench.runtime
+python -m bench.scheduler
+python -m bench.startup
+python -m bench.backpressure
+python -m bench.execution
+python -m bench.wire
+python -m bench.retention
+python -m bench.tape
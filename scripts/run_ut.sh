@@ -1,5 +1,6 @@
 #!/usr/bin/bash
 python -m test.synthetic_exchange.util.main
 python -m test.synthetic_exchange.detail.main
+python -m test.synthetic_exchange.book.main
 #python -m test.synthetic_exchange.experimental.main
 python -m test.synthetic_exchange.main
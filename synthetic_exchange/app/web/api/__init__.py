@@ -1,2 +1,3 @@
+from .bar_endpoint import BarEndpoint
 from .orderbook_endpoint import OrderbookEndpoint
 from .transaction_endpoint import TransactionEndpoint
@@ -0,0 +1,86 @@
+import logging
+
+from flask import make_response, request
+from flask_restful import Resource
+
+from synthetic_exchange.market import Market
+
+
+class BarEndpoint(Resource):
+    """OHLCV bars of a market every interval seconds, from the start bar on"""
+
+    def __init__(self, **kwargs):
+        self.get_request_allowed = kwargs.get("get_request_allowed", False)
+        self.post_request_allowed = kwargs.get("post_request_allowed", False)
+        self._markets = kwargs.get("markets", None)
+        self._limit = kwargs.get("limit", 1000)
+
+    def get(self):
+        retval = {"error": "empty"}
+        err_msg = None
+        try:
+            args = request.args.to_dict()
+            logging.debug(f"{__class__.__name__}.get parameters {args}")
+            retval = make_response(self._fetch_bars(**args), 200)
+        except Exception as e:
+            err_msg = f"{e}"
+            logging.error(f"{__class__.__name__}.get e: {err_msg}")
+            retval = {"error": err_msg}
+        logging.debug(f"{__class__.__name__}.get out: {retval}")
+        return retval
+
+    def post(self):
+        retval = {"error": "empty"}
+        try:
+            args = request.get_json(force=True)
+            logging.debug(f"{__class__.__name__}.post parameters {args}")
+            retval = self._fetch_bars(**args)
+        except Exception as e:
+            err_msg = f"{e}"
+            logging.error(f"{__class__.__name__}.post e: {err_msg}")
+            retval = {"error": err_msg}
+        logging.debug(f"{__class__.__name__}.post out: {retval}")
+        return retval
+
+    def _market(self, symbol: str) -> Market:
+        markets = self._markets if self._markets is not None else Market._markets
+        for market in markets.values():
+            if market.symbol.upper() == symbol:
+                return market
+        return None
+
+    def _fetch_bars(self, symbol: str = None, interval=60, start=0, limit=None, **kwargs) -> dict:
+        """{"symbol", "interval", "start", "next", "bars": {column: values}} of at most limit bars from start,
+        the open bar last, next is the start of the following request"""
+        logging.debug(f"{__class__.__name__}._fetch_bars symbol: {symbol} interval: {interval} start: {start}")
+        retval = {"error": "empty"}
+        err_msg = None
+        market = None
+        if symbol is None:
+            err_msg = "missing symbol"
+        else:
+            symbol = symbol.upper()  # Stored in upper case
+            market = self._market(symbol)
+            if market is None:
+                err_msg = f"No market for {symbol}"
+        if err_msg is None:
+            interval = float(interval)
+            if interval not in market.transactions.bars.intervals:
+                err_msg = f"No bars every {interval:g} seconds for {symbol}"
+        if err_msg is None:
+            start = int(start)
+            limit = int(limit) if limit is not None else self._limit
+            bars = {name: column[start : start + limit] for name, column in market.bars(interval).items()}
+            # The open bar moves on, the next request starts from it again
+            closed = min(start + len(bars["start"]), len(market.transactions.bars.tape(interval)))
+            retval = {
+                "symbol": symbol,
+                "interval": interval,
+                "start": start,
+                "next": max(closed, start),
+                "bars": {name: column.tolist() for name, column in bars.items()},
+            }
+        if err_msg is not None:
+            logging.error(f"{__class__.__name__}._fetch_bars {err_msg}")
+            retval = {"error": err_msg}
+        return retval
@@ -1,16 +1,27 @@
 import asyncio
 import logging
+import os
+
 import pandas as pd
 from flask import make_response, render_template, request
 from flask_restful import Resource, reqparse
+
 from synthetic_exchange.market import Market
+from synthetic_exchange.tape import MappedTradeTape
 
 
 class TransactionEndpoint(Resource):
+    """Trades of a market read from its MappedTradeTape under tapeDir, from the start index on"""
+
+    # Path: tape, mapped once for all the requests
+    _tapes = {}
+
     def __init__(self, **kwargs):
         self.get_request_allowed = kwargs.get("get_request_allowed", False)
         self.post_request_allowed = kwargs.get("post_request_allowed", False)
         self._markets = kwargs.get("markets", None)
+        self._tape_dir = kwargs.get("tapeDir", None)
+        self._limit = kwargs.get("limit", 1000)
 
     def get(self):
         retval = {"error": "empty"}
@@ -55,12 +66,43 @@ class TransactionEndpoint(Resource):
         logging.debug(f"{__class__.__name__}.post out: {retval}")
         return retval
 
-    def _fetch_ob(self, symbol: str) -> dict:
-        logging.debug(f"{__class__.__name__}._fetch_ob symbol: {symbol}")
+    def _tape(self, symbol: str) -> MappedTradeTape:
+        path = os.path.join(self._tape_dir, f"{symbol}.tape")
+        tape = __class__._tapes.get(path)
+        if tape is None or tape.replaced:
+            if not os.path.exists(path):
+                return None
+            tape = __class__._tapes[path] = MappedTradeTape(path)
+        return tape
+
+    def _fetch_ob(self, symbol: str = None, start=0, limit=None, **kwargs) -> dict:
+        """{"symbol", "start", "next", "trades": {column: values}} of at most limit trades from start, next
+        is the start of the following request"""
+        logging.debug(f"{__class__.__name__}._fetch_ob symbol: {symbol} start: {start} limit: {limit}")
         retval = {"error": "empty"}
-        # err_msg = None
-        # df = None
+        err_msg = None
         if symbol is not None:
             symbol = symbol.upper()  # Stored in upper case
-
+        if symbol is None:
+            err_msg = "missing symbol"
+        elif self._tape_dir is None:
+            err_msg = "no tapeDir"
+        if err_msg is None:
+            tape = self._tape(symbol)
+            if tape is None:
+                err_msg = f"No tape for {symbol}"
+            else:
+                start = int(start)
+                limit = int(limit) if limit is not None else self._limit
+                columns = tape.columns(start, start + limit)
+                count = len(columns["id"])
+                retval = {
+                    "symbol": symbol,
+                    "start": start,
+                    "next": start + count,
+                    "trades": {name: column.tolist() for name, column in columns.items()},
+                }
+        if err_msg is not None:
+            logging.error(f"{__class__.__name__}._fetch_ob {err_msg}")
+            retval = {"error": err_msg}
         return retval
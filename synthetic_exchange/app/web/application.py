@@ -8,7 +8,9 @@ from flask_restful import Api
 from waitress import serve
 
 from synthetic_exchange.util import Application
+from synthetic_exchange.app.web.api.bar_endpoint import BarEndpoint
 from synthetic_exchange.app.web.api.orderbook_endpoint import OrderbookEndpoint
+from synthetic_exchange.app.web.api.transaction_endpoint import TransactionEndpoint
 from synthetic_exchange.market import Market
 
 
@@ -27,6 +29,8 @@ class WebApplication(Application):
         self._debug = True if app_config.get("debug", "false") == "true" else False
         self._host = app_config.get("host", "0.0.0.0")
         self._port = app_config.get("port", "8080")
+        # Directory of the markets' trade tapes, see Exchange
+        self._tape_dir = app_config.get("tapeDir", None)
         try:
             self._init_endpoints()
         except Exception as e:
@@ -46,8 +50,6 @@ class WebApplication(Application):
                 "get_request_allowed": True,
             },
         )
-        """
-
         self._api.add_resource(
             TransactionEndpoint,
             "/transactions",
@@ -55,8 +57,20 @@ class WebApplication(Application):
             resource_class_kwargs={
                 "post_request_allowed": True,
                 "get_request_allowed": True,
+                "tapeDir": self._tape_dir,
             },
         )
+        self._api.add_resource(
+            BarEndpoint,
+            "/bars",
+            endpoint="bars",
+            resource_class_kwargs={
+                "post_request_allowed": True,
+                "get_request_allowed": True,
+                "markets": Market._markets,
+            },
+        )
+        """
 
         self._api.add_resource(
             ChartEndpoint,
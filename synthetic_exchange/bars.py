@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+
+from synthetic_exchange.tape import ColumnTape
+
+
+class BarTape(ColumnTape):
+    """Closed bars of one interval, see Bars"""
+
+    _columns = (
+        ("start", np.float64),
+        ("open", np.float64),
+        ("high", np.float64),
+        ("low", np.float64),
+        ("close", np.float64),
+        ("volume", np.float64),
+        ("vwap", np.float64),
+        ("count", np.int64),
+    )
+
+
+class Bars:
+    """OHLCV, VWAP and trade count bars of a market's trades at several intervals, built as trades come.
+
+    Intervals are in seconds, the timestamps of the trades in milliseconds as orders have them. A bar
+    starts at a multiple of its interval and holds the trades up to the next one. Every trade updates
+    the open bar of each interval in place, one that falls past its end closes it into that interval's
+    BarTape first. Intervals without trades have no bar. A trade stamped before the open bar, orders
+    being matched a little out of time order, goes into it.
+
+    Other processes see the closed bars once published, and the open ones as of the last publish().
+    """
+
+    def __init__(
+        self,
+        intervals: list = (1, 60, 3600),
+        chunkSize: int = 4096,
+        shared: bool = False,
+        manager=None,
+        retention: int = None,
+        spillPath: str = None,
+    ):
+        """chunkSize, shared, manager, retention and spillPath/<interval> of the bars, see ColumnTape"""
+        assert len(intervals) > 0 and all(
+            interval > 0 for interval in intervals
+        ), f"{__class__.__name__} invalid intervals: {intervals}"
+        self._intervals = tuple(intervals)
+        self._tapes = {
+            interval: BarTape(
+                chunkSize=chunkSize,
+                shared=shared,
+                manager=manager,
+                retention=retention,
+                spillPath=os.path.join(spillPath, f"{interval:g}") if spillPath is not None else None,
+            )
+            for interval in self._intervals
+        }
+        # [interval, length in ms, open bar], the open bar the fields of a BarTape row with the value,
+        # price * quantity, in place of the VWAP, None before the first trade
+        self._bars = [[interval, interval * 1000.0, None] for interval in self._intervals]
+        # Open bars as last published, by interval, and whether they changed since
+        self._published = manager.dict() if shared else None
+        self._updated = False
+
+    @property
+    def intervals(self) -> tuple:
+        return self._intervals
+
+    def tape(self, interval) -> BarTape:
+        return self._tapes[interval]
+
+    def update(self, timestamp: float, price, quantity):
+        """Add a trade to the open bar of every interval"""
+        self._updated = True
+        for entry in self._bars:
+            bar = entry[2]
+            if bar is None or timestamp >= bar[0] + entry[1]:
+                if bar is not None:
+                    self._close(entry[0], bar)
+                entry[2] = [timestamp - timestamp % entry[1], price, price, price, price, quantity, price * quantity, 1]
+                continue
+            if price > bar[2]:
+                bar[2] = price
+            elif price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += quantity
+            bar[6] += price * quantity
+            bar[7] += 1
+
+    def _close(self, interval, bar: list):
+        self._tapes[interval].append(*__class__._row(bar))
+
+    @staticmethod
+    def _row(bar) -> tuple:
+        """BarTape row of an open bar"""
+        start, open_, high, low, close, volume, value, count = bar
+        return start, open_, high, low, close, volume, value / volume if volume > 0 else close, count
+
+    def _open_bar(self, interval):
+        """Row of the open bar of interval, None before the first trade"""
+        for entry in self._bars:
+            if entry[0] == interval and entry[2] is not None:
+                return __class__._row(entry[2])
+        if self._published is not None:
+            # Not the writing process
+            return self._published.get(interval, None)
+        return None
+
+    def bars(self, interval, names: list = None, current: bool = True) -> dict:
+        """{column name: array} of the bars of interval, closed ones and, with current, the open one"""
+        tape = self._tapes[interval]
+        columns = tape.columns()
+        row = self._open_bar(interval) if current else None
+        # Skip an open bar closed since it was published
+        if row is not None and (len(columns["start"]) == 0 or row[0] > columns["start"][-1]):
+            columns = {
+                name: np.append(column, np.array(value, column.dtype))
+                for (name, column), value in zip(columns.items(), row)
+            }
+        return {name: columns[name] for name in names} if names else columns
+
+    def last(self, interval) -> dict:
+        """Latest bar of interval, the open one, None before the first trade"""
+        row = self._open_bar(interval)
+        if row is None:
+            return self._tapes[interval].last()
+        return dict(zip(self._tapes[interval].names, row))
+
+    def to_frame(self, interval, names: list = None, current: bool = True):
+        """pandas DataFrame of the bars of interval indexed by start, pandas is only imported here"""
+        import pandas as pd
+
+        names = names and ["start"] + [name for name in names if name != "start"]
+        return pd.DataFrame(self.bars(interval, names, current), copy=False).set_index("start")
+
+    def publish(self) -> int:
+        """Send the closed bars, and the open ones, to the readers of shared bars, returns how many closed
+        bars were sent"""
+        count = sum(tape.publish() for tape in self._tapes.values())
+        if self._published is not None and self._updated:
+            self._updated = False
+            # One round trip for all the intervals
+            self._published.update(
+                {interval: __class__._row(bar) for interval, _, bar in self._bars if bar is not None}
+            )
+        return count
+
+    def flush(self):
+        for tape in self._tapes.values():
+            tape.flush()
@@ -0,0 +1,5 @@
+from .compiled import CompiledBook, CompiledLadder, CompiledLevel
+from .dense import DenseBook, DenseLadder
+from .depth import DepthCache
+from .price_level import OrderNode, PriceLadder, PriceLevel, PriceLevelBook, SelfTradePolicy
+from .snapshot import SnapshotBuffer
@@ -0,0 +1,192 @@
+import logging
+import math
+
+from synthetic_exchange.book.price_level import PriceLadder, PriceLevelBook, SelfTradePolicy
+from synthetic_exchange.order import Order
+
+try:
+    from synthetic_exchange.detail.matching import MatchingCore
+except ImportError:
+    # Extension not built (python setup.py build_ext --inplace)
+    MatchingCore = None
+
+
+class CompiledLevel:
+    """Live view of one price level held by a MatchingCore"""
+
+    __slots__ = ("_core", "_side", "ticks", "price")
+
+    def __init__(self, core, side: int, ticks: int, price):
+        self._core = core
+        self._side = side
+        self.ticks = ticks
+        self.price = price
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self):
+        return f"{__class__.__name__}(price={self.price}, lots={self.lots}, orders={self.size})"
+
+    @property
+    def lots(self) -> int:
+        level = self._core.level(self._side, self.ticks)
+        return level[0] if level is not None else 0
+
+    @property
+    def size(self) -> int:
+        level = self._core.level(self._side, self.ticks)
+        return level[1] if level is not None else 0
+
+
+class CompiledLadder(PriceLadder):
+    """One side of a CompiledBook, read from the MatchingCore"""
+
+    def __init__(self, book: "CompiledBook", isBid: bool):
+        PriceLadder.__init__(self, isBid)
+        self._book = book
+        self._core = book._core
+        self._side = Order.Side.Buy if isBid else Order.Side.Sell
+
+    def __len__(self) -> int:
+        return self._core.size(self._side)
+
+    @property
+    def depth(self) -> int:
+        return self._core.depth(self._side)
+
+    def best(self) -> CompiledLevel:
+        ticks = self._core.best(self._side)
+        return self.level(ticks) if ticks is not None else None
+
+    def best_price(self):
+        ticks = self._core.best(self._side)
+        return self._book.price(ticks) if ticks is not None else None
+
+    def level(self, ticks: int) -> CompiledLevel:
+        if self._core.level(self._side, ticks) is None:
+            return None
+        return CompiledLevel(self._core, self._side, ticks, self._book.price(ticks))
+
+    def levels(self, depth: int = -1):
+        """Price levels, best first"""
+        for ticks, _, _ in self._core.levels(self._side, depth):
+            yield CompiledLevel(self._core, self._side, ticks, self._book.price(ticks))
+
+    def orders(self, depth: int = -1) -> list:
+        """Resting orders in price-time priority, best first"""
+        index = self._book._index
+        return [index[order_id] for order_id in self._core.order_ids(self._side, depth)]
+
+
+class CompiledBook(PriceLevelBook):
+    """PriceLevelBook whose levels and queues live in the compiled MatchingCore.
+
+    The core only knows order ids, ticks and lots. The Order objects are kept in _index
+    by id, so fills can be handed back as orders and their remaining kept up to date.
+    """
+
+    # MatchingCore policy codes
+    _policies = {SelfTradePolicy.Skip: 0, SelfTradePolicy.CancelNewest: 1, SelfTradePolicy.CancelOldest: 2}
+    # Agent id the core gets for orders without one, they match each other as the same agent as they
+    # do in the other books
+    _no_agent = -(1 << 63)
+
+    def __init__(self, tickSize=1, lotSize=1, selfTradePolicy=SelfTradePolicy.Skip):
+        assert __class__.available(), f"{__class__.__name__} matching extension is not built"
+        self._core = MatchingCore()
+        # Price of every tick seen so far, fills are priced without rounding
+        self._prices = {}
+        PriceLevelBook.__init__(self, tickSize=tickSize, lotSize=lotSize, selfTradePolicy=selfTradePolicy)
+        self._policy = __class__._policies[self._self_trade_policy]
+
+    @staticmethod
+    def available() -> bool:
+        return MatchingCore is not None
+
+    def _new_ladder(self, isBid: bool) -> PriceLadder:
+        return CompiledLadder(self, isBid)
+
+    def add(self, order):
+        if order.ticks is None:
+            self.normalize(order)
+        agent_id = order.agent_id if order.agent_id is not None else __class__._no_agent
+        self._core.add(order.id, order.side_code, order.ticks, order.lots, agent_id)
+        self._index[order.id] = order
+        orders = self._agent_orders.get(order.agent_id)
+        if orders is None:
+            orders = self._agent_orders[order.agent_id] = {}
+        orders[order.id] = order
+
+    def find(self, orderId: int, side=None):
+        order = self._index.get(orderId)
+        if order is None or (side is not None and order.side_code != Order.Side.parse(side)):
+            return None
+        return order
+
+    def cancel(self, orderId: int, side=None):
+        order = self.find(orderId, side)
+        if order is None:
+            return None
+        self._core.cancel(orderId)
+        del self._index[orderId]
+        self._unindex_agent(order)
+        return order
+
+    def reduce(self, orderId: int, quantity):
+        order = self._index.get(orderId)
+        if order is None:
+            return None
+        order.lots -= min(math.floor(quantity / self._lot_size + PriceLevelBook._epsilon), order.lots)
+        order.remaining = self.quantity(order.lots)
+        self._core.amend(orderId, order.lots)
+        if order.lots <= 0:
+            del self._index[orderId]
+            self._unindex_agent(order)
+        return order
+
+    def l2(self, depth: int = -1) -> dict:
+        retval = {}
+        for side, ladder in [("bids", self._bids), ("asks", self._asks)]:
+            levels = self._core.levels(ladder._side, depth)
+            retval[side] = [(self.price(ticks), self.quantity(lots)) for ticks, lots, _ in levels]
+        return retval
+
+    def match(self, order, cancelled: list = None) -> list:
+        """Same contract as PriceLevelBook.match, the level walk runs in the core"""
+        if order.ticks is None:
+            self.normalize(order)
+        agent_id = order.agent_id if order.agent_id is not None else __class__._no_agent
+        remaining, core_fills, self_trade_cancels, stopped = self._core.match(
+            order.side_code, order.ticks, order.lots, agent_id, self._policy
+        )
+        index, prices, agent_orders = self._index, self._prices, self._agent_orders
+        # Whole lot sizes need no rounding
+        quantity_of = self._lot_size.__mul__ if self._quantity_digits == 0 else self.quantity
+        fills = []
+        for order_id, ticks, lots in core_fills:
+            resting = index[order_id]
+            resting.lots -= lots
+            resting.remaining = quantity_of(resting.lots)
+            if resting.lots <= 0:
+                del index[order_id]
+                orders = agent_orders[resting.agent_id]
+                del orders[order_id]
+                if not orders:
+                    del agent_orders[resting.agent_id]
+            price = prices.get(ticks)
+            if price is None:
+                price = prices[ticks] = self.price(ticks)
+            fills.append((resting, price, quantity_of(lots)))
+
+        for order_id in self_trade_cancels:
+            resting = index.pop(order_id)
+            self._unindex_agent(resting)
+            self._self_trade_cancel(resting, cancelled)
+        if stopped:
+            self._self_trade_cancel(order, cancelled)
+
+        order.lots = remaining
+        order.remaining = quantity_of(remaining)
+        logging.debug(f"{__class__.__name__}.match order: {order.id} fills: {len(fills)} remaining: {remaining}")
+        return fills
@@ -0,0 +1,211 @@
+import logging
+import math
+
+import numpy as np
+
+from synthetic_exchange.book.price_level import OrderNode, PriceLadder, PriceLevel, PriceLevelBook, SelfTradePolicy
+from synthetic_exchange.order import Order
+
+
+class DenseLadder(PriceLadder):
+    """One side of a bounded book with a slot for every tick of the price band.
+
+    _lots holds the aggregate resting lots per tick, index 0 being the band's lowest tick,
+    and _levels the matching queues, None where nothing rests. The best occupied index is
+    tracked in _best (-1 when the side is empty), finding the next one is an array scan.
+    """
+
+    def __init__(self, isBid: bool, minTicks: int, maxTicks: int):
+        PriceLadder.__init__(self, isBid)
+        self._min_ticks = minTicks
+        self._lots = np.zeros(maxTicks - minTicks + 1, dtype=np.int64)
+        self._levels = [None] * len(self._lots)
+        self._best = -1
+        self._occupied = 0
+
+    @property
+    def depth(self) -> int:
+        return self._occupied
+
+    def best(self) -> PriceLevel:
+        return self._levels[self._best] if self._best >= 0 else None
+
+    def best_price(self):
+        return self._levels[self._best].price if self._best >= 0 else None
+
+    def level(self, ticks: int) -> PriceLevel:
+        i = ticks - self._min_ticks
+        return self._levels[i] if 0 <= i < len(self._levels) else None
+
+    def add(self, order) -> OrderNode:
+        i = order.ticks - self._min_ticks
+        level = self._levels[i]
+        if level is None:
+            level = PriceLevel(order.ticks, order.price)
+            self._levels[i] = level
+            self._occupied += 1
+            if self._best < 0 or (i > self._best if self._is_bid else i < self._best):
+                self._best = i
+        self._lots[i] += order.lots
+        self._size += 1
+        return level.append(order)
+
+    def reduce(self, node: OrderNode, lots: int):
+        node.level.lots -= lots
+        self._lots[node.level.ticks - self._min_ticks] -= lots
+
+    def unlink(self, node: OrderNode):
+        level = node.level
+        self._lots[level.ticks - self._min_ticks] -= node.order.lots
+        level.unlink(node)
+        self._size -= 1
+        if level.size == 0:
+            self._drop_level(level)
+
+    def _drop_level(self, level: PriceLevel):
+        i = level.ticks - self._min_ticks
+        self._levels[i] = None
+        self._lots[i] = 0
+        self._occupied -= 1
+        if i == self._best:
+            self._best = self._next_index(i)
+
+    def _next_index(self, i: int) -> int:
+        """Next occupied index behind i, moving away from the touch, -1 when there is none"""
+        if self._is_bid:
+            behind = self._lots[i - 1 :: -1] > 0 if i > 0 else self._lots[:0] > 0
+        else:
+            behind = self._lots[i + 1 :] > 0
+        if behind.size == 0:
+            return -1
+        j = int(behind.argmax())
+        if not behind[j]:
+            return -1
+        return i - 1 - j if self._is_bid else i + 1 + j
+
+    def _indices(self, depth: int = -1) -> np.ndarray:
+        """Occupied indices, best first"""
+        if self._best < 0 or depth == 0:
+            return np.flatnonzero(self._lots[:0])
+        if self._is_bid:
+            indices = np.flatnonzero(self._lots[: self._best + 1])[::-1]
+        else:
+            indices = np.flatnonzero(self._lots[self._best :]) + self._best
+        return indices if depth < 0 else indices[:depth]
+
+    def levels(self, depth: int = -1):
+        """Price levels, best first"""
+        for i in self._indices(depth).tolist():
+            yield self._levels[i]
+
+    def l2(self, depth: int = -1) -> tuple:
+        """(ticks, lots) arrays of the occupied levels, best first"""
+        indices = self._indices(depth)
+        return indices + self._min_ticks, self._lots[indices]
+
+
+class DenseBook(PriceLevelBook):
+    """PriceLevelBook for markets with a bounded price band, backed by DenseLadder.
+
+    Orders priced outside [minPrice, maxPrice] are refused by normalize(). Best price
+    moves, depth and L2 queries are array operations instead of walks over sorted keys.
+    """
+
+    def __init__(self, minPrice, maxPrice, tickSize=1, lotSize=1, selfTradePolicy=SelfTradePolicy.Skip):
+        assert minPrice <= maxPrice, f"{__class__.__name__} invalid band: {minPrice} {maxPrice}"
+        self._min_ticks = math.ceil(minPrice / tickSize - PriceLevelBook._epsilon)
+        self._max_ticks = math.floor(maxPrice / tickSize + PriceLevelBook._epsilon)
+        PriceLevelBook.__init__(self, tickSize=tickSize, lotSize=lotSize, selfTradePolicy=selfTradePolicy)
+
+    def _new_ladder(self, isBid: bool) -> PriceLadder:
+        return DenseLadder(isBid, self._min_ticks, self._max_ticks)
+
+    def normalize(self, order) -> bool:
+        if not PriceLevelBook.normalize(self, order):
+            return False
+        if not self._min_ticks <= order.ticks <= self._max_ticks:
+            logging.warning(f"{__class__.__name__}.normalize order: {order.id} price: {order.price} outside band")
+            return False
+        return True
+
+    def l2(self, depth: int = -1) -> dict:
+        retval = {}
+        for side, ladder in [("bids", self._bids), ("asks", self._asks)]:
+            ticks, lots = ladder.l2(depth)
+            prices, quantities = ticks * self._tick_size, lots * self._lot_size
+            if self._price_digits > 0:
+                prices = prices.round(self._price_digits)
+            if self._quantity_digits > 0:
+                quantities = quantities.round(self._quantity_digits)
+            retval[side] = list(zip(prices.tolist(), quantities.tolist()))
+        return retval
+
+    def match(self, order, cancelled: list = None) -> list:
+        """Same contract as PriceLevelBook.match, walking the dense ladder by index"""
+        if order.ticks is None:
+            self.normalize(order)
+        is_buy = order.side_code == Order.Side.Buy
+        ladder = self._asks if is_buy else self._bids
+        levels, lots_at, index = ladder._levels, ladder._lots, self._index
+        limit, agent_id, remaining = order.ticks - self._min_ticks, order.agent_id, order.lots
+        # Whole lot sizes need no rounding
+        quantity_of = self._lot_size.__mul__ if self._quantity_digits == 0 else self.quantity
+        agent_orders = self._agent_orders
+        own = agent_id in agent_orders
+        policy = self._self_trade_policy
+        fills = []
+
+        i = ladder._best
+        while remaining > 0 and i >= 0:
+            if (is_buy and limit < i) or (not is_buy and limit > i):
+                break
+            level = levels[i]
+            taken = 0
+            node = level.head
+            while remaining > 0 and node is not None:
+                resting = node.order
+                if own and resting.agent_id == agent_id:
+                    if policy == SelfTradePolicy.CancelNewest:
+                        break
+                    filled, node = node, node.next
+                    if policy == SelfTradePolicy.CancelOldest:
+                        taken += resting.lots
+                        del index[resting.id]
+                        level.unlink(filled)
+                        ladder._size -= 1
+                        self._unindex_agent(resting)
+                        self._self_trade_cancel(resting, cancelled)
+                    continue
+                lots = resting.lots if resting.lots < remaining else remaining
+                fills.append((resting, level.price, quantity_of(lots)))
+                remaining -= lots
+                taken += lots
+                resting.lots -= lots
+                resting.remaining = quantity_of(resting.lots)
+                level.lots -= lots
+                filled, node = node, node.next
+                if resting.lots <= 0:
+                    del index[resting.id]
+                    level.unlink(filled)
+                    ladder._size -= 1
+                    orders = agent_orders[resting.agent_id]
+                    del orders[resting.id]
+                    if not orders:
+                        del agent_orders[resting.agent_id]
+            lots_at[i] -= taken
+            if node is not None and remaining > 0:
+                # Stopped on the agent's own order
+                self._self_trade_cancel(order, cancelled)
+                break
+            if level.size == 0:
+                was_best = i == ladder._best
+                ladder._drop_level(level)
+                i = ladder._best if was_best else ladder._next_index(i)
+            elif remaining > 0:
+                # Only the agent's own orders are left at this price
+                i = ladder._next_index(i)
+
+        order.lots = remaining
+        order.remaining = quantity_of(remaining)
+        logging.debug(f"{__class__.__name__}.match order: {order.id} fills: {len(fills)} remaining: {remaining}")
+        return fills
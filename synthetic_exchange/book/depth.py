@@ -0,0 +1,139 @@
+import bisect
+import collections
+
+
+class DepthCache:
+    """Top price levels of a book, with a version that moves whenever they change.
+
+    Either side holds at most depth levels. update() takes the whole top of the book, change()
+    only the levels an order batch touched, and both return the level deltas against the
+    cached view, each (side, price, quantity) with quantity 0 for a level that is gone or fell
+    out of the top depth. A reader holding the view at version v is brought up to date by
+    applying, in order, the deltas of every version after v, see deltas() and apply().
+    """
+
+    _sides = ("bids", "asks")
+
+    def __init__(self, depth: int = 100, history: int = 1024):
+        self._depth = depth
+        self._version = 0
+        # Quantity by price, and the prices sorted best first as keys: -price for bids, price for asks
+        self._quantities = {"bids": {}, "asks": {}}
+        self._keys = {"bids": [], "asks": []}
+        # Levels as lists, built on the first snapshot() of a version
+        self._levels = {"bids": [], "asks": []}
+        self._levels_version = 0
+        # (version, deltas) of the latest updates, for readers catching up
+        self._history = collections.deque(maxlen=history)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self, depth: int = -1) -> tuple:
+        """(version, {"bids": [(price, quantity), ...], "asks": [...]}), best first. The lists are
+        replaced rather than modified on later updates, they are safe to hand out as they are"""
+        if self._levels_version != self._version:
+            self._levels = {side: self._side_levels(side) for side in __class__._sides}
+            self._levels_version = self._version
+        if depth < 0 or depth >= self._depth:
+            return self._version, self._levels
+        return self._version, {side: levels[:depth] for side, levels in self._levels.items()}
+
+    def update(self, l2: dict) -> list:
+        """Cache the top depth levels of l2, the book's {"bids": [...], "asks": [...]} best first,
+        returns the deltas, empty when nothing changed"""
+        deltas = []
+        for side in __class__._sides:
+            self._resync(side, l2[side], deltas)
+        return self._commit(deltas)
+
+    def change(self, levels: list, l2) -> list:
+        """Apply the quantities [(side, price, quantity), ...] of the levels that changed since the last
+        update, returns the deltas. l2() is only called, for the book's top depth levels, when a level
+        left a full side and whatever rests behind it has to be brought in"""
+        deltas = []
+        short = set()
+        for side, price, quantity in levels:
+            if self._set(side, price, quantity, deltas):
+                short.add(side)
+        if short:
+            book = l2()
+            for side in short:
+                self._resync(side, book[side], deltas)
+        return self._commit(deltas)
+
+    def deltas(self, since: int) -> list:
+        """[(version, deltas), ...] of the updates after version since, None when they are no longer
+        all kept and the reader has to start over from snapshot()"""
+        if since >= self._version:
+            return []
+        if not self._history or self._history[0][0] > since + 1:
+            return None
+        return [item for item in self._history if item[0] > since]
+
+    @staticmethod
+    def apply(levels: dict, deltas: list, depth: int = -1) -> dict:
+        """Levels with deltas applied, best first and at most depth a side"""
+        books = {side: dict(levels[side]) for side in __class__._sides}
+        for side, price, quantity in deltas:
+            if quantity > 0:
+                books[side][price] = quantity
+            else:
+                books[side].pop(price, None)
+        retval = {}
+        for side in __class__._sides:
+            items = sorted(books[side].items(), reverse=side == "bids")
+            retval[side] = items if depth < 0 else items[:depth]
+        return retval
+
+    def _side_levels(self, side: str) -> list:
+        quantities = self._quantities[side]
+        if side == "bids":
+            return [(-key, quantities[-key]) for key in self._keys[side]]
+        return [(key, quantities[key]) for key in self._keys[side]]
+
+    def _set(self, side: str, price, quantity, deltas: list) -> bool:
+        """Set one level, returns True when it left a full side"""
+        quantities, keys = self._quantities[side], self._keys[side]
+        key = -price if side == "bids" else price
+        if quantity <= 0:
+            if price not in quantities:
+                return False
+            del quantities[price]
+            del keys[bisect.bisect_left(keys, key)]
+            deltas.append((side, price, 0))
+            return len(keys) == self._depth - 1
+        if price in quantities:
+            if quantities[price] == quantity:
+                return False
+        elif len(keys) < self._depth or key < keys[-1]:
+            bisect.insort(keys, key)
+            if len(keys) > self._depth:
+                worst = keys.pop()
+                worst = -worst if side == "bids" else worst
+                del quantities[worst]
+                deltas.append((side, worst, 0))
+        else:
+            return False
+        quantities[price] = quantity
+        deltas.append((side, price, quantity))
+        return False
+
+    def _resync(self, side: str, levels: list, deltas: list):
+        levels = levels[: self._depth]
+        prices = {price for price, _ in levels}
+        for price in [price for price in self._quantities[side] if price not in prices]:
+            self._set(side, price, 0, deltas)
+        for price, quantity in levels:
+            self._set(side, price, quantity, deltas)
+
+    def _commit(self, deltas: list) -> list:
+        if deltas:
+            self._version += 1
+            self._history.append((self._version, deltas))
+        return deltas
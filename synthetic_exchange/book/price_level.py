@@ -0,0 +1,420 @@
+import bisect
+import decimal
+import enum
+import logging
+import math
+
+from synthetic_exchange.order import Order
+
+
+class OrderNode:
+    """Queue entry of a resting order, linked to its neighbours within the price level"""
+
+    __slots__ = ("order", "level", "prev", "next")
+
+    def __init__(self, order, level):
+        self.order = order
+        self.level = level
+        self.prev = None
+        self.next = None
+
+
+class PriceLevel:
+    """FIFO queue of resting orders sharing one price, lots is their total remaining in lots"""
+
+    __slots__ = ("ticks", "price", "lots", "size", "head", "tail")
+
+    def __init__(self, ticks: int, price):
+        self.ticks = ticks
+        self.price = price
+        self.lots = 0
+        self.size = 0
+        self.head = None
+        self.tail = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self):
+        return f"{__class__.__name__}(price={self.price}, lots={self.lots}, orders={self.size})"
+
+    @property
+    def orders(self):
+        node = self.head
+        while node is not None:
+            yield node.order
+            node = node.next
+
+    def append(self, order) -> OrderNode:
+        node = OrderNode(order, self)
+        if self.tail is None:
+            self.head = node
+        else:
+            self.tail.next = node
+            node.prev = self.tail
+        self.tail = node
+        self.size += 1
+        self.lots += order.lots
+        return node
+
+    def unlink(self, node: OrderNode):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = node.next = None
+        self.size -= 1
+        self.lots -= node.order.lots
+
+
+class PriceLadder:
+    """One side of the book, price levels kept sorted so the best level is always last.
+
+    Bids are keyed by price in ticks and asks by negated ticks, this way both sides pop
+    their best level from the end of the key list.
+    """
+
+    def __init__(self, isBid: bool):
+        self._is_bid = isBid
+        self._sign = 1 if isBid else -1
+        self._keys = []
+        self._levels = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_bid(self) -> bool:
+        return self._is_bid
+
+    @property
+    def depth(self) -> int:
+        return len(self._keys)
+
+    def best(self) -> PriceLevel:
+        if len(self._keys) > 0:
+            return self._levels[self._keys[-1]]
+        return None
+
+    def best_price(self):
+        if len(self._keys) > 0:
+            return self._levels[self._keys[-1]].price
+        return None
+
+    def level(self, ticks: int) -> PriceLevel:
+        return self._levels.get(self._sign * ticks)
+
+    def add(self, order) -> OrderNode:
+        key = self._sign * order.ticks
+        level = self._levels.get(key)
+        if level is None:
+            level = PriceLevel(order.ticks, order.price)
+            self._levels[key] = level
+            if len(self._keys) == 0 or key > self._keys[-1]:
+                self._keys.append(key)
+            else:
+                bisect.insort(self._keys, key)
+        self._size += 1
+        return level.append(order)
+
+    def reduce(self, node: OrderNode, lots: int):
+        """Account for lots taken off a resting order that stays queued"""
+        node.level.lots -= lots
+
+    def unlink(self, node: OrderNode):
+        level = node.level
+        level.unlink(node)
+        self._size -= 1
+        if level.size == 0:
+            self._drop_level(level)
+
+    def _drop_level(self, level: PriceLevel):
+        key = self._sign * level.ticks
+        del self._levels[key]
+        if self._keys[-1] == key:
+            self._keys.pop()
+        else:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def levels(self, depth: int = -1):
+        """Price levels, best first"""
+        keys = reversed(self._keys) if depth < 0 else reversed(self._keys[-depth:]) if depth > 0 else ()
+        for key in keys:
+            yield self._levels[key]
+
+    def orders(self, depth: int = -1) -> list:
+        """Resting orders in price-time priority, best first"""
+        retval = []
+        for level in self.levels():
+            node = level.head
+            while node is not None:
+                if len(retval) == depth:
+                    return retval
+                retval.append(node.order)
+                node = node.next
+        return retval
+
+
+class SelfTradePolicy(enum.Enum):
+    """What match() does when the incoming order reaches a resting order of its own agent"""
+
+    # The resting order is passed over and keeps its queue position
+    Skip = "skip"
+    # Matching stops and the rest of the incoming order is cancelled
+    CancelNewest = "cancel_newest"
+    # The resting order is cancelled and matching carries on behind it
+    CancelOldest = "cancel_oldest"
+
+
+class PriceLevelBook:
+    """Price-time priority matching engine over two price ladders.
+
+    Orders are put on the tick and lot grid once, by normalize(), and from there on
+    the book prices and sizes them in integer ticks (order.ticks) and lots (order.lots).
+    order.price, order.quantity and order.remaining are kept in market units for
+    everyone else.
+
+    Every resting order is indexed by id to its queue node, so cancels, reductions
+    and fills take an order off the book without searching for it, and by agent,
+    oldest first, so an agent's orders are found without scanning a side. Matching
+    walks the opposite ladder from the best level and consumes each level's queue in
+    arrival order. Resting orders that belong to the incoming order's agent are
+    handled by the self-trade policy, only looked for when the agent has orders
+    resting.
+    """
+
+    # Absorbs binary float noise, 100.3 / 0.1 must be 1003 ticks
+    _epsilon = 1e-9
+
+    def __init__(self, tickSize=1, lotSize=1, selfTradePolicy=SelfTradePolicy.Skip):
+        assert tickSize > 0, f"{__class__.__name__} invalid tickSize: {tickSize}"
+        assert lotSize > 0, f"{__class__.__name__} invalid lotSize: {lotSize}"
+        self._tick_size = tickSize
+        self._lot_size = lotSize
+        self._self_trade_policy = SelfTradePolicy(selfTradePolicy)
+        self._price_digits = __class__._digits(tickSize)
+        self._quantity_digits = __class__._digits(lotSize)
+        self._bids = self._new_ladder(isBid=True)
+        self._asks = self._new_ladder(isBid=False)
+        self._ladders = (self._bids, self._asks)
+        self._index = {}
+        # agent id -> {order id: order}, oldest first, no entry once nothing of the agent's rests
+        self._agent_orders = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, orderId: int) -> bool:
+        return orderId in self._index
+
+    def _new_ladder(self, isBid: bool) -> PriceLadder:
+        return PriceLadder(isBid)
+
+    @staticmethod
+    def _digits(step) -> int:
+        return max(0, -decimal.Decimal(str(step)).as_tuple().exponent)
+
+    @property
+    def tick_size(self):
+        return self._tick_size
+
+    @property
+    def lot_size(self):
+        return self._lot_size
+
+    @property
+    def self_trade_policy(self) -> SelfTradePolicy:
+        return self._self_trade_policy
+
+    def price(self, ticks: int):
+        return round(ticks * self._tick_size, self._price_digits)
+
+    def quantity(self, lots: int):
+        return round(lots * self._lot_size, self._quantity_digits)
+
+    def normalize(self, order) -> bool:
+        """Put order on the tick and lot grid, returns False when it is left without a whole lot.
+
+        A limit price between ticks never becomes more aggressive, buys are rounded down
+        and sells up. The quantity is rounded down to whole lots.
+        """
+        ticks = order.price / self._tick_size
+        if order.side_code == Order.Side.Buy:
+            order.ticks = math.floor(ticks + __class__._epsilon)
+        else:
+            order.ticks = math.ceil(ticks - __class__._epsilon)
+        order.lots = math.floor(order.remaining / self._lot_size + __class__._epsilon)
+        order.price = self.price(order.ticks)
+        order.quantity = order.remaining = self.quantity(order.lots)
+        return order.lots > 0
+
+    @property
+    def bids(self) -> PriceLadder:
+        return self._bids
+
+    @property
+    def asks(self) -> PriceLadder:
+        return self._asks
+
+    def ladder(self, side) -> PriceLadder:
+        """Ladder for a side name or an Order.Side code"""
+        return self._ladders[Order.Side.parse(side)]
+
+    def best_bid(self):
+        return self._bids.best_price()
+
+    def best_ask(self):
+        return self._asks.best_price()
+
+    def add(self, order) -> OrderNode:
+        """Rest an order, raises ValueError for an id already resting"""
+        if order.id in self._index:
+            raise ValueError(f"{self.__class__.__name__}.add order id: {order.id} already resting")
+        if order.ticks is None:
+            self.normalize(order)
+        node = self._ladders[order.side_code].add(order)
+        self._index[order.id] = node
+        orders = self._agent_orders.get(order.agent_id)
+        if orders is None:
+            orders = self._agent_orders[order.agent_id] = {}
+        orders[order.id] = order
+        return node
+
+    def orders_of(self, agentId: int, side=None) -> list:
+        """An agent's resting orders, oldest first, on one side or both"""
+        orders = self._agent_orders.get(agentId, {}).values()
+        if side is None:
+            return list(orders)
+        side_code = Order.Side.parse(side)
+        return [order for order in orders if order.side_code == side_code]
+
+    def _unindex_agent(self, order):
+        orders = self._agent_orders[order.agent_id]
+        del orders[order.id]
+        if not orders:
+            del self._agent_orders[order.agent_id]
+
+    def find(self, orderId: int, side=None):
+        node = self._index.get(orderId)
+        if node is None or (side is not None and node.order.side_code != Order.Side.parse(side)):
+            return None
+        return node.order
+
+    def remove(self, order) -> bool:
+        return self.cancel(order.id) is not None
+
+    def cancel(self, orderId: int, side=None):
+        """Take a resting order off the book, returns it or None when it is not resting on side"""
+        order = self.find(orderId, side)
+        if order is None:
+            return None
+        node = self._index.pop(orderId)
+        self._ladders[order.side_code].unlink(node)
+        self._unindex_agent(order)
+        return order
+
+    def reduce(self, orderId: int, quantity):
+        """Reduce a resting order's remaining quantity in place, it keeps its queue position.
+        Returns the order, which is taken off the book once nothing remains"""
+        node = self._index.get(orderId)
+        if node is None:
+            return None
+        order = node.order
+        lots = min(math.floor(quantity / self._lot_size + __class__._epsilon), order.lots)
+        ladder = self._ladders[order.side_code]
+        ladder.reduce(node, lots)
+        order.lots -= lots
+        order.remaining = self.quantity(order.lots)
+        if order.lots <= 0:
+            del self._index[orderId]
+            ladder.unlink(node)
+            self._unindex_agent(order)
+        return order
+
+    def l2(self, depth: int = -1) -> dict:
+        """Aggregated price levels, {"bids": [(price, quantity), ...], "asks": [...]}, best first"""
+        return {
+            "bids": [(level.price, self.quantity(level.lots)) for level in self._bids.levels(depth)],
+            "asks": [(level.price, self.quantity(level.lots)) for level in self._asks.levels(depth)],
+        }
+
+    def match(self, order, cancelled: list = None) -> list:
+        """Match order against the opposite side.
+
+        Returns a list of (resting order, price, quantity) fills in execution order,
+        order.remaining and each resting order's remaining are updated in place and
+        filled resting orders are taken off the book. The unfilled part of order is
+        not rested, that is up to the caller.
+
+        Orders cancelled by the self-trade policy are appended to cancelled: resting
+        orders it took off the book, or order itself, which must then not be rested.
+        """
+        if order.ticks is None:
+            self.normalize(order)
+        is_buy = order.side_code == Order.Side.Buy
+        ladder = self._asks if is_buy else self._bids
+        keys, levels, index = ladder._keys, ladder._levels, self._index
+        limit, agent_id, remaining = order.ticks, order.agent_id, order.lots
+        # Whole lot sizes need no rounding
+        quantity_of = self._lot_size.__mul__ if self._quantity_digits == 0 else self.quantity
+        agent_orders = self._agent_orders
+        own = agent_id in agent_orders
+        policy = self._self_trade_policy
+        fills = []
+
+        i = len(keys) - 1
+        while remaining > 0 and i >= 0:
+            level = levels[keys[i]]
+            if (is_buy and limit < level.ticks) or (not is_buy and limit > level.ticks):
+                break
+            node = level.head
+            while remaining > 0 and node is not None:
+                resting = node.order
+                if own and resting.agent_id == agent_id:
+                    if policy == SelfTradePolicy.CancelNewest:
+                        break
+                    filled, node = node, node.next
+                    if policy == SelfTradePolicy.CancelOldest:
+                        del index[resting.id]
+                        level.unlink(filled)
+                        ladder._size -= 1
+                        self._unindex_agent(resting)
+                        self._self_trade_cancel(resting, cancelled)
+                    continue
+                lots = resting.lots if resting.lots < remaining else remaining
+                fills.append((resting, level.price, quantity_of(lots)))
+                remaining -= lots
+                resting.lots -= lots
+                resting.remaining = quantity_of(resting.lots)
+                level.lots -= lots
+                filled, node = node, node.next
+                if resting.lots <= 0:
+                    del index[resting.id]
+                    level.unlink(filled)
+                    ladder._size -= 1
+                    orders = agent_orders[resting.agent_id]
+                    del orders[resting.id]
+                    if not orders:
+                        del agent_orders[resting.agent_id]
+            if level.size == 0:
+                ladder._drop_level(level)
+            if node is not None and remaining > 0:
+                # Stopped on the agent's own order
+                self._self_trade_cancel(order, cancelled)
+                break
+            i -= 1
+
+        order.lots = remaining
+        order.remaining = quantity_of(remaining)
+        logging.debug(f"{__class__.__name__}.match order: {order.id} fills: {len(fills)} remaining: {remaining}")
+        return fills
+
+    def _self_trade_cancel(self, order, cancelled: list):
+        logging.debug(f"{__class__.__name__}.match order: {order.id} cancelled by the self-trade policy")
+        if cancelled is not None:
+            cancelled.append(order)
@@ -0,0 +1,47 @@
+import ctypes
+import logging
+import multiprocessing as mp
+import pickle
+
+
+class SnapshotBuffer:
+    """Latest value published by one writer process, readable from any process.
+
+    The value is pickled into shared memory next to a version counter. Readers only
+    take the lock and unpickle when the version moved since their last read, so
+    polling an unchanged snapshot costs a single shared integer read.
+    """
+
+    def __init__(self, size: int = 1 << 20):
+        self._size = size
+        self._version = mp.RawValue(ctypes.c_int64, 0)
+        self._length = mp.RawValue(ctypes.c_int64, 0)
+        self._buffer = mp.RawArray(ctypes.c_char, size)
+        self._lock = mp.Lock()
+        self._cache_version = 0
+        self._cache = None
+
+    @property
+    def version(self) -> int:
+        return self._version.value
+
+    def publish(self, value) -> int:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._size:
+            logging.error(f"{__class__.__name__}.publish snapshot size: {len(data)} exceeds buffer size: {self._size}")
+            return self._version.value
+        with self._lock:
+            self._buffer[: len(data)] = data
+            self._length.value = len(data)
+            self._version.value += 1
+            return self._version.value
+
+    def read(self) -> tuple:
+        """Returns (version, value), value is None until the first publish"""
+        if self._version.value != self._cache_version:
+            with self._lock:
+                version = self._version.value
+                data = self._buffer[: self._length.value]
+            self._cache = pickle.loads(data)
+            self._cache_version = version
+        return self._cache_version, self._cache
@@ -79,7 +79,7 @@ cdef class Clock:
 				for ci in self._child_iterators:
 					child_iterator = ci
 					try:
-						child_iterator.c_tick(self._current_tick)
+						child_iterator.tick(self._current_tick)
 					except StopIteration:
 						raise
 					except Exception as e:
@@ -131,7 +131,7 @@ cdef class Clock:
 				for ci in self._current_context:
 					child_iterator = ci
 					try:
-						child_iterator.c_tick(self._current_tick)
+						child_iterator.tick(self._current_tick)
 					except StopIteration:
 						logging.error("Clock.run_til stop iteration triggered in real time mode")
 						return
@@ -160,6 +160,8 @@ cdef class TimeIterator(PubSub):
 		self._current_timestamp = timestamp
 
 	def tick(self, timestamp: float):
+		"""Called by the clock every tick. Python subclasses override this one, c_tick can only be
+		overridden from Cython, and call it back to keep current_timestamp"""
 		self.c_tick(timestamp)
 
 	@property
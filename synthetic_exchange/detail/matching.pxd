@@ -0,0 +1,56 @@
+# distutils: language=c++
+
+from libc.stdint cimport int64_t
+from libcpp.list cimport list as cpplist
+from libcpp.map cimport map as cppmap
+from libcpp.unordered_map cimport unordered_map
+from libcpp.vector cimport vector
+
+
+cdef struct OrderEntry:
+	int64_t order_id
+	int64_t agent_id
+	int64_t lots
+
+cdef struct Fill:
+	int64_t order_id
+	int64_t ticks
+	int64_t lots
+
+ctypedef cpplist[OrderEntry] OrderQueue
+ctypedef cpplist[OrderEntry].iterator OrderQueueIterator
+
+cdef cppclass Level:
+	int64_t lots
+	OrderQueue queue
+
+cdef cppclass Locator:
+	int side
+	int64_t key
+	OrderQueueIterator it
+
+# Keyed by -ticks for bids and ticks for asks, the best level of either side is begin()
+ctypedef cppmap[int64_t, Level] Levels
+ctypedef cppmap[int64_t, Level].iterator LevelsIterator
+ctypedef unordered_map[int64_t, Locator] Index
+ctypedef unordered_map[int64_t, Locator].iterator IndexIterator
+
+
+cdef class MatchingCore:
+	cdef:
+		# C++ members can't be arrays, Cython would not construct them
+		Levels _bids
+		Levels _asks
+		int64_t _size[2]
+		Index _index
+
+	cdef inline Levels *c_levels(self, int side):
+		return &self._bids if side == 0 else &self._asks
+
+	cdef int64_t c_add(self, int64_t order_id, int side, int64_t ticks, int64_t lots, int64_t agent_id) except -1
+	cdef int64_t c_cancel(self, int64_t order_id, int side)
+	cdef int64_t c_amend(self, int64_t order_id, int64_t lots)
+	cdef int64_t c_match(
+		self, int side, int64_t ticks, int64_t lots, int64_t agent_id, int policy,
+		vector[Fill] *fills, vector[int64_t] *cancelled, bint *stopped,
+	)
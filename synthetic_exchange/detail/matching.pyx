@@ -0,0 +1,252 @@
+# distutils: language=c++
+
+from cython.operator cimport(
+	dereference as deref,
+	preincrement as inc,
+	predecrement as dec,
+)
+from libc.stdint cimport int64_t
+from libcpp.vector cimport vector
+
+# Side codes, the values of Order.Side
+cdef enum:
+	BUY = 0
+	SELL = 1
+
+# Self-trade policies, what match does on reaching a resting order of the incoming order's agent
+cdef enum:
+	# Pass over it
+	SKIP = 0
+	# Stop matching, the caller cancels the incoming order
+	CANCEL_NEWEST = 1
+	# Cancel the resting order and carry on
+	CANCEL_OLDEST = 2
+
+
+cdef inline int64_t _key(int side, int64_t ticks):
+	"""Level key of a price in ticks, and the other way around"""
+	return -ticks if side == BUY else ticks
+
+
+cdef class MatchingCore:
+	"""Price-time priority matching over integer ticks and lots.
+
+	Each side is an ordered map of price levels, each level a queue of (order id, agent id,
+	lots) entries in arrival order, and every resting order id is indexed to its queue
+	entry. Orders themselves stay on the Python side, the core only deals in ids.
+	"""
+
+	def __cinit__(self):
+		self._size[BUY] = 0
+		self._size[SELL] = 0
+
+	def __len__(self):
+		return self._index.size()
+
+	def __contains__(self, int64_t order_id):
+		return self._index.find(order_id) != self._index.end()
+
+	def add(self, int64_t order_id, int side, int64_t ticks, int64_t lots, int64_t agent_id):
+		"""Rest an order at the back of its price level, raises ValueError for an id already resting"""
+		self.c_add(order_id, side, ticks, lots, agent_id)
+
+	def cancel(self, int64_t order_id, int side=-1) -> int:
+		"""Take an order off the book, returns its remaining lots or -1 when it is not resting on side"""
+		return self.c_cancel(order_id, side)
+
+	def amend(self, int64_t order_id, int64_t lots) -> int:
+		"""Change an order's remaining lots, returns the previous lots or -1 when it is not resting.
+		A reduction keeps the queue position, an increase goes to the back of the level"""
+		return self.c_amend(order_id, lots)
+
+	def match(self, int side, int64_t ticks, int64_t lots, int64_t agent_id, int policy=SKIP) -> tuple:
+		"""Match an incoming order, returns (remaining lots, [(resting order id, ticks, lots), ...],
+		[resting order id cancelled by the self-trade policy, ...], True when it stopped on the agent's
+		own order). policy is 0 to skip the agent's own orders, 1 to stop on them, 2 to cancel them"""
+		cdef:
+			vector[Fill] fills
+			vector[int64_t] cancelled
+			bint stopped = False
+			int64_t remaining = self.c_match(side, ticks, lots, agent_id, policy, &fills, &cancelled, &stopped)
+			list retval = []
+			Fill fill
+		for fill in fills:
+			retval.append((fill.order_id, fill.ticks, fill.lots))
+		return remaining, retval, list(cancelled), stopped
+
+	def size(self, int side) -> int:
+		return self._size[side]
+
+	def depth(self, int side) -> int:
+		return self.c_levels(side).size()
+
+	def best(self, int side):
+		"""Best price in ticks, None when the side is empty"""
+		if self.c_levels(side).empty():
+			return None
+		return _key(side, deref(self.c_levels(side).begin()).first)
+
+	def side_of(self, int64_t order_id) -> int:
+		cdef IndexIterator it = self._index.find(order_id)
+		return deref(it).second.side if it != self._index.end() else -1
+
+	def lots_of(self, int64_t order_id) -> int:
+		cdef IndexIterator it = self._index.find(order_id)
+		return deref(deref(it).second.it).lots if it != self._index.end() else -1
+
+	def level(self, int side, int64_t ticks):
+		"""(lots, orders) at a price, None when nothing rests there"""
+		cdef LevelsIterator it = self.c_levels(side).find(_key(side, ticks))
+		if it == self.c_levels(side).end():
+			return None
+		return deref(it).second.lots, deref(it).second.queue.size()
+
+	def levels(self, int side, int64_t depth=-1) -> list:
+		"""[(ticks, lots, orders), ...] best first"""
+		cdef:
+			list retval = []
+			LevelsIterator it = self.c_levels(side).begin()
+			int64_t ticks
+		while it != self.c_levels(side).end() and len(retval) != depth:
+			ticks = _key(side, deref(it).first)
+			retval.append((ticks, deref(it).second.lots, deref(it).second.queue.size()))
+			inc(it)
+		return retval
+
+	def order_ids(self, int side, int64_t depth=-1) -> list:
+		"""Resting order ids in price-time priority, best first"""
+		cdef:
+			list retval = []
+			LevelsIterator it = self.c_levels(side).begin()
+			OrderQueueIterator qit
+		while it != self.c_levels(side).end():
+			qit = deref(it).second.queue.begin()
+			while qit != deref(it).second.queue.end():
+				if len(retval) == depth:
+					return retval
+				retval.append(deref(qit).order_id)
+				inc(qit)
+			inc(it)
+		return retval
+
+	cdef int64_t c_add(self, int64_t order_id, int side, int64_t ticks, int64_t lots, int64_t agent_id) except -1:
+		cdef:
+			int64_t key = _key(side, ticks)
+			Level *level
+			OrderEntry entry
+			Locator *locator
+		if self._index.find(order_id) != self._index.end():
+			raise ValueError(f"MatchingCore.add order id: {order_id} already resting")
+		level = &deref(self.c_levels(side))[key]
+		entry.order_id = order_id
+		entry.agent_id = agent_id
+		entry.lots = lots
+		level.queue.push_back(entry)
+		level.lots += lots
+		locator = &self._index[order_id]
+		locator.side = side
+		locator.key = key
+		locator.it = level.queue.end()
+		dec(locator.it)
+		self._size[side] += 1
+		return 0
+
+	cdef int64_t c_cancel(self, int64_t order_id, int side):
+		cdef:
+			IndexIterator found = self._index.find(order_id)
+			Locator locator
+			LevelsIterator level_it
+			Level *level
+			int64_t lots
+		if found == self._index.end() or (side >= 0 and deref(found).second.side != side):
+			return -1
+		locator = deref(found).second
+		level_it = self.c_levels(locator.side).find(locator.key)
+		level = &deref(level_it).second
+		lots = deref(locator.it).lots
+		level.lots -= lots
+		level.queue.erase(locator.it)
+		if level.queue.empty():
+			self.c_levels(locator.side).erase(level_it)
+		self._size[locator.side] -= 1
+		self._index.erase(found)
+		return lots
+
+	cdef int64_t c_amend(self, int64_t order_id, int64_t lots):
+		cdef:
+			IndexIterator found = self._index.find(order_id)
+			Locator *locator
+			OrderEntry *entry
+			Level *level
+			int64_t previous, agent_id, key
+			int side
+		if found == self._index.end():
+			return -1
+		locator = &deref(found).second
+		entry = &deref(locator.it)
+		previous = entry.lots
+		if lots <= 0:
+			self.c_cancel(order_id, -1)
+		elif lots <= previous:
+			level = &deref(self.c_levels(locator.side))[locator.key]
+			level.lots -= previous - lots
+			entry.lots = lots
+		else:
+			side, agent_id, key = locator.side, entry.agent_id, locator.key
+			self.c_cancel(order_id, -1)
+			self.c_add(order_id, side, _key(side, key), lots, agent_id)
+		return previous
+
+	cdef int64_t c_match(
+		self, int side, int64_t ticks, int64_t lots, int64_t agent_id, int policy,
+		vector[Fill] *fills, vector[int64_t] *cancelled, bint *stopped,
+	):
+		cdef:
+			int opposite = SELL if side == BUY else BUY
+			Levels *levels = self.c_levels(opposite)
+			LevelsIterator it = levels.begin()
+			OrderQueueIterator qit
+			Level *level
+			OrderEntry *entry
+			int64_t level_ticks, take
+			Fill fill
+		while lots > 0 and it != levels.end():
+			level_ticks = _key(opposite, deref(it).first)
+			if (side == BUY and ticks < level_ticks) or (side == SELL and ticks > level_ticks):
+				break
+			level = &deref(it).second
+			qit = level.queue.begin()
+			while lots > 0 and qit != level.queue.end():
+				entry = &deref(qit)
+				if entry.agent_id == agent_id:
+					if policy == CANCEL_NEWEST:
+						stopped[0] = True
+						return lots
+					if policy == CANCEL_OLDEST:
+						cancelled.push_back(entry.order_id)
+						level.lots -= entry.lots
+						self._index.erase(entry.order_id)
+						qit = level.queue.erase(qit)
+						self._size[opposite] -= 1
+					else:
+						inc(qit)
+					continue
+				take = entry.lots if entry.lots < lots else lots
+				fill.order_id = entry.order_id
+				fill.ticks = level_ticks
+				fill.lots = take
+				fills.push_back(fill)
+				lots -= take
+				entry.lots -= take
+				level.lots -= take
+				if entry.lots <= 0:
+					self._index.erase(entry.order_id)
+					qit = level.queue.erase(qit)
+					self._size[opposite] -= 1
+				else:
+					inc(qit)
+			if level.queue.empty():
+				it = levels.erase(it)
+			else:
+				inc(it)
+		return lots
@@ -1,16 +1,23 @@
 import datetime as dt
 import logging
-import multiprocessing as mp
+import os
 import time
 
 from synthetic_exchange.market import Market
 from synthetic_exchange.order import Order
 from synthetic_exchange.orderbook import OrderBook
-from synthetic_exchange.strategy import RandomNormal, RandomUniform
+from synthetic_exchange.scheduler import BookScheduler, Placement
+from synthetic_exchange.simulation import Simulation
+from synthetic_exchange.tape import MappedTradeTape
+from synthetic_exchange.strategy import AgentPool, RandomNormal, RandomUniform, Runtime
 from synthetic_exchange.transaction import Transaction, Transactions
+from synthetic_exchange.transport import ReportRing, Transport, Watermark, create_queue
 
 
 class Exchange:
+    # Agent classes by configured type
+    _agent_types = {"randomnormal": RandomNormal, "randomuniform": RandomUniform}
+
     def __init__(self, config: dict):
         self._id = config["exchangeId"]
         self._name = config["exchange"]
@@ -24,88 +31,188 @@ class Exchange:
         self._transactions = {}
         self._orderbooks = {}
         self._markets = {}
+        # Everything runs in this process, driven by a backtest clock, when the exchange is simulated
+        self._simulation = None
+        simulation_conf = config.get("simulation", None)
+        if simulation_conf is not None:
+            self._simulation = Simulation(
+                seed=simulation_conf.get("seed", 0),
+                startTime=simulation_conf.get("startTime", 0.0),
+                endTime=simulation_conf.get("endTime", 0.0),
+                tickSize=simulation_conf.get("tickSize", 1.0),
+            )
+        # Books send the agents the fills and cancels of their orders, through a ReportRing of reportQueueSize
+        # reports for every process running agents
+        report_size = config.get("reportQueueSize", 1 << 12) if config.get("executionReports", True) else 0
+        self._report_channels = []
+        # Agents run as processes of their own, or as tasks on the event loops of agentWorkers runtime processes
+        self._agent_pool = None
+        runtime = Runtime(config.get("agentRuntime", Runtime.Process.value).lower())
+        if self._simulation is None and runtime == Runtime.Asyncio:
+            self._agent_pool = AgentPool(workers=1, reports=report_size)
+        elif self._simulation is None and runtime == Runtime.Pool:
+            self._agent_pool = AgentPool(workers=config.get("agentWorkers", None), reports=report_size)
 
-        markets_conf: list = config.get("markets", [])
-
-        for market_conf in markets_conf:
-            try:
-                symbol = market_conf["symbol"]
-                market_id = market_conf["marketId"]
-                initial_price = market_conf["initialPrice"]
-                min_price = market_conf["minPrice"]
-                max_price = market_conf["maxPrice"]
-                tick_size = market_conf["tickSize"]
-                min_quantity = market_conf["minQuantity"]
-                max_quantity = market_conf["maxQuantity"]
-
-                self._market_id_to_symbol[market_id] = symbol
-                self._symbol_to_market_id[symbol] = market_id
-                self._queues[market_id] = mp.Queue(maxsize=100)
-
-                # Build agents
-                self._agents[market_id] = {}
-                agents_conf: dict = market_conf["agents"]
-                for _, agent_conf in agents_conf.items():
-                    try:
-                        agent_id = agent_conf["agentId"]
-                        type_ = agent_conf["type"]
-                        initial_price = agent_conf["initialPrice"]
-                        min_price = agent_conf["minPrice"]
-                        max_price = agent_conf["maxPrice"]
-                        tick_size = agent_conf["tickSize"]
-                        min_quantity = agent_conf["minQuantity"]
-                        max_quantity = agent_conf["maxQuantity"]
-                        if type_.lower() == "randomnormal":
-                            a = RandomNormal(
-                                marketId=market_id,
-                                agentId=agent_id,
-                                symbol=symbol,
-                                initialPrice=initial_price,
-                                minPrice=min_price,
-                                maxPrice=max_price,
-                                tickSize=tick_size,
-                                minQuantity=min_quantity,
-                                maxQuantity=max_quantity,
-                                queue=self._queues[market_id],
-                                wait=5,
-                            )
-                            self._agents[market_id][a.id] = a
-                        elif type_.lower() == "randomuniform":
-                            a = RandomUniform(
-                                marketId=market_id,
-                                agentId=agent_id,
-                                symbol=symbol,
-                                initialPrice=initial_price,
-                                minPrice=min_price,
-                                maxPrice=max_price,
-                                tickSize=tick_size,
-                                minQuantity=min_quantity,
-                                maxQuantity=max_quantity,
-                                queue=self._queues[market_id],
-                                wait=5,
-                            )
-                            self._agents[market_id][a.id] = a
-                        else:
-                            logging.warning(f"{__class__.__name__}.__init__ unsupported agent type: {type_}")
-                    except Exception as e:
-                        logging.error(
-                            f"{__class__.__name__}.__init__ market id: {market_id} symbol: {symbol} error creating agent: {agent_conf} e: {e}"
-                        )
-
-                self._transactions[market_id] = Transactions(agents=self._agents[market_id])
-                self._orderbooks[market_id] = OrderBook(
-                    marketId=market_id,
-                    symbol=symbol,
-                    transactions=self._transactions[market_id],
-                    wait=5,
-                    queue=self._queues[market_id],
-                )
-                self._markets[market_id] = Market(orderbook=self._orderbooks[market_id])
-            except Exception as e:
-                logging.error(
-                    f"{__class__.__name__}.__init__ market id: {market_id} symbol: {symbol} error creating market: {market_conf} e: {e}"
+        # Order books run as processes of their own, or a few to each of the scheduler's workers
+        self._scheduler = None
+        scheduler_conf = config.get("bookScheduler", None)
+        if self._simulation is None and scheduler_conf is not None:
+            self._scheduler = BookScheduler(
+                workers=scheduler_conf.get("workers", None),
+                placement=Placement(scheduler_conf.get("placement", Placement.RoundRobin.value).lower()),
+                affinity=scheduler_conf.get("affinity", False),
+                budget=scheduler_conf.get("budget", 256),
+            )
+
+        for market_conf in config.get("markets", []):
+            self._create_market(market_conf, report_size)
+
+    def _create_queue(self, market_conf: dict, symbol: str) -> tuple:
+        """(queue, its size) of the orders from the agents to the order book, pickled through a pipe or binary
+        records in a shared ring. Agents on an event loop send through the ring, its puts don't involve a feeder
+        thread"""
+        if self._simulation is not None:
+            transport = Transport.Local
+        else:
+            default_transport = Transport.Ring if self._agent_pool is not None else Transport.Queue
+            transport = Transport(market_conf.get("transport", default_transport.value).lower())
+        queue_size = market_conf.get("queueSize", 1 << 16 if transport == Transport.Ring else 100)
+        return create_queue(transport, queue_size, symbol=symbol), queue_size
+
+    def _create_agent(self, market_id: int, symbol: str, agent_conf: dict, watermark: Watermark, report_size: int):
+        try:
+            agent_id = agent_conf["agentId"]
+            type_ = agent_conf["type"]
+            options = {
+                "wait": agent_conf.get("wait", 5),
+                "watermark": watermark,
+                "inflightRetention": agent_conf.get("inflightRetention", 4096),
+            }
+            if self._simulation is not None:
+                options["hosted"] = True
+                options["seed"] = self._simulation.agent_seed(market_id, agent_id)
+            elif self._agent_pool is not None:
+                options["hosted"] = True
+            elif report_size > 0:
+                options["reports"] = ReportRing(report_size)
+                self._report_channels.append(options["reports"])
+            agent_class = __class__._agent_types.get(type_.lower(), None)
+            if agent_class is None:
+                logging.warning(f"{__class__.__name__}.__init__ unsupported agent type: {type_}")
+                return
+            a = agent_class(
+                marketId=market_id,
+                agentId=agent_id,
+                symbol=symbol,
+                initialPrice=agent_conf["initialPrice"],
+                minPrice=agent_conf["minPrice"],
+                maxPrice=agent_conf["maxPrice"],
+                tickSize=agent_conf["tickSize"],
+                minQuantity=agent_conf["minQuantity"],
+                maxQuantity=agent_conf["maxQuantity"],
+                queue=self._queues[market_id],
+                **options,
+            )
+            self._agents[market_id][a.id] = a
+        except Exception as e:
+            logging.error(
+                f"{__class__.__name__}.__init__ market id: {market_id} symbol: {symbol} error creating agent: {agent_conf} e: {e}"
+            )
+
+    def _reports(self, market_id: int, report_size: int) -> dict:
+        """Execution report channel of every agent of a market, the one of the process it runs in"""
+        reports = {}
+        for agent in self._agents[market_id].values():
+            if self._simulation is not None:
+                channel = self._simulation.reports if report_size > 0 else None
+            elif self._agent_pool is not None:
+                channel = self._agent_pool.runtimes[self._agent_pool.add(agent)].reports
+            else:
+                channel = agent.reports
+            if channel is not None:
+                reports[agent.id] = channel
+        return reports
+
+    def _create_market(self, market_conf: dict, report_size: int):
+        config = self._config
+        symbol = market_conf.get("symbol", None)
+        market_id = market_conf.get("marketId", None)
+        try:
+            symbol = market_conf["symbol"]
+            market_id = market_conf["marketId"]
+
+            self._market_id_to_symbol[market_id] = symbol
+            self._symbol_to_market_id[symbol] = market_id
+            self._queues[market_id], queue_size = self._create_queue(market_conf, symbol)
+            # Agents hold back their orders while the book's backlog is above the high watermark
+            watermark = None
+            if market_conf.get("flowControl", True):
+                watermark = Watermark(
+                    queue_size, market_conf.get("highWatermark", 0.8), market_conf.get("lowWatermark", 0.5)
                 )
 
+            # Build agents
+            self._agents[market_id] = {}
+            agents_conf: dict = market_conf["agents"]
+            for _, agent_conf in agents_conf.items():
+                self._create_agent(market_id, symbol, agent_conf, watermark, report_size)
+            reports = self._reports(market_id, report_size)
+
+            # The book keeps the last historyRetention trades and orders in memory, the older ones go to
+            # segments under spillDir/<symbol> when there is one
+            retention = market_conf.get("historyRetention", config.get("historyRetention", None))
+            spill_dir = market_conf.get("spillDir", config.get("spillDir", None))
+            if spill_dir is not None:
+                spill_dir = os.path.join(spill_dir, symbol)
+            # Trades also go to the file tapeDir/<symbol>.tape other processes can map
+            tape_dir = market_conf.get("tapeDir", config.get("tapeDir", None))
+            tape_file = os.path.join(tape_dir, f"{symbol}.tape") if tape_dir is not None else None
+            # Bars of the trades every barIntervals seconds
+            bar_intervals = market_conf.get("barIntervals", config.get("barIntervals", [1, 60, 3600]))
+            self._transactions[market_id] = Transactions(
+                agents=self._agents[market_id],
+                shared=self._simulation is None,
+                retention=retention,
+                spillDir=spill_dir,
+                tapeFile=tape_file,
+                barIntervals=bar_intervals,
+            )
+            self._orderbooks[market_id] = OrderBook(
+                marketId=market_id,
+                symbol=symbol,
+                transactions=self._transactions[market_id],
+                wait=5,
+                queue=self._queues[market_id],
+                tickSize=market_conf["tickSize"],
+                # The smallest order is one lot unless configured otherwise
+                lotSize=market_conf.get("lotSize", market_conf["minQuantity"]),
+                bookBackend=market_conf.get("bookBackend", "levels"),
+                selfTradePolicy=market_conf.get("selfTradePolicy", "skip"),
+                minPrice=market_conf["minPrice"],
+                maxPrice=market_conf["maxPrice"],
+                bookMode=market_conf.get("bookMode", "local"),
+                snapshotDepth=market_conf.get("snapshotDepth", 100),
+                snapshotInterval=market_conf.get("snapshotInterval", 0.1),
+                batchSize=market_conf.get("batchSize", 64),
+                batchLatency=market_conf.get("batchLatency", 0.0),
+                reports=reports,
+                historyRetention=retention,
+                spillDir=spill_dir,
+            )
+            self._markets[market_id] = Market(orderbook=self._orderbooks[market_id])
+            if self._simulation is not None:
+                for agent in self._agents[market_id].values():
+                    self._simulation.add_agent(agent)
+                self._simulation.add_orderbook(self._orderbooks[market_id])
+            if self._scheduler is not None:
+                # Expected orders a second, by default what the agents send
+                agents_rate = sum(1.0 / agent.interval for agent in self._agents[market_id].values())
+                self._scheduler.add(self._orderbooks[market_id], market_conf.get("messageRate", agents_rate))
+        except Exception as e:
+            logging.error(
+                f"{__class__.__name__}.__init__ market id: {market_id} symbol: {symbol} error creating market: {market_conf} e: {e}"
+            )
+
     @property
     def id(self) -> int:
         return self._id
@@ -114,13 +221,53 @@ class Exchange:
     def name(self) -> str:
         return self._name
 
+    @property
+    def simulation(self) -> Simulation:
+        """None unless the exchange is simulated"""
+        return self._simulation
+
+    @property
+    def scheduler(self) -> BookScheduler:
+        """None unless order books run on the scheduler's workers"""
+        return self._scheduler
+
+    @property
+    def agent_pool(self) -> AgentPool:
+        """None unless agents run as tasks on runtime processes"""
+        return self._agent_pool
+
     def start(self):
+        """Start the agent and order book processes, or run a simulated exchange to its end time"""
+        if self._simulation is not None:
+            self.run()
+            return
+        if self._scheduler is not None:
+            self._scheduler.start()
         for _, market in self._markets.items():
             market.start()
+        if self._agent_pool is not None:
+            self._agent_pool.start()
+
+    def run(self, endTime: float = None):
+        """Run a simulated exchange in this process to endTime, the simulation's end by default"""
+        assert self._simulation is not None, f"{__class__.__name__}.run exchange: {self._name} is not simulated"
+        self._simulation.run(endTime)
 
     def stop(self):
-        for _, market in self._markets.items():
-            market.stop()
+        if self._agent_pool is not None:
+            self._agent_pool.stop()
+        if self._simulation is None:
+            for _, market in self._markets.items():
+                market.stop()
+        else:
+            for orderbook in self._orderbooks.values():
+                orderbook.flush()
+        if self._scheduler is not None:
+            self._scheduler.stop()
+        for queue in self._queues.values():
+            queue.close()
+        for channel in self._report_channels:
+            channel.close()
 
     def best_bid(self, symbol) -> float:
         retval = 0.0
@@ -147,6 +294,38 @@ class Exchange:
             logging.error(f"{__class__.__name__}.orderbook {symbol} not found")
         return retval
 
+    def flow(self, symbol) -> dict:
+        """Orders sent, throttled, coalesced and dropped by each agent of a market, by agent id"""
+        retval = {}
+        if symbol in self._symbol_to_market_id.keys():
+            market_id = self._symbol_to_market_id[symbol]
+            retval = {agent_id: agent.flow for agent_id, agent in self._agents[market_id].items()}
+        else:
+            logging.error(f"{__class__.__name__}.flow {symbol} not found")
+        return retval
+
+    def bars(self, symbol, interval, names: list = None) -> dict:
+        """{column name: array} of the bars of a market every interval seconds, see Market.bars"""
+        retval = {}
+        if symbol in self._symbol_to_market_id.keys():
+            market_id = self._symbol_to_market_id[symbol]
+            assert market_id in self._markets.keys()
+            retval = self._markets[market_id].bars(interval, names)
+        else:
+            logging.error(f"{__class__.__name__}.bars {symbol} not found")
+        return retval
+
+    def tape(self, symbol) -> MappedTradeTape:
+        """Reader of the trades of a market written to tapeDir, None without one"""
+        retval = None
+        if symbol in self._symbol_to_market_id.keys():
+            tape_file = self._transactions[self._symbol_to_market_id[symbol]].tape_file
+            if tape_file is not None:
+                retval = MappedTradeTape(tape_file)
+        else:
+            logging.error(f"{__class__.__name__}.tape {symbol} not found")
+        return retval
+
     def orderbook(self, symbol, depth: int = -1) -> dict:
         retval = {}
         if symbol in self._symbol_to_market_id.keys():
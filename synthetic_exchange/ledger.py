@@ -0,0 +1,116 @@
+import numpy as np
+
+from synthetic_exchange.tape import ColumnTape
+
+
+class LedgerTape(ColumnTape):
+    """Samples of the agents' running position and PnL, see Ledger"""
+
+    _columns = (
+        ("trade_id", np.int64),
+        ("timestamp", np.float64),
+        ("agent_id", np.int64),
+        ("position", np.float64),
+        ("buy_vwap", np.float64),
+        ("sell_vwap", np.float64),
+        ("realized", np.float64),
+    )
+
+
+class Ledger:
+    """Running position, VWAPs and realized profit of every agent trading on a market.
+
+    Every fill updates the agent's totals in place, nothing is recomputed from its history. The
+    realized profit is that of the quantity both bought and sold, at the difference of the sell and
+    buy VWAPs, as Transaction.calculate_profit() has it. One fill in sampleEvery of an agent is
+    sampled, after the fill, into a LedgerTape for reports to read, the only part of the ledger
+    other processes see when it is shared.
+    """
+
+    def __init__(
+        self,
+        sampleEvery: int = 1,
+        chunkSize: int = 4096,
+        shared: bool = False,
+        manager=None,
+        retention: int = None,
+        spillPath: str = None,
+    ):
+        """chunkSize, shared, manager, retention and spillPath of the samples, see ColumnTape"""
+        assert sampleEvery > 0, f"{__class__.__name__} invalid sample every: {sampleEvery}"
+        self._sample_every = sampleEvery
+        self._samples = LedgerTape(
+            chunkSize=chunkSize, shared=shared, manager=manager, retention=retention, spillPath=spillPath
+        )
+        # Agent id: [fills, quantity bought, value bought, quantity sold, value sold]
+        self._totals = {}
+
+    @property
+    def samples(self) -> LedgerTape:
+        return self._samples
+
+    @property
+    def agent_ids(self) -> list:
+        """Agents with fills, in the writing process"""
+        return list(self._totals)
+
+    def record(self, tradeId: int, timestamp: float, buyAgentId: int, sellAgentId: int, price, quantity):
+        """Both sides of a trade"""
+        self.fill(tradeId, timestamp, buyAgentId, True, price, quantity)
+        self.fill(tradeId, timestamp, sellAgentId, False, price, quantity)
+
+    def fill(self, tradeId: int, timestamp: float, agentId: int, isBuy: bool, price, quantity):
+        totals = self._totals.get(agentId)
+        if totals is None:
+            totals = self._totals[agentId] = [0, 0.0, 0.0, 0.0, 0.0]
+        totals[0] += 1
+        if isBuy:
+            totals[1] += quantity
+            totals[2] += price * quantity
+        else:
+            totals[3] += quantity
+            totals[4] += price * quantity
+        if totals[0] % self._sample_every == 0:
+            buy_vwap, sell_vwap = __class__._vwaps(totals)
+            position = totals[1] - totals[3]
+            realized = min(totals[1], totals[3]) * (sell_vwap - buy_vwap)
+            self._samples.append(tradeId, timestamp, agentId, position, buy_vwap, sell_vwap, realized)
+
+    @staticmethod
+    def _vwaps(totals: list) -> tuple:
+        buy_vwap = totals[2] / totals[1] if totals[1] > 0 else 0.0
+        sell_vwap = totals[4] / totals[3] if totals[3] > 0 else 0.0
+        return buy_vwap, sell_vwap
+
+    def position(self, agentId: int) -> dict:
+        """Totals of an agent up to its last fill, in the writing process, None before its first fill"""
+        totals = self._totals.get(agentId)
+        if totals is None:
+            return None
+        buy_vwap, sell_vwap = __class__._vwaps(totals)
+        return {
+            "agent_id": agentId,
+            "fills": totals[0],
+            "position": totals[1] - totals[3],
+            "quantity_bought": totals[1],
+            "value_bought": totals[2],
+            "quantity_sold": totals[3],
+            "value_sold": totals[4],
+            "buy_vwap": buy_vwap,
+            "sell_vwap": sell_vwap,
+            "realized": min(totals[1], totals[3]) * (sell_vwap - buy_vwap),
+        }
+
+    def history(self, agentId: int = None, names: list = None) -> dict:
+        """{column name: array} of the samples, of one agent or of all of them"""
+        columns = self._samples.columns()
+        if agentId is not None:
+            mask = columns["agent_id"] == agentId
+            columns = {name: column[mask] for name, column in columns.items()}
+        return {name: columns[name] for name in names} if names else columns
+
+    def publish(self) -> int:
+        return self._samples.publish()
+
+    def flush(self):
+        self._samples.flush()
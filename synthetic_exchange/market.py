@@ -4,12 +4,9 @@ import multiprocessing as mp
 import operator
 import random
 from typing import List
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 from synthetic_exchange.order import Order
 from synthetic_exchange.orderbook import OrderBook
-from synthetic_exchange.reports import Reports
 from synthetic_exchange.strategy.agent import Agent
 from synthetic_exchange.transaction import Transaction, Transactions
 
@@ -36,11 +33,11 @@ class Market:
         self._max_quantity = maxQuantity
         self._market_id = orderbook.market_id
         self._orderbook = orderbook
-        self._orderbook.events.partial_fill.subscribe(__class__._orderbook_event)
-        self._orderbook.events.fill.subscribe(__class__._orderbook_event)
-        self._orderbook.events.cancel.subscribe(__class__._orderbook_event)
+        # Agents of a book without report channels only see its events in the book's process
+        if not self._orderbook.reports:
+            self._orderbook.events.batch.subscribe(__class__._orderbook_events)
 
-        self._reports = Reports(self._market_id)
+        self._reports = None
         __class__._markets[self._market_id] = self
 
     @staticmethod
@@ -56,6 +53,11 @@ class Market:
         except Exception as e:
             logging.error(f"{__class__.__name__}._orderbook_event exception: {e}")
 
+    @staticmethod
+    def _orderbook_events(events: list):
+        for event in events:
+            __class__._orderbook_event(event)
+
     @staticmethod
     def _order_event(event: dict):
         logging.debug(f"{__class__.__name__}._order_event: {event}")
@@ -79,6 +81,11 @@ class Market:
 
     @property
     def reports(self):
+        """Plots of the market, matplotlib and pandas are only imported on first use"""
+        if self._reports is None:
+            from synthetic_exchange.reports import Reports
+
+            self._reports = Reports(self._market_id)
         return self._reports
 
     @property
@@ -88,6 +95,19 @@ class Market:
     def orderbook(self, depth: int = -1) -> dict:
         return self._orderbook.orderbook(depth)
 
+    def bars(self, interval, names: list = None, current: bool = True) -> dict:
+        """{column name: array} of the OHLCV bars every interval seconds, the open one last with current,
+        none of the trades is read"""
+        retval = {}
+        try:
+            retval = self.transactions.bars.bars(interval, names, current)
+        except KeyError:
+            logging.error(f"{__class__.__name__}.bars {self._symbol} no bars every {interval} seconds")
+        return retval
+
+    def l2(self, depth: int = -1) -> dict:
+        return self._orderbook.l2(depth)
+
     @property
     def symbol(self):
         return self._symbol
@@ -117,14 +137,19 @@ class Market:
         return self._min_quantity
 
     def start(self, n=1000, clearAt=10000):
+        """Start the order book and the agents that run as processes of their own"""
         for _, agent in self._orderbook._transactions._agents.items():
-            agent.start()
-        self._orderbook.start()
+            if not agent.hosted:
+                agent.start()
+        if not self._orderbook.hosted:
+            self._orderbook.start()
 
     def stop(self):
-        self._orderbook.stop()
+        if not self._orderbook.hosted:
+            self._orderbook.stop()
         for _, agent in self._orderbook._transactions._agents.items():
-            agent.stop()
+            if not agent.hosted:
+                agent.stop()
 
     def clear(self):
         Order.active_buy_orders[self._id] = []
@@ -136,7 +161,7 @@ class Market:
     def show_transactions(self):
         logging.debug(f"{__class__.__name__}.show_transactions entry")
         try:
-            self._reports.show_transactions(self._orderbook.transactions)
+            self.reports.show_transactions(self._orderbook.transactions)
         except Exception as e:
             logging.error(f"{__class__.__name__}.show_transactions e: {e}")
         logging.debug(f"{__class__.__name__}.show_transactions exit")
@@ -144,29 +169,30 @@ class Market:
     def show_orderbook(self, depth: int = 10):
         logging.debug(f"{__class__.__name__}.show_orderbook entry")
         try:
-            self._reports.show_orderbook(self._orderbook, depth)
+            self.reports.show_orderbook(self._orderbook, depth)
         except Exception as e:
             logging.error(f"{__class__.__name__}.show_orderbook e: {e}")
         logging.debug(f"{__class__.__name__}.show_orderbook exit")
 
     def get_last_price(self):
         retval = None
-        if len(self._transactions.history) > 0:
-            retval = self._transactions.history[-1].price
+        trade = self.transactions.history.last()
+        if trade is not None:
+            retval = trade["price"]
         else:
             retval = self._max_price - self._min_price / 2.0
         return retval
 
     def get_buy_price(self) -> float:
         retval = 0.0
-        orders = self._orderbook.buy_orders()
+        orders = self._orderbook.buy_orders(1)
         if len(orders) > 0:
             retval = orders[0].price
         return retval
 
     def get_sell_price(self) -> float:
         retval = 0.0
-        orders = self._orderbook.sell_orders()
+        orders = self._orderbook.sell_orders(1)
         if len(orders) > 0:
             retval = orders[0].price
         return retval
@@ -7,13 +7,44 @@ import multiprocessing as mp
 
 
 class Order:
-    class State(enum.Enum):
+    class State(enum.IntEnum):
         Open = 0
         PartialFill = 1
         Fill = 2
         Cancel = 3
         Fail = 4
 
+    class Side(enum.IntEnum):
+        Buy = 0
+        Sell = 1
+
+        @classmethod
+        def parse(cls, value):
+            """Side code from a side name in any case ("BUY", "sell") or a code, None when invalid"""
+            if isinstance(value, str):
+                return _side_names.get(value.lower())
+            try:
+                return cls(value)
+            except ValueError:
+                return None
+
+    __slots__ = (
+        "id",
+        "market_id",
+        "agent_id",
+        "timestamp",
+        "symbol",
+        "side_code",
+        "price",
+        "quantity",
+        "remaining",
+        "ticks",
+        "lots",
+        "state",
+        "cancel",
+        "client_id",
+    )
+
     _last_id = itertools.count()
 
     def __init__(self, **kwargs):
@@ -21,42 +52,99 @@ class Order:
             self.state = __class__.State.Open
             self.market_id = kwargs.get("marketid")
             self.agent_id = kwargs.get("agentid")
-            if "timestamp" in kwargs:
-                val = kwargs.get("timestamp")
-                if isinstance(val, float):
-                    self.timestamp = val
-                elif isinstance(val, dt.datetime):
-                    self.timestamp = val.timestamp() * 1000
-                if isinstance(val, str):
-                    self.timestamp = float(val)
-            else:
-                self.timestamp = dt.datetime.utcnow().timestamp() * 1000  # ms
+            val = kwargs.get("timestamp")
+            self.timestamp = val if type(val) is float else __class__._timestamp(val)
             self.symbol = kwargs.get("symbol")
-            self.side = kwargs.get("side")
+            self.side_code = __class__.Side.parse(kwargs.get("side"))
             self.price = kwargs.get("price")
             self.quantity = kwargs.get("quantity")
             self.remaining = self.quantity
+            # Set by the book when it puts the order on its tick and lot grid
+            self.ticks = None
+            self.lots = None
             self.cancel = kwargs.get("cancel", False)
+            # The agent's own id of the order, echoed in its execution reports
+            self.client_id = kwargs.get("clientid")
             if self.cancel:
                 self.id = kwargs.get("orderid")
                 assert isinstance(self.id, int)
-                assert self.id > 0
+                assert self.id >= 0
             else:
                 self.id = next(__class__._last_id)
         except Exception as e:
             logging.error(f"{__class__.__name__}.__init__ exception: {e}")
 
+    @classmethod
+    def create(
+        cls, marketId: int, agentId: int, symbol: str, sideCode, price, quantity, timestamp: float, clientId: int = None
+    ) -> "Order":
+        """Fast path for orders the exchange builds itself, nothing is validated or converted:
+        sideCode is an Order.Side and timestamp is in milliseconds"""
+        order = cls.__new__(cls)
+        order.id = next(cls._last_id)
+        order.market_id = marketId
+        order.agent_id = agentId
+        order.timestamp = timestamp
+        order.symbol = symbol
+        order.side_code = sideCode
+        order.price = price
+        order.quantity = quantity
+        order.remaining = quantity
+        order.ticks = None
+        order.lots = None
+        order.state = cls.State.Open
+        order.cancel = False
+        order.client_id = clientId
+        return order
+
+    @classmethod
+    def reset_ids(cls, start: int = 0):
+        """Start the order ids of the process over from start, as a simulation does for its runs to repeat"""
+        cls._last_id = itertools.count(start)
+
+    @staticmethod
+    def _timestamp(val) -> float:
+        if val is None:
+            return dt.datetime.utcnow().timestamp() * 1000  # ms
+        if isinstance(val, dt.datetime):
+            return val.timestamp() * 1000
+        return float(val)
+
+    @property
+    def side(self) -> str:
+        return _side_labels[self.side_code] if self.side_code is not None else None
+
+    @side.setter
+    def side(self, value):
+        self.side_code = __class__.Side.parse(value)
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side_code == __class__.Side.Buy
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "market_id": self.market_id,
+            "agent_id": self.agent_id,
+            "timestamp": self.timestamp,
+            "symbol": self.symbol,
+            "side": self.side,
+            "price": self.price,
+            "quantity": self.quantity,
+            "remaining": self.remaining,
+            "cancel": self.cancel,
+            "id": self.id,
+        }
+
     def __str__(self):
-        retval = {}
-        for k, v in self.__dict__.items():
-            if k.lower() == "state":
-                retval[k] = v.name
-            elif k.lower() == "timestamp":
-                assert isinstance(v, float)
-                retval[k] = v
-            else:
-                retval[k] = v
+        retval = self.to_dict()
+        retval["state"] = self.state.name
         return str(retval)
 
     def __repr__(self):
         return self.__str__()
+
+
+_side_names = {"buy": Order.Side.Buy, "sell": Order.Side.Sell}
+_side_labels = ("BUY", "SELL")
@@ -1,10 +1,18 @@
 import enum
+import itertools
 import logging
+import math
 import multiprocessing as mp
 import operator
+import os
+import queue
+import time
+from synthetic_exchange.book import CompiledBook, DenseBook, DepthCache, PriceLevelBook, SelfTradePolicy, SnapshotBuffer
 from synthetic_exchange.order import Order
+from synthetic_exchange.tape import OrderTape
 from synthetic_exchange.transaction import Transaction, Transactions
-from synthetic_exchange.util import Event, Application
+from synthetic_exchange.transport import BinaryQueue, OrderRing
+from synthetic_exchange.util import Event, Application, default_manager
 
 
 class OrderEvent(enum.Enum):
@@ -13,32 +21,78 @@ class OrderEvent(enum.Enum):
     Cancel = 2
 
 
+class BookMode(enum.Enum):
+    # Book lives in the order book process, readers get published snapshots
+    Local = "local"
+    # Resting orders are also mirrored into Manager lists on every change
+    Shared = "shared"
+
+
+class BookBackend(enum.Enum):
+    # Sorted price levels, any price
+    Levels = "levels"
+    # Preallocated arrays over the market's [minPrice, maxPrice] band
+    Dense = "dense"
+    # Levels and queues in the C++ MatchingCore, "levels" when the extension isn't built
+    Compiled = "compiled"
+
+
 class OrderEvents:
-    """todo: Send dict or order type, update position & strategy classes"""
+    """todo: Send dict or order type, update position & strategy classes
+
+    Between begin_batch() and end_batch() events are held back, end_batch() emits them in
+    order to the per type subscribers and then once as a list to the batch subscribers.
+    Outside a batch every event is emitted right away, to batch subscribers as a list of one.
+    Depth updates only go to the depth subscribers, once per batch that moved the top of the book.
+    """
     def __init__(self):
         self.partial_fill = Event()
         self.fill = Event()
         self.cancel = Event()
+        self.batch = Event()
+        self.depth = Event()
+        self._pending = None
+
+    def begin_batch(self):
+        self._pending = []
+
+    def end_batch(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            for event, data in pending:
+                event.emit(data)
+            self.batch.emit([data for _, data in pending])
+
+    def _emit(self, event: Event, data: dict):
+        if self._pending is not None:
+            self._pending.append((event, data))
+        else:
+            event.emit(data)
+            self.batch.emit([data])
 
     def on_partial_fill(self, order: Order):
-        data = {"event": "partial_fill"}
-        data.update(order.__dict__)
-        self.partial_fill.emit(data)
+        data = order.to_dict()
+        data["event"] = "partial_fill"
+        self._emit(self.partial_fill, data)
 
     def on_fill(self, order: Order):
-        data = {"event": "fill"}
-        data.update(order.__dict__)
-        self.fill.emit(data)
+        data = order.to_dict()
+        data["event"] = "fill"
+        self._emit(self.fill, data)
 
     def on_cancel(self, order: Order):
-        data = {"event": "cancel"}
-        data.update(order.__dict__)
-        self.cancel.emit(data)
+        data = order.to_dict()
+        data["event"] = "cancel"
+        self._emit(self.cancel, data)
+
+    def on_depth(self, marketId: int, version: int, deltas: list):
+        self.depth.emit({"event": "depth", "market_id": marketId, "version": version, "deltas": deltas})
 
 
 class OrderBook(mp.Process):
-    _fields = ["price", "remaining", "timestamp", "id", "agent_id"]
     _max_size = 100
+    # DepthCache side by Order.Side
+    _depth_sides = ("bids", "asks")
 
     def __init__(self, *args, **kwargs):
         assert "marketId" in kwargs, f"{__class__.__name__} missing marketId"
@@ -50,20 +104,75 @@ class OrderBook(mp.Process):
         self._transactions = kwargs.get("transactions", None)
         self._wait = kwargs.get("wait", 30)
         self._queue = kwargs.get("queue", None)
+        self._mode = BookMode(kwargs.get("bookMode", BookMode.Local.value).lower())
+        self._snapshot_depth = kwargs.get("snapshotDepth", 100)
+        self._snapshot_interval = kwargs.get("snapshotInterval", 0.1)
+        # Orders matched per wake up, and how long to wait for a batch to fill up
+        self._batch_size = max(1, kwargs.get("batchSize", 64))
+        self._batch_latency = kwargs.get("batchLatency", 0.0)
 
         self._history = []
-        self._active_orders = []
-        self._active_buy_orders = mp.Manager().list()
-        self._active_sell_orders = mp.Manager().list()
-        self._history_initial_orders = {}
+        # Orders are normalized to integer ticks and lots on the way in
+        self._backend = BookBackend(kwargs.get("bookBackend", BookBackend.Levels.value).lower())
+        self._book = __class__._create_book(self._backend, **kwargs)
+        # Every order taken in, the last historyRetention of them in memory and the older ones in segments
+        # under spillDir, see ColumnTape
+        spill_dir = kwargs.get("spillDir", None)
+        self._order_history = OrderTape(
+            retention=kwargs.get("historyRetention", None),
+            spillPath=os.path.join(spill_dir, "orders") if spill_dir is not None else None,
+        )
+        # How readers outside the order book process see the book
+        self._active_buy_orders = None
+        self._active_sell_orders = None
+        self._snapshot = None
+        if self._mode == BookMode.Shared:
+            manager = kwargs.get("manager", None) or default_manager()
+            self._active_buy_orders = manager.list()
+            self._active_sell_orders = manager.list()
+        else:
+            self._snapshot = SnapshotBuffer()
+        self._snapshot_time = 0.0
+        self._dirty = False
+        # Last time the trades recorded by transactions were published
+        self._trades_time = 0.0
+        # Trades recorded since the last publish, the book doesn't go idle on them any more than on a snapshot
+        self._trades_pending = False
+        # Top snapshotDepth levels, brought up to date after every batch from the (side, ticks) it touched
+        self._depth = DepthCache(self._snapshot_depth)
+        self._depth_changes = set()
+        # orderbook() results by depth for one snapshot version, (version, {depth: dict})
+        self._orderbook_cache = (0, {})
 
         self._lock = mp.RLock()
         self._stop = mp.Event()
         self._cond = mp.Condition(self._lock)
         self._events = OrderEvents()
+        # Execution report channel of each agent by id, the reports of a batch go out together at its end
+        self._reports = kwargs.get("reports", None) or {}
+        self._pending_reports = {}
+        # Process driving the book with drain() when it doesn't run as a process of its own
+        self._host = None
 
         mp.Process.__init__(self)
 
+    @staticmethod
+    def _create_book(backend: BookBackend, **kwargs) -> PriceLevelBook:
+        book_kwargs = {
+            "tickSize": kwargs.get("tickSize", 1),
+            "lotSize": kwargs.get("lotSize", 1),
+            # What a match does when an agent's order reaches its own resting orders
+            "selfTradePolicy": SelfTradePolicy(kwargs.get("selfTradePolicy", SelfTradePolicy.Skip.value).lower()),
+        }
+        if backend == BookBackend.Dense:
+            assert "minPrice" in kwargs and "maxPrice" in kwargs, f"{__class__.__name__} dense book needs a price band"
+            return DenseBook(kwargs["minPrice"], kwargs["maxPrice"], **book_kwargs)
+        if backend == BookBackend.Compiled:
+            if CompiledBook.available():
+                return CompiledBook(**book_kwargs)
+            logging.warning(f"{__class__.__name__}._create_book matching extension not built, using the Python book")
+        return PriceLevelBook(**book_kwargs)
+
     @property
     def symbol(self):
         return self._symbol
@@ -76,53 +185,176 @@ class OrderBook(mp.Process):
     def transactions(self) -> Transactions:
         return self._transactions
 
+    @property
+    def order_history(self) -> OrderTape:
+        return self._order_history
+
+    @property
+    def mode(self) -> BookMode:
+        return self._mode
+
+    @property
+    def backend(self) -> BookBackend:
+        return self._backend
+
     @property
     def active_buy_orders(self) -> list:
-        return self._active_buy_orders
+        return self._active_buy_orders if self._mode == BookMode.Shared else self.buy_orders()
 
     @property
     def active_sell_orders(self) -> list:
-        return self._active_sell_orders
+        return self._active_sell_orders if self._mode == BookMode.Shared else self.sell_orders()
 
     @property
     def events(self):
         return self._events
 
+    @property
+    def reports(self) -> dict:
+        """Execution report channels by agent id, see ReportRing"""
+        return self._reports
+
+    @property
+    def book(self) -> PriceLevelBook:
+        return self._book
+
+    @property
+    def hosted(self) -> bool:
+        return self._host is not None
+
+    def set_host(self, host: mp.Process):
+        """Have host, a BookWorker, run the book rather than start(). Set before host starts, other
+        processes then read the book from its snapshots"""
+        self._host = host
+
+    def _is_live(self) -> bool:
+        """True when the matching book can be read directly, i.e. from the order book process or before it started"""
+        if self._host is not None:
+            return self._host.pid is None or mp.current_process() is self._host
+        return self.pid is None or mp.current_process() is self
+
+    @property
+    def snapshot_version(self) -> int:
+        return self._snapshot.version if self._snapshot is not None else 0
+
+    def snapshot(self) -> tuple:
+        """Last published (version, {"bids": [...], "asks": [...], "l2": {...}, "depth_version": int}),
+        at most snapshotDepth orders and levels a side. depth_version is the DepthCache version of l2"""
+        version, value = self._snapshot.read() if self._snapshot is not None else (0, None)
+        if value is None:
+            value = {"bids": [], "asks": [], "l2": {"bids": [], "asks": []}, "depth_version": 0}
+        return version, value
+
+    def depth(self, depth: int = -1) -> tuple:
+        """(version, {"bids": [(price, quantity), ...], "asks": [...]}) of the top snapshotDepth levels at
+        most, best first. Applying the depth events after version keeps the levels up to date"""
+        if self._is_live():
+            return self._depth.snapshot(depth)
+        if self._mode == BookMode.Local:
+            value = self.snapshot()[1]
+            levels = value["l2"] if depth < 0 else {side: items[:depth] for side, items in value["l2"].items()}
+            return value["depth_version"], levels
+        return 0, self.l2(depth if depth >= 0 else self._snapshot_depth)
+
     def buy_orders(self, depth: int = -1) -> list:
-        return sorted(self._active_buy_orders, key=operator.attrgetter("price"), reverse=False)[:depth]
+        """Resting bids, best (highest price) first"""
+        if self._is_live():
+            return self._book.bids.orders(depth)
+        if self._mode == BookMode.Local:
+            orders = self.snapshot()[1]["bids"]
+        else:
+            orders = sorted(self._active_buy_orders, key=operator.attrgetter("price"), reverse=True)
+        return list(orders) if depth < 0 else orders[:depth]
 
     def sell_orders(self, depth: int = -1) -> list:
-        return sorted(self._active_sell_orders, key=operator.attrgetter("price"), reverse=True)[:depth]
+        """Resting offers, best (lowest price) first"""
+        if self._is_live():
+            return self._book.asks.orders(depth)
+        if self._mode == BookMode.Local:
+            orders = self.snapshot()[1]["asks"]
+        else:
+            orders = sorted(self._active_sell_orders, key=operator.attrgetter("price"))
+        return list(orders) if depth < 0 else orders[:depth]
+
+    def l2(self, depth: int = -1) -> dict:
+        """Aggregated price levels, {"bids": [(price, quantity), ...], "asks": [...]}, best first"""
+        if self._is_live():
+            return self._book.l2(depth)
+        if self._mode == BookMode.Local:
+            l2 = self.snapshot()[1]["l2"]
+            return {side: levels if depth < 0 else levels[:depth] for side, levels in l2.items()}
+        return {
+            "bids": __class__._aggregate(self.buy_orders(), depth),
+            "asks": __class__._aggregate(self.sell_orders(), depth),
+        }
+
+    @staticmethod
+    def _aggregate(orders: list, depth: int) -> list:
+        retval = []
+        for price, group in itertools.groupby(orders, key=operator.attrgetter("price")):
+            if len(retval) == depth:
+                break
+            retval.append((price, sum(order.remaining for order in group)))
+        return retval
 
     def orderbook(self, depth: int = -1) -> dict:
-        buys, sells = [], []
-        buy_orders, sell_orders = self.buy_orders(depth), self.sell_orders(depth)
-        if len(buy_orders) > 0:
-            buys = [{k: v for (k, v) in item.__dict__.items() if k in __class__._fields} for item in buy_orders]
-            for item in buys:
-                item["quantity"] = item.pop("remaining")
-                item["timestamp"] = item["timestamp"]
-
-        if len(sell_orders) > 0:
-            sells = [{k: v for (k, v) in item.__dict__.items() if k in __class__._fields} for item in sell_orders]
-            for item in sells:
-                item["quantity"] = item.pop("remaining")
-                item["timestamp"] = item["timestamp"]
+        """Resting orders as dicts. Read from another process in Local mode the result is kept until the
+        next snapshot, and handed out again to every caller: it must not be modified"""
+        if self._is_live() or self._mode != BookMode.Local:
+            return self._orderbook(self.buy_orders(depth), self.sell_orders(depth))
+        version, value = self.snapshot()
+        cache_version, cache = self._orderbook_cache
+        if cache_version != version:
+            cache = {}
+            self._orderbook_cache = (version, cache)
+        retval = cache.get(depth)
+        if retval is None:
+            bids, asks = value["bids"], value["asks"]
+            if depth >= 0:
+                bids, asks = bids[:depth], asks[:depth]
+            retval = cache[depth] = self._orderbook(bids, asks)
+        return retval
 
+    def _orderbook(self, buyOrders: list, sellOrders: list) -> dict:
+        buys = [__class__._to_entry(item) for item in buyOrders]
+        sells = [__class__._to_entry(item) for item in sellOrders]
         retval = {"symbol": self._symbol, "bids": buys, "asks": sells}
         logging.debug(f"{__class__.__name__}.orderbook buys: {len(buys)} sell: {len(sells)}")
         return retval
 
+    @staticmethod
+    def _to_entry(order: Order) -> dict:
+        return {
+            "price": order.price,
+            "quantity": order.remaining,
+            "timestamp": order.timestamp,
+            "id": order.id,
+            "agent_id": order.agent_id,
+        }
+
     def start(self):
         mp.Process.start(self)
 
     def wait(self):
         mp.Process.wait(self)
 
-    def stop(self):
+    def stop(self, timeout: float = 5.0):
+        """Let the book's process publish and flush what it has and exit, terminated only when it
+        hasn't within timeout seconds"""
         with self._cond:
             self._stop.set()
-        mp.Process.terminate(self)
+        # An exchange stopped before it started
+        if self.pid is None:
+            return
+        try:
+            # Wakes a loop waiting for orders, one that finds the queue full is busy and sees the stop
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+        if self.is_alive():
+            logging.warning(f"{__class__.__name__}.stop book: {self._symbol} did not stop in {timeout}s")
+            mp.Process.terminate(self)
 
     def run(self):
         self._do_work()
@@ -134,236 +366,409 @@ class OrderBook(mp.Process):
             with self._cond:
                 if self._stop.is_set():
                     break
-            # order: Order = self._queue.get()
-            kwargs = self._queue.get()
-            order = None
-            if kwargs is not None:
-                order = Order(**kwargs)
-
-            if order is not None:
-                logging.debug(f"{__class__.__name__}.do_work {type(order)}: {order}")
-                if order.cancel:
-                    self._process_cancel(order, self._transactions)
-                else:
-                    self._history_initial_orders[order.id] = {
-                        "id": order.id,
-                        "market": self._market_id,
-                        "side": order.side,
-                        "price": order.price,
-                        "quantity": order.quantity,
-                    }
-                    if order.side.lower() == "buy":
-                        self._process_buy(order, self._transactions)
-                    elif order.side.lower() == "sell":
-                        self._process_sell(order, self._transactions)
-                    else:
-                        logging.error(f"{__class__.__name__}._do_work pid: {self.pid} invalid order side: {order.side}")
-
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                # Queue went quiet, publish what is pending
+                self._publish(force=True)
+                continue
+            self._process_batch(batch)
+
+        self.flush()
         logging.debug(f"{__class__.__name__}._do_work stopped")
 
+    def _next_batch(self) -> list:
+        """Block for the next message then take up to batchSize pending ones, waiting at most
+        batchLatency seconds for more to arrive. Raises queue.Empty when a snapshot is due."""
+        if isinstance(self._queue, (OrderRing, BinaryQueue)):
+            return self._next_ring_batch()
+        batch = [self._queue.get(timeout=self._wait_timeout())]
+        deadline = None
+        while len(batch) < self._batch_size:
+            # Messages already counted by the queue are taken with a plain blocking get, which
+            # skips the poll a non-blocking get pays for every message
+            pending = self._pending()
+            if pending > 0:
+                for _ in range(min(pending, self._batch_size - len(batch))):
+                    batch.append(self._queue.get())
+                continue
+            try:
+                if pending < 0:
+                    batch.append(self._queue.get_nowait())
+                    continue
+            except queue.Empty:
+                pass
+            try:
+                if self._batch_latency <= 0:
+                    break
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self._batch_latency
+                if now >= deadline:
+                    break
+                batch.append(self._queue.get(timeout=deadline - now))
+            except queue.Empty:
+                break
+        return batch
+
+    def _next_ring_batch(self) -> list:
+        """_next_batch for an OrderRing or a BinaryQueue, which hand over everything pending at once"""
+        batch = self._queue.get_many(self._batch_size, timeout=self._wait_timeout())
+        deadline = time.monotonic() + self._batch_latency
+        while len(batch) < self._batch_size:
+            try:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    batch += self._queue.get_many(self._batch_size - len(batch), block=False)
+                    break
+                batch += self._queue.get_many(self._batch_size - len(batch), timeout=wait)
+            except queue.Empty:
+                break
+        return batch
+
+    def _wait_timeout(self) -> float:
+        """Seconds to wait for the next message, forever unless a snapshot or trades are to be published"""
+        return self._snapshot_interval if self._dirty or self._trades_pending else None
+
+    def _pending(self) -> int:
+        """Messages waiting in the queue, -1 where the platform can't tell (macOS)"""
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:
+            return -1
+
+    def drain(self, maxOrders: int = -1) -> int:
+        """Match the orders waiting in the queue, batchSize at a time and at most maxOrders, without
+        blocking, returns how many were taken. For a caller driving the book from its own loop, a
+        Simulation or a BookWorker, rather than start()"""
+        count = 0
+        while maxOrders < 0 or count < maxOrders:
+            batch = self._take(self._batch_size if maxOrders < 0 else min(self._batch_size, maxOrders - count))
+            if not batch:
+                break
+            self._process_batch(batch)
+            count += len(batch)
+        return count
+
+    def _take(self, size: int) -> list:
+        """Up to size waiting orders, without blocking"""
+        get_many = getattr(self._queue, "get_many", None)
+        if get_many is not None:
+            try:
+                return get_many(size, block=False)
+            except queue.Empty:
+                return []
+        batch = []
+        try:
+            while len(batch) < size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def publish(self):
+        """Publish the top of the book now if it changed since the last snapshot, for a caller driving
+        the book with drain() once its queue went quiet"""
+        self._publish(force=True)
+
+    def flush(self):
+        """Publish the trades and wait for the history being sealed to disk, before the book's process exits"""
+        if self._transactions is not None:
+            self._transactions.publish()
+            self._transactions.flush()
+        self._order_history.flush()
+
+    def _process_batch(self, batch: list):
+        self._events.begin_batch()
+        try:
+            for kwargs in batch:
+                if kwargs is None:
+                    continue
+                if kwargs.get("amend", False):
+                    self._process_amend(kwargs)
+                else:
+                    self._process(Order(**kwargs))
+        finally:
+            self._events.end_batch()
+        self._send_reports()
+        self._update_depth()
+        self._publish()
+
+    def process(self, order: Order):
+        """Match one order outside of a batch"""
+        self._process(order)
+        self._send_reports()
+        self._update_depth()
+
+    def _process(self, order: Order):
+        if order.cancel:
+            self._process_cancel(order, self._transactions)
+        elif order.side_code is None or not self._book.normalize(order):
+            order.state = Order.State.Fail
+            logging.warning(f"{__class__.__name__}.process pid: {self.pid} rejected order: {order}")
+            return
+        else:
+            self._order_history.append(
+                order.id, order.agent_id, order.side_code, order.price, order.quantity, order.timestamp
+            )
+            if order.side_code == Order.Side.Buy:
+                self._process_buy(order, self._transactions)
+            else:
+                self._process_sell(order, self._transactions)
+        self._dirty = self._snapshot is not None
+
+    def _report(self, order: Order, event: str, price, quantity, remaining):
+        """Hold an execution report for the order's agent until the end of the batch"""
+        channel = self._reports.get(order.agent_id)
+        if channel is None:
+            return
+        reports = self._pending_reports.get(channel)
+        if reports is None:
+            reports = self._pending_reports[channel] = []
+        reports.append(
+            {
+                "event": event,
+                "market_id": self._market_id,
+                "agent_id": order.agent_id,
+                "id": order.id,
+                "client_id": order.client_id,
+                "side": order.side,
+                "price": price,
+                "quantity": quantity,
+                "remaining": remaining,
+                "timestamp": order.timestamp,
+            }
+        )
+
+    def _report_fill(self, order: Order, price, quantity, remaining):
+        self._report(order, "partial_fill" if remaining > 0 else "fill", price, quantity, remaining)
+
+    def _send_reports(self):
+        """Put the reports held back on their channels, each channel's at once. A slow agent process
+        doesn't hold up the book, what its channel has no room for is dropped"""
+        if not self._pending_reports:
+            return
+        now = time.time()
+        for channel, reports in self._pending_reports.items():
+            for report in reports:
+                report["time"] = now
+            try:
+                channel.put_many(reports, block=False)
+            except queue.Full:
+                logging.warning(f"{__class__.__name__}._send_reports market: {self._market_id} channel full")
+        self._pending_reports.clear()
+
+    def _update_depth(self):
+        """Bring the depth cache up to date with the levels touched since the last call, and emit the deltas"""
+        if not self._depth_changes:
+            return
+        book, levels = self._book, []
+        ladders = (book.bids, book.asks)
+        for side_code, ticks in self._depth_changes:
+            level = ladders[side_code].level(ticks)
+            quantity = book.quantity(level.lots) if level is not None else 0
+            levels.append((__class__._depth_sides[side_code], book.price(ticks), quantity))
+        self._depth_changes.clear()
+        deltas = self._depth.change(levels, lambda: book.l2(self._depth.depth))
+        if deltas:
+            self._events.on_depth(self._market_id, self._depth.version, deltas)
+
+    def _publish(self, force: bool = False):
+        """Publish the top of the book and the new trades for other processes, at most once per
+        snapshotInterval unless forced"""
+        now = time.monotonic()
+        if self._transactions is not None and (force or now - self._trades_time >= self._snapshot_interval):
+            self._transactions.publish()
+            self._trades_time = now
+            self._trades_pending = False
+        if not self._dirty:
+            return
+        if not force and now - self._snapshot_time < self._snapshot_interval:
+            return
+        depth_version, l2 = self._depth.snapshot()
+        self._snapshot.publish(
+            {
+                "bids": self._book.bids.orders(self._snapshot_depth),
+                "asks": self._book.asks.orders(self._snapshot_depth),
+                "l2": l2,
+                "depth_version": depth_version,
+            }
+        )
+        self._snapshot_time = now
+        self._dirty = False
+
     def _process_cancel(self, order: Order, transactions: Transactions):
-        # logging.debug(f"{__class__.__name__}._process_cancel order: {order} size: {transactions.size} entry")
-        logging.debug(f"{__class__.__name__}._process_cancel order: {order} entry")
-
-        result = False
-        if order.side.lower() == "buy":
-            result = self._remove_bid(order)
-        elif order.side.lower() == "sell":
-            result = self._remove_offer(order)
-        if result:
-            self._events.on_cancel(order)
+        logging.debug(f"{__class__.__name__}._process_cancel order: {order.id} entry")
+
+        cancelled = None
+        if order.side_code == Order.Side.Buy:
+            cancelled = self._remove_bid(order)
+        elif order.side_code == Order.Side.Sell:
+            cancelled = self._remove_offer(order)
+        if cancelled is not None:
+            self._depth_changes.add((cancelled.side_code, cancelled.ticks))
+            cancelled.state = Order.State.Cancel
+            self._events.on_cancel(cancelled)
+            self._report(cancelled, "cancel", cancelled.price, cancelled.remaining, 0.0)
         else:
             logging.warning(f"{__class__.__name__}._process_cancel pid: {self.pid} fail order: {order}")
 
-        # logging.debug(f"{__class__.__name__}._process_cancel order: {order} size: {transactions.size} exit")
+    def _process_amend(self, kwargs: dict):
+        """Bring a resting order down to the quantity of an amend, it keeps its queue position. Reported
+        to its agent as a cancel of what was taken off"""
+        order = self._book.find(kwargs.get("orderid"), kwargs.get("side"))
+        quantity = kwargs.get("quantity")
+        if order is None or quantity is None or quantity >= order.remaining:
+            logging.warning(f"{__class__.__name__}._process_amend pid: {self.pid} fail amend: {kwargs}")
+            return
+        # The target on the lot grid, an amend within the last lot changes nothing
+        target = math.floor(quantity / self._book.lot_size + PriceLevelBook._epsilon)
+        if order.lots - target <= 0:
+            return
+        remaining = order.remaining
+        self._book.reduce(order.id, self._book.quantity(order.lots - target))
+        self._depth_changes.add((order.side_code, order.ticks))
+        orders = self._active_buy_orders if order.side_code == Order.Side.Buy else self._active_sell_orders
+        if order.remaining <= 0:
+            order.state = Order.State.Cancel
+            self._mirror_remove(orders, order)
+        else:
+            self._mirror_update(orders, order)
+        self._report(order, "cancel", order.price, remaining - order.remaining, order.remaining)
+        self._dirty = self._snapshot is not None
 
     def _process_buy(self, order: Order, transactions: Transactions):
-        # logging.debug(f"{__class__.__name__}._process_buy {order} size: {transactions.size} entry")
-        logging.debug(f"{__class__.__name__}._process_buy {order} entry")
+        logging.debug(f"{__class__.__name__}._process_buy order: {order.id} entry")
 
         assert isinstance(order, Order)
-        assert order.side.lower() == "buy"
+        assert order.side_code == Order.Side.Buy
         market_id = order.market_id
-        remaining_quantity = order.quantity
-        while True:
-            active_sell_orders = [item for item in self._active_sell_orders if item.agent_id != order.agent_id]
-            if len(active_sell_orders) > 0:
-                sell_orders = sorted(active_sell_orders, key=operator.attrgetter("price"))
-                best_offer: Order = sell_orders[0]
-                if order.price >= best_offer.price:
-                    transaction_price = best_offer.price
-                    if remaining_quantity > best_offer.quantity:
-                        transaction_quantity = best_offer.quantity
-                        # Transaction(order, best_offer, market_id, transaction_price, transaction_quantity)
-                        if transactions is not None:
-                            _ = transactions.create(
-                                order, best_offer, market_id, transaction_price, transaction_quantity
-                            )
-                            assert len(transactions.transactions) > 0
-                        self._remove_offer(best_offer)
-                        remaining_quantity -= transaction_quantity
-                        logging.debug(
-                            f"{__class__.__name__}._process_buy pid: {self.pid} order: {order.id} "
-                            f"partial fill remaining quantity: {remaining_quantity}"
-                        )
-                        order.remaining = remaining_quantity
-                        self._events.on_partial_fill(order)
-                        # Find next best offer
-                    elif remaining_quantity == best_offer.quantity:
-                        transaction_quantity = best_offer.quantity
-                        # Transaction(order, best_offer, market_id, transaction_price, transaction_quantity)
-                        if transactions is not None:
-                            _ = transactions.create(
-                                order, best_offer, market_id, transaction_price, transaction_quantity
-                            )
-                            assert len(transactions.transactions) > 0
-                        self._remove_offer(best_offer)
-                        logging.debug(
-                            f"{__class__.__name__}._process_buy pid: {self.pid} order: {order.id} executed "
-                            f"order quantity == offer quantity"
-                        )
-                        order.remaining = 0
-                        self._events.on_fill(order)
-                        break
-                    else:
-                        transaction_quantity = remaining_quantity
-                        # Transaction(order, best_offer, market_id, transaction_price, transaction_quantity)
-                        if transactions is not None:
-                            _ = transactions.create(
-                                order, best_offer, market_id, transaction_price, transaction_quantity
-                            )
-                            assert len(transactions.transactions) > 0
-                        self._reduce_offer(best_offer, transaction_quantity)
-                        logging.debug(
-                            f"{__class__.__name__}._process_buy pid: {self.pid} order: {order.id} executed "
-                            f"order quantity < best offer quantity"
-                        )
-                        order.remaining = 0
-                        self._events.on_fill(order)
-                        break
-                else:
-                    logging.debug(
-                        f"{__class__.__name__}._process_buy pid: {self.pid} bid price < best offer, no transaction"
-                    )
-                    order.quantity = remaining_quantity
-                    self._active_orders.append(order)
-                    self._active_buy_orders.append(order)
-                    break
-            else:
-                logging.debug(f"{__class__.__name__}._process_buy pid: {self.pid} no active sell orders, no transaction")
-                order.quantity = remaining_quantity
-                self._active_orders.append(order)
+        remaining_quantity = order.remaining
+        cancelled = []
+        for best_offer, transaction_price, transaction_quantity in self._book.match(order, cancelled):
+            if transactions is not None:
+                _ = transactions.create(order, best_offer, market_id, transaction_price, transaction_quantity)
+                self._trades_pending = True
+            self._reduce_offer(best_offer)
+            self._depth_changes.add((Order.Side.Sell, best_offer.ticks))
+            remaining_quantity -= transaction_quantity
+            self._on_execution(order, remaining_quantity)
+            if self._reports:
+                self._report_fill(order, transaction_price, transaction_quantity, remaining_quantity)
+                self._report_fill(best_offer, transaction_price, transaction_quantity, best_offer.remaining)
+        if cancelled:
+            self._on_self_trade(order, cancelled)
+
+        if order.remaining > 0 and order.state != Order.State.Cancel:
+            logging.debug(f"{__class__.__name__}._process_buy pid: {self.pid} {order.id} rests {order.remaining}")
+            self._book.add(order)
+            self._depth_changes.add((Order.Side.Buy, order.ticks))
+            if self._active_buy_orders is not None:
                 self._active_buy_orders.append(order)
-                break
 
-        logging.debug(f"{__class__.__name__}._process_buy active: {self._active_buy_orders} exit")
+        logging.debug(f"{__class__.__name__}._process_buy bids: {len(self._book.bids)} exit")
 
     def _process_sell(self, order: Order, transactions: Transactions):
-        # logging.debug(f"{__class__.__name__}._process_sell {order} tx size: {transactions.size} entry")
-        logging.debug(f"{__class__.__name__}._process_sell {order} entry")
+        logging.debug(f"{__class__.__name__}._process_sell order: {order.id} entry")
 
-        assert order.side.lower() == "sell"
+        assert order.side_code == Order.Side.Sell
         assert order.market_id == self._market_id
         market_id = order.market_id
-        remaining_quantity = order.quantity
-        while True:
-            active_buy_orders = [item for item in self._active_buy_orders if item.agent_id != order.agent_id]
-            if len(active_buy_orders) > 0:
-                buy_orders = sorted(active_buy_orders, key=operator.attrgetter("price"))
-                best_bid: Order = buy_orders[0]
-                if order.price >= best_bid.price:
-                    transaction_price = best_bid.price
-                    if remaining_quantity > best_bid.quantity:
-                        transaction_quantity = best_bid.quantity
-                        if transactions is not None:
-                            _ = transactions.create(best_bid, order, market_id, transaction_price, transaction_quantity)
-                        self._remove_bid(best_bid)
-                        remaining_quantity -= transaction_quantity
-                        logging.debug(
-                            f"{__class__.__name__}._process_sell pid: {self.pid} order: {order.id} "
-                            f"partial fill remaining quantity: {remaining_quantity}"
-                        )
-                        order.remaining = remaining_quantity
-                        order.state = Order.State.PartialFill
-                        self._events.on_partial_fill(order)
-                        # Find next best offer
-                    elif remaining_quantity == best_bid.quantity:
-                        transaction_quantity = best_bid.quantity
-                        if transactions is not None:
-                            _ = transactions.create(best_bid, order, market_id, transaction_price, transaction_quantity)
-                        self._remove_bid(best_bid)
-                        logging.debug(
-                            f"{__class__.__name__}._process_sell pid: {self.pid} order: {order.id} executed "
-                            f"order quantity == offer quantity"
-                        )
-                        order.remaining = 0
-                        order.state = Order.State.Fill
-                        self._events.on_fill(order)
-                        break
-                    else:
-                        transaction_quantity = remaining_quantity
-                        if transactions is not None:
-                            _ = transactions.create(best_bid, order, market_id, transaction_price, transaction_quantity)
-                        self._reduce_bid(best_bid, transaction_quantity)
-                        logging.debug(
-                            f"{__class__.__name__}._process_sell pid: {self.pid} order: {order.id} executed "
-                            f"order quantity < best bid quantity"
-                        )
-                        order.remaining = 0
-                        order.state = Order.State.Fill
-                        self._events.on_fill(order)
-                        break
-                else:
-                    logging.debug(
-                        f"{__class__.__name__}._process_sell pid: {self.pid} offer price > best bid, no transaction"
-                    )
-                    order.quantity = remaining_quantity
-                    self._active_orders.append(order)
-                    self._active_sell_orders.append(order)
-                    break
-            else:
-                logging.debug(f"{__class__.__name__}._process_sell pid: {self.pid} no active buy orders, no transaction")
-                order.quantity = remaining_quantity
-                self._active_orders.append(order)
+        remaining_quantity = order.remaining
+        cancelled = []
+        for best_bid, transaction_price, transaction_quantity in self._book.match(order, cancelled):
+            if transactions is not None:
+                _ = transactions.create(best_bid, order, market_id, transaction_price, transaction_quantity)
+                self._trades_pending = True
+            self._reduce_bid(best_bid)
+            self._depth_changes.add((Order.Side.Buy, best_bid.ticks))
+            remaining_quantity -= transaction_quantity
+            self._on_execution(order, remaining_quantity)
+            if self._reports:
+                self._report_fill(order, transaction_price, transaction_quantity, remaining_quantity)
+                self._report_fill(best_bid, transaction_price, transaction_quantity, best_bid.remaining)
+        if cancelled:
+            self._on_self_trade(order, cancelled)
+
+        if order.remaining > 0 and order.state != Order.State.Cancel:
+            logging.debug(f"{__class__.__name__}._process_sell pid: {self.pid} {order.id} rests {order.remaining}")
+            self._book.add(order)
+            self._depth_changes.add((Order.Side.Sell, order.ticks))
+            if self._active_sell_orders is not None:
                 self._active_sell_orders.append(order)
-                break
 
-        logging.debug(f"{__class__.__name__}._process_sell active: {self._active_sell_orders} exit")
-
-    def _remove_offer(self, offer: Order) -> bool:
-        retval = False
-        for i, order in enumerate(self._active_sell_orders):
-            if order.id == offer.id:
-                logging.debug(f"{__class__.__name__}._remove_offer pid: {self.pid} order id: {offer.id}")
-                del self._active_sell_orders[i]
-                retval = True
-                break
-        return retval
+        logging.debug(f"{__class__.__name__}._process_sell asks: {len(self._book.asks)} exit")
 
-    def _reduce_offer(self, offer: Order, transactionQuantity: int):
-        for i, order in enumerate(self._active_sell_orders):
-            if order.id == offer.id:
-                if self._active_sell_orders[i].quantity == transactionQuantity:
-                    self._remove_offer(offer)
+    def _on_execution(self, order: Order, remaining: float):
+        """Emit the event for one execution of an incoming order, remaining is its quantity left after it"""
+        final_remaining = order.remaining
+        order.remaining = remaining
+        if remaining > 0:
+            order.state = Order.State.PartialFill
+            self._events.on_partial_fill(order)
+        else:
+            order.state = Order.State.Fill
+            self._events.on_fill(order)
+        order.remaining = final_remaining
+
+    def _on_self_trade(self, order: Order, cancelled: list):
+        """Publish the orders the self-trade policy cancelled while order was matched, order itself
+        or resting orders the book already took off"""
+        for cancelled_order in cancelled:
+            if cancelled_order is not order:
+                if cancelled_order.side_code == Order.Side.Buy:
+                    self._mirror_remove(self._active_buy_orders, cancelled_order)
                 else:
-                    self._active_orders[i].quantity -= transactionQuantity
-                break
-
-    def _remove_bid(self, bid: Order) -> bool:
-        retval = False
-        for i, order in enumerate(self._active_buy_orders):
-            if order.id == bid.id:
-                logging.debug(f"{__class__.__name__}._remove_bid pid: {self.pid} order id: {bid.id}")
-                del self._active_buy_orders[i]
-                retval = True
+                    self._mirror_remove(self._active_sell_orders, cancelled_order)
+                self._depth_changes.add((cancelled_order.side_code, cancelled_order.ticks))
+            cancelled_order.state = Order.State.Cancel
+            self._events.on_cancel(cancelled_order)
+            self._report(cancelled_order, "cancel", cancelled_order.price, cancelled_order.remaining, 0.0)
+
+    def _remove_offer(self, offer: Order) -> Order:
+        order = self._book.cancel(offer.id, Order.Side.Sell)
+        if order is None:
+            return None
+        logging.debug(f"{__class__.__name__}._remove_offer pid: {self.pid} order id: {offer.id}")
+        self._mirror_remove(self._active_sell_orders, order)
+        return order
+
+    def _reduce_offer(self, offer: Order):
+        """Publish a traded offer, the book has already reduced or removed it"""
+        if offer.remaining <= 0:
+            self._mirror_remove(self._active_sell_orders, offer)
+        else:
+            self._mirror_update(self._active_sell_orders, offer)
+
+    def _remove_bid(self, bid: Order) -> Order:
+        order = self._book.cancel(bid.id, Order.Side.Buy)
+        if order is None:
+            return None
+        logging.debug(f"{__class__.__name__}._remove_bid pid: {self.pid} order id: {bid.id}")
+        self._mirror_remove(self._active_buy_orders, order)
+        return order
+
+    def _reduce_bid(self, bid: Order):
+        """Publish a traded bid, the book has already reduced or removed it"""
+        if bid.remaining <= 0:
+            self._mirror_remove(self._active_buy_orders, bid)
+        else:
+            self._mirror_update(self._active_buy_orders, bid)
+
+    @staticmethod
+    def _mirror_remove(orders: list, order: Order):
+        if orders is None:
+            return
+        for i, item in enumerate(orders):
+            if item.id == order.id:
+                del orders[i]
                 break
-        return retval
 
-    def _reduce_bid(self, bid: Order, transactionQuantity: int):
-        for i, order in enumerate(self._active_buy_orders):
-            if order.id == bid.id:
-                if self._active_buy_orders[i].quantity == transactionQuantity:
-                    self._remove_bid(bid)
-                else:
-                    self._active_orders[i].quantity -= transactionQuantity
+    @staticmethod
+    def _mirror_update(orders: list, order: Order):
+        if orders is None:
+            return
+        for i, item in enumerate(orders):
+            if item.id == order.id:
+                orders[i] = order
                 break
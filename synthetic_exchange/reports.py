@@ -1,9 +1,6 @@
 import logging
-import multiprocessing as mp
-import operator
 
 import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
 
 from synthetic_exchange.orderbook import OrderBook
@@ -23,12 +20,11 @@ class Reports:
 
     def show_transactions(self, transactions: Transactions):
         assert isinstance(transactions, Transactions)
-        if len(transactions.history_list) < 0:
+        if transactions.size == 0:
             logging.warning(f"{__class__.__name__}.show_transactions no history")
             return
 
-        data = np.array(transactions.history_list)
-        df = pd.DataFrame(data, columns=["id", "time", "price"])
+        df = pd.DataFrame(transactions.history.columns(["id", "price"]))
         df["volatility"] = df["price"].rolling(_Config.vol_period).std()
         df["volatilityTrend"] = df["volatility"].rolling(_Config.trend_period).mean()
         df = df[["id", "price", "volatility", "volatilityTrend"]]
@@ -56,40 +52,21 @@ class Reports:
         axs[0, 1].set_title("Volatility")
         axs[0, 1].legend()
 
-        # 1. Plot positions
-        # assert isinstance(transactions.agents, Agents)
-        # assert isinstance(transactions.agents.agents, dict)
-        # assert len(transactions.agents.agents) > 0
-
-        # print(f"{__class__.__name__}.show_transactions history_market_agent: {transactions.history_market_agent}")
+        # 3. Plot positions and 4. running profit, sampled by the ledger
+        ledger = transactions.ledger
         for i, a in transactions.agents.items():
-            # data = transactions.history_market_agent(a.id, a.name)
-            data = transactions.history_market_agent(a.id, a.name)
-            if len(data) > 0:
-                right = pd.DataFrame(data, columns=["id", a.name, str(a.name) + "RunningProfit"])
-                right = right.set_index("id")
-                right = right[a.name]
-                axs[1, 0].plot(right, label=str(a.name))
+            data = ledger.history(a.id, ["trade_id", "position", "realized"])
+            if len(data["trade_id"]) > 0:
+                axs[1, 0].plot(data["trade_id"], data["position"], label=str(a.name))
+                axs[1, 1].plot(data["trade_id"], data["realized"], label=str(a.name) + "RunningProfit")
             else:
                 logging.warning(f"{__class__.__name__}.show_transactions no data for agent: {a.name}")
         axs[1, 0].set_title("Positions")
+        axs[1, 1].set_title("Running profit")
 
-        if transactions.agents.size < 20:
+        if len(transactions.agents) < 20:
             axs[1, 0].legend()
 
-        # 3. Plot profit
-        for i, a in transactions.agents.items():
-            data = transactions.history_market_agent(a.id, a.name)
-            assert isinstance(data, list)
-            if len(data) > 0:
-                right = pd.DataFrame(data, columns=["id", a.name, str(a.name) + "RunningProfit"])
-                right = right.set_index("id")
-                right = right[str(a.name) + "RunningProfit"]
-                axs[1, 1].plot(right, label=str(a.name) + "RunningProfit")
-            else:
-                logging.warning(f"{__class__.__name__}.show_transactions no data for agent: {a.name}")
-        axs[1, 1].set_title("Running profit")
-
         if self._show:
             plt.show()
         else:
@@ -101,24 +78,21 @@ class Reports:
     def show_orderbook(self, ob: OrderBook, depth: int = 10):
         logging.debug(f"{__class__.__name__}.show_orderbook entry")
         width = len("0       Bert    Buy     33      5")
-        assert isinstance(ob.active_sell_orders, mp.managers.ListProxy)
-        assert isinstance(ob.active_buy_orders, mp.managers.ListProxy)
 
         print(width * 1 * "*" + "Active Sell Orders" + width * 1 * "*")
-        if len(ob.active_sell_orders) > 0:
-            sell_orders = sorted(ob.active_sell_orders, key=operator.attrgetter("price"), reverse=True)[:depth]
-            for order in sell_orders:
-                # print(width * "." + " " + str(order))
+        sell_orders = ob.sell_orders(depth)
+        if len(sell_orders) > 0:
+            # Best offer printed last, next to the best bid
+            for order in reversed(sell_orders):
                 print(str(order))
         else:
             logging.warning(f"{__class__.__name__}.show_orderbook no active sell orders")
         print(width * 1 * "*" + "Active Sell Orders" + width * 1 * "*")
 
         print(width * 1 * "*" + "Active Buy Orders" + width * 1 * "*")
-        if len(ob.active_buy_orders) > 0:
-            buy_orders = sorted(ob.active_buy_orders, key=operator.attrgetter("price"), reverse=False)[:depth]
+        buy_orders = ob.buy_orders(depth)
+        if len(buy_orders) > 0:
             for order in buy_orders:
-                # print(str(order) + " " + width * ".")
                 print(str(order))
         else:
             logging.warning(f"{__class__.__name__}.show_orderbook no active buy orders")
@@ -0,0 +1,136 @@
+import enum
+import logging
+import multiprocessing as mp
+import os
+import time
+
+
+class Placement(enum.Enum):
+    # Books go to the workers in turn, in the order they were added
+    RoundRobin = "round_robin"
+    # Busiest books first, each to the worker with the lowest message rate so far
+    Weighted = "weighted"
+
+
+class BookWorker(mp.Process):
+    """Process running several order books, taking turns to drain their queues.
+
+    A book takes at most budget orders a turn so a busy market can't hold up the others. When a
+    round finds every queue empty the worker publishes the books that changed and sleeps, a little
+    longer each quiet round up to maxIdle seconds.
+    """
+
+    _min_idle = 5e-5
+
+    def __init__(self, orderbooks: list, cpus: list = None, budget: int = 256, maxIdle: float = 1e-3):
+        self._orderbooks = list(orderbooks)
+        self._cpus = cpus
+        self._budget = budget
+        self._max_idle = maxIdle
+        self._stop = mp.Event()
+        mp.Process.__init__(self)
+        for orderbook in self._orderbooks:
+            orderbook.set_host(self)
+
+    @property
+    def orderbooks(self) -> list:
+        return self._orderbooks
+
+    @property
+    def cpus(self) -> list:
+        return self._cpus
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        if self._cpus:
+            os.sched_setaffinity(0, self._cpus)
+        market_ids = [orderbook.market_id for orderbook in self._orderbooks]
+        logging.debug(f"{__class__.__name__}.run markets: {market_ids} cpus: {self._cpus}")
+        idle = 0.0
+        while not self._stop.is_set():
+            taken = 0
+            for orderbook in self._orderbooks:
+                taken += orderbook.drain(self._budget)
+            if taken > 0:
+                idle = 0.0
+                continue
+            if idle == 0.0:
+                for orderbook in self._orderbooks:
+                    orderbook.publish()
+            idle = min(max(2 * idle, __class__._min_idle), self._max_idle)
+            time.sleep(idle)
+        for orderbook in self._orderbooks:
+            orderbook.flush()
+        logging.debug(f"{__class__.__name__}.run stopped")
+
+
+class BookScheduler:
+    """Places the order books of an exchange on a fixed number of BookWorker processes.
+
+    Books are added with their expected message rate and placed when the scheduler starts, see
+    Placement. With affinity, worker i is pinned to the i-th of the given CPUs, or of the CPUs
+    this process may run on when affinity is True, wrapping around when there are fewer CPUs.
+    """
+
+    def __init__(self, workers: int = None, placement=Placement.RoundRobin, affinity=False, budget: int = 256):
+        self._workers_count = workers or os.cpu_count() or 1
+        self._placement = Placement(placement)
+        self._affinity = affinity
+        self._budget = budget
+        # (orderbook, messages a second) in the order added
+        self._orderbooks = []
+        self._workers = []
+
+    @property
+    def placement(self) -> Placement:
+        return self._placement
+
+    @property
+    def workers(self) -> list:
+        return self._workers
+
+    def add(self, orderbook, rate: float = 1.0):
+        assert not self._workers, f"{__class__.__name__}.add scheduler already started"
+        self._orderbooks.append((orderbook, rate))
+
+    def place(self) -> list:
+        """Order books of each worker, workers left without books are dropped"""
+        count = min(self._workers_count, len(self._orderbooks))
+        groups = [[] for _ in range(count)]
+        if self._placement == Placement.RoundRobin:
+            for i, (orderbook, _) in enumerate(self._orderbooks):
+                groups[i % count].append(orderbook)
+            return groups
+        loads = [0.0] * count
+        for orderbook, rate in sorted(self._orderbooks, key=lambda item: -item[1]):
+            i = min(range(count), key=loads.__getitem__)
+            groups[i].append(orderbook)
+            loads[i] += rate
+        return groups
+
+    def start(self):
+        """Place the books and start their workers, before the markets start"""
+        cpus = self._cpus()
+        for i, orderbooks in enumerate(self.place()):
+            worker_cpus = [cpus[i % len(cpus)]] if cpus else None
+            self._workers.append(BookWorker(orderbooks, cpus=worker_cpus, budget=self._budget))
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        for worker in self._workers:
+            worker.stop()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                logging.warning(f"{__class__.__name__}.stop worker: {worker.pid} did not stop, terminating")
+                worker.terminate()
+
+    def _cpus(self) -> list:
+        if not self._affinity:
+            return []
+        if self._affinity is True:
+            return sorted(os.sched_getaffinity(0))
+        return list(self._affinity)
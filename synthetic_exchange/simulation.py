@@ -0,0 +1,119 @@
+import logging
+
+import numpy as np
+
+from synthetic_exchange.detail.clock import Clock, ClockMode, TimeIterator
+from synthetic_exchange.order import Order
+from synthetic_exchange.strategy.execution import ExecutionReceiver
+from synthetic_exchange.transport import LocalQueue
+
+
+class AgentIterator(TimeIterator):
+    """Steps an agent every interval seconds of simulated time, the first time on the first tick"""
+
+    def __init__(self, agent):
+        TimeIterator.__init__(self)
+        assert agent.interval > 0, f"{__class__.__name__} agent: {agent.id} invalid interval: {agent.interval}"
+        self._agent = agent
+        self._next_time = None
+
+    @property
+    def agent(self):
+        return self._agent
+
+    def tick(self, timestamp: float):
+        TimeIterator.tick(self, timestamp)
+        if self._next_time is None:
+            self._next_time = timestamp
+        while self._next_time <= timestamp:
+            self._agent.step(self._next_time)
+            self._next_time += self._agent.interval
+
+
+class OrderBookIterator(TimeIterator):
+    """Matches the orders sent to a book since the last tick"""
+
+    def __init__(self, orderbook):
+        TimeIterator.__init__(self)
+        self._orderbook = orderbook
+
+    @property
+    def orderbook(self):
+        return self._orderbook
+
+    def tick(self, timestamp: float):
+        TimeIterator.tick(self, timestamp)
+        self._orderbook.drain()
+
+
+class ExecutionIterator(TimeIterator):
+    """Hands the agents the execution reports of the orders matched this tick"""
+
+    def __init__(self, receiver: ExecutionReceiver):
+        TimeIterator.__init__(self)
+        self._receiver = receiver
+
+    def tick(self, timestamp: float):
+        TimeIterator.tick(self, timestamp)
+        self._receiver.receive()
+
+
+class Simulation:
+    """Agents and order books run in the caller's process by a backtest Clock, as fast as it goes.
+
+    Every tick the agents that are due send their orders, in the order they were added, then every
+    book matches what it was sent and the agents get the execution reports of their orders, from
+    books given the reports channel. Nothing waits on the wall clock, and with every agent seeded
+    from agent_seed() and the order ids counted from 0 a run gives the same orders and trades each
+    time.
+    """
+
+    def __init__(self, seed: int = 0, startTime: float = 0.0, endTime: float = 0.0, tickSize: float = 1.0):
+        self._seed = seed
+        self._clock = Clock(ClockMode.Backtest, tickSize, startTime, endTime)
+        self._agents = []
+        self._orderbooks = []
+        self._receiver = ExecutionReceiver(LocalQueue())
+        self._started = False
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def clock(self) -> Clock:
+        return self._clock
+
+    @property
+    def reports(self) -> LocalQueue:
+        """Execution report channel of the simulation's agents"""
+        return self._receiver.channel
+
+    @property
+    def current_timestamp(self) -> float:
+        return self._clock.current_timestamp
+
+    def agent_seed(self, marketId: int, agentId: int) -> int:
+        """Seed of one agent's random streams, derived from the simulation seed"""
+        return int(np.random.SeedSequence([self._seed, marketId, agentId]).generate_state(1)[0])
+
+    def add_agent(self, agent):
+        assert not self._started, f"{__class__.__name__}.add_agent simulation already started"
+        self._agents.append(AgentIterator(agent))
+        self._receiver.add(agent)
+
+    def add_orderbook(self, orderbook):
+        assert not self._started, f"{__class__.__name__}.add_orderbook simulation already started"
+        self._orderbooks.append(OrderBookIterator(orderbook))
+
+    def run(self, endTime: float = None):
+        """Advance to endTime, the simulation's end by default. Can be called again to carry on"""
+        if not self._started:
+            # Order ids from 0, the same in every run of the simulation
+            Order.reset_ids()
+            # Agents first, a book then matches the orders of the tick they were sent in
+            for iterator in self._agents + self._orderbooks + [ExecutionIterator(self._receiver)]:
+                self._clock.add_iterator(iterator)
+            self._started = True
+        logging.debug(f"{__class__.__name__}.run from: {self._clock.current_timestamp} to: {endTime}")
+        self._clock.backtest_til(endTime)
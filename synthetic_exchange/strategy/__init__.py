@@ -3,4 +3,5 @@ import logging
 from .position import Position
 from .random_normal import RandomNormal
 from .random_uniform import RandomUniform
+from .runtime import AgentPool, AgentRuntime, Runtime
 from .strategy import Strategy
@@ -1,23 +1,67 @@
+import collections
+import datetime as dt
 import itertools
+import logging
 import multiprocessing as mp
-from synthetic_exchange.util import Application
+import queue
+import random
+import threading
+
+import numpy as np
+
+from synthetic_exchange.order import Order
+from synthetic_exchange.strategy.execution import ExecutionReceiver
+from synthetic_exchange.util import Application, default_manager
 
 
 class Agent(Application):
 	_last_id = itertools.count()
+	_flow_counters = ["sent", "throttled", "coalesced", "dropped"]
 
 	def __init__(self, *args, **kwargs):
 		self._id = kwargs.get("agentId", None)
 		if self._id is None:
 			self._id = next(__class__._last_id)
-		Application.__init__(self, *args, **kwargs)
+		# Stepped by a Simulation or an AgentRuntime rather than run as a process of its own, it needs
+		# neither the locks and conditions of an Application nor Manager containers
+		self._hosted = kwargs.get("hosted", False)
+		if self._hosted:
+			self._wait = kwargs.get("wait", 30)
+			mp.Process.__init__(self)
+		else:
+			Application.__init__(self, *args, **kwargs)
 		self._marketid = kwargs.get("marketId")
 		self._symbol = kwargs.get("symbol")
 		assert self._symbol is not None and len(self._symbol) > 0
 		self._queue = kwargs.get("queue", None)
+		# Execution reports of an agent running as a process of its own, a host receives them for hosted agents
+		self._receiver = None
+		if not self._hosted and kwargs.get("reports", None) is not None:
+			self._receiver = ExecutionReceiver(kwargs.get("reports"))
+			self._receiver.add(self)
+		# Flow control on the queue, see _send()
+		self._watermark = kwargs.get("watermark", None)
+		self._held = None
+		# Orders sent, throttled, coalesced and dropped, in shared memory to be read from any process
+		self._flow = mp.RawArray("q", len(__class__._flow_counters))
 		self._verbose = kwargs.get("verbose", False)
-		self._inflight_orders = mp.Manager().dict()
-		self._positions = mp.Manager().dict()
+		# The last inflightRetention orders sent by client order id, unbounded when None, see _track()
+		self._inflight_retention = kwargs.get("inflightRetention", 4096)
+		self._inflight_ids = collections.deque()
+		self._client_ids = itertools.count()
+		if self._hosted:
+			self._inflight_orders = {}
+			self._positions = {}
+		else:
+			manager = kwargs.get("manager", None) or default_manager()
+			self._inflight_orders = manager.dict()
+			self._positions = manager.dict()
+		# The agent's own random streams, the same orders every run when seeded
+		seed = kwargs.get("seed", None)
+		self._random = random.Random(seed)
+		self._np_random = np.random.RandomState(seed)
+		# Simulated time in seconds while step() runs, None in real time
+		self._step_time = None
 		# backward compatibility
 		self.position = 0.0
 		self.quantity_bought = 0.0
@@ -29,10 +73,136 @@ class Agent(Application):
 	def id(self) -> int:
 		return self._id
 
+	@property
+	def market_id(self) -> int:
+		return self._marketid
+
 	@property
 	def name(self) -> str:
 		return self.__class__.__name__.lower()
 
+	@property
+	def hosted(self) -> bool:
+		return self._hosted
+
+	@property
+	def interval(self) -> float:
+		"""Seconds between two rounds of work"""
+		return self._wait
+
+	@property
+	def reports(self):
+		"""Channel of the agent's execution reports when it runs as a process of its own"""
+		return self._receiver.channel if self._receiver is not None else None
+
+	@property
+	def flow(self) -> dict:
+		"""Orders sent to the book, held back while it was throttled, replaced by a newer one while held
+		back and dropped for want of room in its queue"""
+		return dict(zip(__class__._flow_counters, self._flow))
+
+	def run(self):
+		if self._receiver is not None:
+			threading.Thread(target=self._receive, daemon=True).start()
+		Application.run(self)
+
+	def _receive(self):
+		"""Deliver execution reports as they arrive, on a thread of the agent's process"""
+		while self._run.value == 1:
+			self._receiver.receive(block=True, timeout=0.1)
+
+	def step(self, timestamp: float):
+		"""Do one round of work at simulated time timestamp, in seconds, instead of running as a process"""
+		self._step_time = timestamp
+		try:
+			self._do_work()
+		finally:
+			self._step_time = None
+
+	def _timestamp(self) -> float:
+		"""Order timestamp in milliseconds"""
+		if self._step_time is not None:
+			return self._step_time * 1000
+		return dt.datetime.utcnow().timestamp() * 1000
+
+	def _send(self, kwargs: dict) -> bool:
+		"""Queue an order given as Order kwargs, True when it went out now.
+
+		The order gets the agent's next client order id, clientid, which its execution reports carry
+		back as client_id. While the watermark throttles the queue the agent holds back its latest order
+		only, a newer one replaces it, and sends it first once the book has caught up. An order the queue
+		has no room for is dropped.
+		"""
+		kwargs["clientid"] = next(self._client_ids)
+		if self._watermark is not None and self._watermark.throttle(self._queue):
+			if self._held is not None:
+				self._flow[2] += 1
+			self._held = kwargs
+			self._flow[1] += 1
+			return False
+		if self._held is not None:
+			held, self._held = self._held, None
+			# Tracked under the client id it was given when held, which its execution reports carry
+			if self._put(held):
+				self._track(__class__._order_of(held))
+		return self._put(kwargs)
+
+	def _put(self, kwargs: dict) -> bool:
+		try:
+			self._queue.put_nowait(kwargs)
+		except queue.Full:
+			self._flow[3] += 1
+			if self._verbose:
+				logging.debug(f"{__class__.__name__}._put agent: {self._id} queue full, order dropped")
+			return False
+		self._flow[0] += 1
+		return True
+
+	@staticmethod
+	def _order_of(kwargs: dict) -> Order:
+		"""Order of the kwargs of one sent"""
+		return Order.create(
+			kwargs["marketid"],
+			kwargs["agentid"],
+			kwargs["symbol"],
+			Order.Side.parse(kwargs["side"]),
+			kwargs["price"],
+			kwargs["quantity"],
+			kwargs["timestamp"],
+			kwargs.get("clientid"),
+		)
+
+	def _track(self, order):
+		"""Keep an order sent among the in-flight ones by client order id, the oldest one makes room once
+		there are inflightRetention of them"""
+		if self._inflight_retention is not None:
+			if self._inflight_ids and len(self._inflight_ids) >= self._inflight_retention:
+				self._inflight_orders.pop(self._inflight_ids.popleft(), None)
+			self._inflight_ids.append(order.client_id)
+		self._inflight_orders[order.client_id] = order
+
+	def execution_report(self, report: dict):
+		"""Bring the in-flight order of an execution report up to date, then hand it to orderbook_event()"""
+		self._settle(report)
+		self.orderbook_event(report)
+
+	def _settle(self, report: dict):
+		"""An in-flight order leaves once filled or cancelled in full, else takes the remaining quantity
+		of the report"""
+		client_id = report.get("client_id")
+		order = self._inflight_orders.get(client_id) if client_id is not None else None
+		if order is None:
+			return
+		if report["remaining"] <= 0:
+			# Its id goes when it comes up in _inflight_ids
+			self._inflight_orders.pop(client_id, None)
+			return
+		order.remaining = report["remaining"]
+		if report["event"] == "partial_fill":
+			order.state = Order.State.PartialFill
+		# A manager dict hands out copies
+		self._inflight_orders[client_id] = order
+
 	def _do_work(self):
 		raise NotImplementedError()
 
@@ -0,0 +1,50 @@
+import logging
+import queue
+
+
+class ExecutionReceiver:
+	"""Hands the execution reports arriving on a channel to the agents they are for.
+
+	One receiver serves every agent of a process, whatever their markets: an agent running as a
+	process of its own, the agents of an AgentRuntime or those of a Simulation. Order books put the
+	reports of a batch on the channel together, see OrderBook, and the agents get them through
+	execution_report().
+	"""
+
+	def __init__(self, channel):
+		self._channel = channel
+		# Agents by (market id, agent id)
+		self._agents = {}
+
+	@property
+	def channel(self):
+		return self._channel
+
+	def add(self, agent):
+		self._agents[(agent.market_id, agent.id)] = agent
+
+	def take(self, block: bool = True, timeout: float = None, maxReports: int = 1024) -> list:
+		"""Reports waiting on the channel, oldest first, waiting for the first one unless not block"""
+		try:
+			return self._channel.get_many(maxReports, block, timeout)
+		except queue.Empty:
+			return []
+
+	def deliver(self, reports: list) -> int:
+		"""Hand reports to their agents, returns how many were delivered"""
+		agents, count = self._agents, 0
+		for report in reports:
+			agent = agents.get((report["market_id"], report["agent_id"]))
+			if agent is None:
+				logging.warning(f"{__class__.__name__}.deliver unknown agent report: {report}")
+				continue
+			try:
+				agent.execution_report(report)
+				count += 1
+			except Exception as e:
+				logging.error(f"{__class__.__name__}.deliver agent: {agent.id} e: {e}")
+		return count
+
+	def receive(self, block: bool = False, timeout: float = None) -> int:
+		"""Deliver the reports waiting on the channel, returns how many were delivered"""
+		return self.deliver(self.take(block, timeout))
@@ -1,8 +1,4 @@
-import datetime as dt
 import logging
-import random
-
-import numpy as np
 
 from synthetic_exchange.order import Order
 from synthetic_exchange.strategy.agent import Agent
@@ -13,6 +9,7 @@ class RandomNormal(Agent):
 		Agent.__init__(self, *args, **kwargs)
 		self._market_id = kwargs.get("marketId")
 		self._last_price = kwargs.get("initialPrice")
+		self._tick_size = kwargs.get("tickSize", 1)
 		self._min_quantity = kwargs.get("minQuantity")
 		self._max_quantity = kwargs.get("maxQuantity")
 		if "handler" in kwargs:
@@ -20,15 +17,16 @@ class RandomNormal(Agent):
 
 	def _do_work(self):
 		try:
-			side = random.choice(["BUY", "SELL"])
+			side = self._random.choice(["BUY", "SELL"])
 			std = 0.1 * self._last_price
-			price = np.random.normal(self._last_price, std)
+			# Quote on the market's tick grid, never below one tick
+			price = max(1, round(self._np_random.normal(self._last_price, std) / self._tick_size)) * self._tick_size
 			self._last_price = price
-			quantity = random.uniform(self._min_quantity, self._max_quantity)
+			quantity = self._random.uniform(self._min_quantity, self._max_quantity)
 			kwargs = {
 				"marketid": self._market_id,
 				"agentid": self.id,
-				"timestamp": dt.datetime.utcnow().timestamp() * 1000,
+				"timestamp": self._timestamp(),
 				"symbol": self._symbol,
 				"side": side,
 				"price": price,
@@ -37,9 +35,9 @@ class RandomNormal(Agent):
 			}
 			if self._verbose:
 				logging.debug(f"{__class__.__name__}._do_work order: {kwargs}")
-			self._queue.put_nowait(kwargs)
-			order = Order(**kwargs)
-			self._inflight_orders[order.id] = order
+			if not self._send(kwargs):
+				return
+			self._track(self._order_of(kwargs))
 		except Exception as e:
 			logging.error(f"{__class__.__name__}._do_work e: {e}")
 
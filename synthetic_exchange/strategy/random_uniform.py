@@ -1,6 +1,4 @@
-import datetime as dt
 import logging
-import random
 
 import numpy as np
 
@@ -24,14 +22,14 @@ class RandomUniform(Agent):
 
 	def _do_work(self):
 		try:
-			side = random.choice(["BUY", "SELL"])
+			side = self._random.choice(["BUY", "SELL"])
 			prices = np.arange(self._min_price, self._max_price, self._tick_size)
-			price = np.random.choice(prices)
-			quantity = random.uniform(self._min_quantity, self._max_quantity)
+			price = self._np_random.choice(prices)
+			quantity = self._random.uniform(self._min_quantity, self._max_quantity)
 			kwargs = {
 				"marketid": self._market_id,
 				"agentid": self.id,
-				"timestamp": dt.datetime.utcnow().timestamp() * 1000,
+				"timestamp": self._timestamp(),
 				"symbol": self._symbol,
 				"side": side,
 				"price": price,
@@ -40,9 +38,9 @@ class RandomUniform(Agent):
 			}
 			if self._verbose:
 				logging.debug(f"{__class__.__name__}._do_work order: {kwargs}")
-			self._queue.put_nowait(kwargs)
-			order = Order(**kwargs)
-			self._inflight_orders[order.id] = order
+			if not self._send(kwargs):
+				return
+			self._track(self._order_of(kwargs))
 		except Exception as e:
 			logging.error(f"{__class__.__name__}._do_work e: {e}")
 
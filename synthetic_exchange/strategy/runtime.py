@@ -0,0 +1,152 @@
+import asyncio
+import enum
+import logging
+import os
+
+from synthetic_exchange.strategy.execution import ExecutionReceiver
+from synthetic_exchange.transport import ReportRing
+from synthetic_exchange.util import Application, safe_ensure_future
+
+
+class Runtime(enum.Enum):
+	# Every agent is a process of its own
+	Process = "process"
+	# Agents are tasks on the event loop of an AgentRuntime process
+	Asyncio = "asyncio"
+	# Agents are spread over an AgentPool of AgentRuntime processes
+	Pool = "pool"
+
+
+class AgentRuntime(Application):
+	"""Process hosting many agents as tasks on one asyncio event loop.
+
+	Every agent calls _do_work() every interval seconds, as it would in a process of its own,
+	starting after a random part of its interval so that they don't all fire at once. The loop
+	is shared: _do_work() and orderbook_event() must not block, orders go out with _send().
+	Agents are added before start(), they must be hosted (see Agent). Given a reports channel, the
+	execution reports arriving on it are handed to the agents on the loop as well.
+	"""
+
+	# Seconds between two checks of the stop flag
+	_poll = 0.1
+
+	def __init__(self, *args, **kwargs):
+		Application.__init__(self, *args, **kwargs)
+		self._agents = []
+		self._tasks = []
+		reports = kwargs.get("reports", None)
+		self._receiver = ExecutionReceiver(reports) if reports is not None else None
+
+	@property
+	def agents(self) -> list:
+		return self._agents
+
+	@property
+	def reports(self):
+		"""Channel of the execution reports of the runtime's agents, None when they get none"""
+		return self._receiver.channel if self._receiver is not None else None
+
+	def add(self, agent):
+		assert agent.hosted, f"{__class__.__name__}.add agent: {agent.id} runs as its own process"
+		assert self.pid is None, f"{__class__.__name__}.add runtime already started"
+		self._agents.append(agent)
+		if self._receiver is not None:
+			self._receiver.add(agent)
+
+	def run(self):
+		logging.debug(f"{__class__.__name__}.run agents: {len(self._agents)} start...")
+		try:
+			asyncio.run(self.serve())
+		except KeyboardInterrupt:
+			pass
+		with self._stop_lock:
+			self._stop_cond.notify_all()
+		logging.debug(f"{__class__.__name__}.run stopped!")
+
+	async def serve(self):
+		"""Run the agents on the current event loop until stop()"""
+		coroutines = [self._run_agent(agent) for agent in self._agents]
+		if self._receiver is not None:
+			coroutines.append(self._receive())
+		self._tasks = [safe_ensure_future(coroutine) for coroutine in coroutines]
+		try:
+			while self._run.value == 1:
+				await asyncio.sleep(__class__._poll)
+		finally:
+			for task in self._tasks:
+				task.cancel()
+			await asyncio.gather(*self._tasks, return_exceptions=True)
+			self._tasks = []
+			# Those of tasks cancelled before their first step were never awaited
+			for coroutine in coroutines:
+				coroutine.close()
+
+	async def _receive(self):
+		"""Wait for execution reports on a thread of the default executor, deliver them on the loop"""
+		loop = asyncio.get_running_loop()
+		while True:
+			reports = await loop.run_in_executor(None, self._receiver.take, True, __class__._poll)
+			self._receiver.deliver(reports)
+
+	@staticmethod
+	async def _run_agent(agent):
+		await asyncio.sleep(agent._random.uniform(0, agent.interval))
+		while True:
+			try:
+				agent._do_work()
+			except Exception as e:
+				logging.error(f"{__class__.__name__}._run_agent agent: {agent.id} e: {e}")
+			await asyncio.sleep(agent.interval)
+
+
+class AgentPool:
+	"""Fixed number of AgentRuntime worker processes sharing the agents.
+
+	An agent goes to the worker with the lightest load, the orders a second (1 / interval) of the
+	agents it already hosts, so the workers keep an even share whatever the agents' intervals and
+	the process count stays the same however many agents there are. Workers left without agents
+	are not started. With a reports capacity every worker gets a ReportRing of that many execution
+	reports for its agents.
+	"""
+
+	def __init__(self, workers: int = None, reports: int = 0):
+		workers = workers or os.cpu_count() or 1
+		self._runtimes = [
+			AgentRuntime(reports=ReportRing(reports) if reports > 0 else None) for _ in range(workers)
+		]
+		self._loads = [0.0] * workers
+
+	@property
+	def runtimes(self) -> list:
+		return self._runtimes
+
+	@property
+	def loads(self) -> list:
+		"""Orders a second expected from the agents of each worker"""
+		return self._loads
+
+	@property
+	def agents(self) -> list:
+		return [agent for runtime in self._runtimes for agent in runtime.agents]
+
+	def add(self, agent) -> int:
+		"""Assign an agent to a worker before start(), returns the worker's index"""
+		i = min(range(len(self._loads)), key=self._loads.__getitem__)
+		self._runtimes[i].add(agent)
+		self._loads[i] += 1.0 / agent.interval
+		return i
+
+	def start(self):
+		for runtime in self._runtimes:
+			if runtime.agents:
+				runtime.start()
+
+	def stop(self):
+		started = [runtime for runtime in self._runtimes if runtime.pid is not None]
+		for runtime in started:
+			runtime.stop()
+		for runtime in started:
+			runtime.join()
+		for runtime in self._runtimes:
+			if runtime.reports is not None:
+				runtime.reports.close()
@@ -0,0 +1,386 @@
+import concurrent.futures
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+
+class ColumnTape:
+    """Append-only columnar store of fixed-layout rows, the (name, dtype) of each column in _columns.
+
+    Rows are written into chunks of chunkSize rows, one NumPy array per column, a new chunk being
+    allocated when the last one is full, so an append is a few array stores and never a copy of
+    what is already there. chunks() hands out views of the chunks, columns() and to_frame() the
+    whole tape, without a copy while it fits in one chunk.
+
+    With a retention, only the chunks holding the last retention rows stay in memory. The older
+    ones are sealed on a background thread into a compressed segment, spillPath/<chunk>.npz, or
+    dropped without a spillPath. chunks() reads the segments back in their place, a dropped chunk
+    is skipped, len() still counts its rows.
+
+    A shared tape is written in one process and read in others: publish() sends the rows appended
+    since the last call to a list of the manager as one block of columns, later swapped for its
+    segment. Readers see the published blocks then, in the writing process, the unpublished rows.
+    """
+
+    _columns = ()
+
+    def __init__(
+        self, chunkSize: int = 4096, shared: bool = False, manager=None, retention: int = None, spillPath: str = None
+    ):
+        """manager holds the published blocks of a shared tape, see util.default_manager()"""
+        assert chunkSize > 0, f"{__class__.__name__} invalid chunk size: {chunkSize}"
+        assert not shared or manager is not None, f"{__class__.__name__} shared tape without a manager"
+        assert retention is None or retention >= 0, f"{__class__.__name__} invalid retention: {retention}"
+        self._chunk_size = chunkSize
+        self._names = tuple(name for name, _ in self._columns)
+        self._blocks = manager.list() if shared else None
+        # Full chunks in order: their arrays while in memory, then the path of their segment, or their
+        # row count once dropped
+        self._chunks = []
+        # How many full chunks stay in memory, and the first of them
+        self._retained = None if retention is None else -(-retention // chunkSize)
+        self._memory = 0
+        self._spill_path = spillPath
+        self._executor = None
+        self._pending = []
+        # Blocks published for every full chunk still in memory and for the current one, and the
+        # entries at the front of the shared list standing for the chunks no longer in memory
+        self._chunk_blocks = []
+        self._blocks_published = 0
+        self._sealed = 0
+        # The chunk being written
+        self._chunk = None
+        self._used = chunkSize
+        # Rows of the current chunk already published
+        self._published = 0
+        self._size = 0
+
+    @property
+    def shared(self) -> bool:
+        return self._blocks is not None
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def names(self) -> tuple:
+        return self._names
+
+    def __len__(self) -> int:
+        if self._blocks is None:
+            return self._size
+        pending = self._used - self._published if self._chunk is not None else 0
+        return sum(self._length(entry) for entry in self._blocks[:]) + pending
+
+    def _length(self, entry) -> int:
+        if isinstance(entry, dict):
+            return len(entry[self._names[0]])
+        # A segment or a dropped chunk, always a full one
+        return self._chunk_size
+
+    def append(self, *values):
+        """One row, a value for every column in order"""
+        if self._used == self._chunk_size:
+            self._next_chunk()
+        i = self._used
+        for column, value in zip(self._chunk, values):
+            column[i] = value
+        self._used = i + 1
+        self._size += 1
+
+    def _next_chunk(self):
+        if self._chunk is not None:
+            if self._blocks is not None:
+                self.publish()
+                self._chunk_blocks.append(self._blocks_published)
+                self._blocks_published = 0
+            self._chunks.append(self._chunk)
+            self._retain()
+        self._chunk = tuple(np.empty(self._chunk_size, dtype) for _, dtype in self._columns)
+        self._used = 0
+        self._published = 0
+
+    def _retain(self):
+        """Seal the full chunks beyond the retention"""
+        while self._retained is not None and len(self._chunks) - self._memory > self._retained:
+            i = self._memory
+            self._memory += 1
+            blocks = self._chunk_blocks.pop(0) if self._blocks is not None else 0
+            if self._spill_path is None:
+                self._seal(i, blocks)
+                continue
+            if self._executor is None:
+                # Started by the writing process, never before it forks
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self._pending = [future for future in self._pending if not future.done()]
+            self._pending.append(self._executor.submit(self._seal, i, blocks))
+
+    def _seal(self, i: int, blocks: int):
+        """Swap full chunk i, published as blocks blocks when shared, for its segment or its row count"""
+        entry = self._chunk_size
+        if self._spill_path is not None:
+            path = os.path.join(self._spill_path, f"{i:08d}.npz")
+            try:
+                os.makedirs(self._spill_path, exist_ok=True)
+                # A segment is only ever seen whole, a writer stopped halfway leaves its .tmp behind
+                with open(path + ".tmp", "wb") as file:
+                    np.savez_compressed(file, **dict(zip(self._names, self._chunks[i])))
+                os.replace(path + ".tmp", path)
+                entry = path
+            except Exception as e:
+                logging.error(f"{__class__.__name__}._seal chunk: {i} dropped e: {e}")
+        if self._blocks is not None:
+            self._blocks[self._sealed : self._sealed + blocks] = [entry]
+            self._sealed += 1
+        self._chunks[i] = entry
+
+    def flush(self):
+        """Wait for the chunks being sealed"""
+        for future in self._pending:
+            future.result()
+        self._pending = []
+
+    def publish(self) -> int:
+        """Send the rows appended since the last publish to the readers of a shared tape, returns how many
+        were sent"""
+        if self._blocks is None or self._chunk is None or self._published == self._used:
+            return 0
+        start, end = self._published, self._used
+        self._blocks.append({name: column[start:end].copy() for name, column in zip(self._names, self._chunk)})
+        self._blocks_published += 1
+        self._published = end
+        logging.debug(f"{__class__.__name__}.publish rows: {end - start}")
+        return end - start
+
+    def _load(self, entry) -> dict:
+        """Columns of a published block, a chunk in memory or a segment, None for a dropped chunk"""
+        if isinstance(entry, dict):
+            return entry
+        if isinstance(entry, tuple):
+            return dict(zip(self._names, entry))
+        if isinstance(entry, str):
+            with np.load(entry) as segment:
+                return {name: segment[name] for name in self._names}
+        return None
+
+    def chunks(self):
+        """Blocks of the tape in order, {column name: array}, views of the tape's own arrays while in
+        memory, the segments are read from disk"""
+        if self._blocks is not None:
+            # One round trip for all of them
+            entries, start = self._blocks[:], self._published
+        else:
+            entries, start = list(self._chunks), 0
+        for entry in entries:
+            block = self._load(entry)
+            if block is not None:
+                yield block
+        if self._chunk is not None and self._used > start:
+            yield {name: column[start : self._used] for name, column in zip(self._names, self._chunk)}
+
+    def columns(self, names: list = None) -> dict:
+        """{column name: array} of the whole tape"""
+        names = names or self._names
+        blocks = list(self.chunks())
+        if len(blocks) == 1:
+            return {name: blocks[0][name] for name in names}
+        dtypes = dict(self._columns)
+        return {
+            name: np.concatenate([block[name] for block in blocks]) if blocks else np.empty(0, dtypes[name])
+            for name in names
+        }
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns([name])[name]
+
+    def last(self) -> dict:
+        """Latest row, None before the first or when it was dropped"""
+        if self._chunk is not None and self._used > self._published:
+            return {name: column[self._used - 1].item() for name, column in zip(self._names, self._chunk)}
+        entries = self._blocks if self._blocks is not None else self._chunks
+        block = self._load(entries[-1]) if len(entries) > 0 else None
+        if block is None:
+            return None
+        return {name: block[name][-1].item() for name in self._names}
+
+    def to_frame(self, names: list = None):
+        """pandas DataFrame of the tape, pandas is only imported here"""
+        import pandas as pd
+
+        return pd.DataFrame(self.columns(names), copy=False)
+
+
+class TradeTape(ColumnTape):
+    """Trades of a market, see ColumnTape"""
+
+    _columns = (
+        ("id", np.int64),
+        ("timestamp", np.float64),
+        ("price", np.float64),
+        ("quantity", np.float64),
+        ("buy_agent_id", np.int64),
+        ("sell_agent_id", np.int64),
+        ("buy_order_id", np.int64),
+        ("sell_order_id", np.int64),
+    )
+
+    def to_frame(self, names: list = None):
+        """pandas DataFrame of the trades indexed by trade id"""
+        return ColumnTape.to_frame(self, names and ["id"] + [name for name in names if name != "id"]).set_index("id")
+
+
+class OrderTape(ColumnTape):
+    """Orders a book took in, in the order they came, see ColumnTape"""
+
+    _columns = (
+        ("id", np.int64),
+        ("agent_id", np.int64),
+        ("side", np.int8),
+        ("price", np.float64),
+        ("quantity", np.float64),
+        ("timestamp", np.float64),
+    )
+
+
+class MappedTape:
+    """Append-only file of fixed-size records, the (name, dtype) of each field in _columns, memory-mapped
+    by the one process writing it and by any process reading it.
+
+    The file is a header then the records back to back. The header holds the commit index, how many
+    records were written in full: the writer stores a record then moves the index past it, readers
+    only look at the records below the index, so they need no lock and never see a record half
+    written. The writer grows the file by doubling it, a reader maps it again once the index goes past
+    what it mapped. Readers map the file read-only and hold nothing the writer waits on, one that
+    crashes leaves the writer and the other readers as they were.
+
+    The writing process maps the file on its first append, the one that created the file may hand it
+    to the writer before it forks.
+    """
+
+    _columns = ()
+    # Magic, version, record size, then at _commit_offset the commit index
+    _header = struct.Struct("<8sII")
+    _header_size = 64
+    _commit_offset = 16
+    _magic = b"SXTAPE\0\0"
+    _version = 1
+
+    def __init__(self, path: str, create: bool = False, capacity: int = 1 << 16):
+        """Open the tape at path, a new empty one of capacity records with create"""
+        self._path = path
+        self._dtype = np.dtype(list(self._columns))
+        self._map = None
+        self._writable = False
+        # Records mapped, the commit index and the records as arrays over the map
+        self._capacity = 0
+        self._commit = None
+        self._records = None
+        self._count = 0
+        self._inode = None
+        if create:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Readers of the tape it replaces keep theirs, a shorter file under their map would fault them
+            with open(path + ".new", "wb") as file:
+                header = __class__._header.pack(__class__._magic, __class__._version, self._dtype.itemsize)
+                file.write(header.ljust(__class__._header_size, b"\0"))
+                file.truncate(__class__._header_size + capacity * self._dtype.itemsize)
+            os.replace(path + ".new", path)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    def _open(self, writable: bool):
+        """Map the whole file, raises ValueError when it isn't a tape of these records"""
+        fd = os.open(self._path, os.O_RDWR if writable else os.O_RDONLY)
+        try:
+            stat = os.fstat(fd)
+            size = stat.st_size
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            mapped = mmap.mmap(fd, size, access=access)
+        finally:
+            os.close(fd)
+        magic, version, record_size = __class__._header.unpack_from(mapped)
+        if magic != __class__._magic or version != __class__._version or record_size != self._dtype.itemsize:
+            raise ValueError(f"{__class__.__name__}._open {self._path} not a tape of {self._dtype}")
+        self._map = mapped
+        self._inode = stat.st_ino
+        self._writable = writable
+        self._capacity = (size - __class__._header_size) // self._dtype.itemsize
+        self._commit = np.frombuffer(mapped, np.uint64, count=1, offset=__class__._commit_offset)
+        self._records = np.frombuffer(mapped, self._dtype, count=self._capacity, offset=__class__._header_size)
+
+    @property
+    def replaced(self) -> bool:
+        """Whether a new tape was created at the path since this one was mapped"""
+        try:
+            return self._inode is not None and os.stat(self._path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def __getstate__(self) -> dict:
+        # A process it goes to maps the file anew
+        state = self.__dict__.copy()
+        state.update(_map=None, _writable=False, _capacity=0, _commit=None, _records=None, _inode=None)
+        return state
+
+    def append(self, *values):
+        """One record, a value for every field in order"""
+        if not self._writable:
+            self._open(True)
+            self._count = int(self._commit[0])
+        i = self._count
+        if i == self._capacity:
+            os.truncate(self._path, __class__._header_size + 2 * self._capacity * self._dtype.itemsize)
+            # The old map goes with the last array over it
+            self._open(True)
+        self._records[i] = values
+        self._count = i + 1
+        self._commit[0] = self._count
+
+    def __len__(self) -> int:
+        if self._map is None:
+            self._open(False)
+        return int(self._commit[0])
+
+    def records(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Structured array of the committed records from start to stop, a view of the file"""
+        count = len(self)
+        if count > self._capacity:
+            self._open(self._writable)
+        stop = count if stop is None else min(stop, count)
+        return self._records[start:stop]
+
+    def columns(self, start: int = 0, stop: int = None) -> dict:
+        """{field name: array} of the committed records from start to stop, views of the file"""
+        records = self.records(start, stop)
+        return {name: records[name] for name in self._dtype.names}
+
+    def last(self) -> dict:
+        """Latest record, None before the first"""
+        records = self.records(max(len(self) - 1, 0))
+        if len(records) == 0:
+            return None
+        return {name: records[name][0].item() for name in self._dtype.names}
+
+    def close(self):
+        """Let go of the map, arrays handed out keep it alive until they go"""
+        self._map = self._commit = self._records = self._inode = None
+        self._writable = False
+        self._capacity = 0
+
+
+class MappedTradeTape(MappedTape):
+    """Trades of a market in a MappedTape, the fields of a TradeTape"""
+
+    _columns = TradeTape._columns
@@ -1,12 +1,30 @@
 import datetime as dt
 import itertools
 import logging
-import multiprocessing as mp
+import os
 
+from synthetic_exchange.bars import Bars
+from synthetic_exchange.ledger import Ledger
 from synthetic_exchange.order import Order
+from synthetic_exchange.tape import MappedTradeTape, TradeTape
+from synthetic_exchange.util import default_manager
 
 
 class Transaction:
+    """A trade, it keeps the ids of both orders rather than the orders themselves"""
+
+    __slots__ = (
+        "id",
+        "timestamp",
+        "market_id",
+        "buy_order_id",
+        "sell_order_id",
+        "buy_agent_id",
+        "sell_agent_id",
+        "price",
+        "quantity",
+    )
+
     _count = 0
     _last_id = itertools.count()
 
@@ -17,20 +35,18 @@ class Transaction:
         self.id = next(__class__._last_id)
         self.timestamp = max(buyOrder.timestamp, sellOrder.timestamp)
         self.market_id = marketId
-        self.buy_order = buyOrder
-        self.sell_order = sellOrder
+        self.buy_order_id = buyOrder.id
+        self.sell_order_id = sellOrder.id
+        self.buy_agent_id = buyOrder.agent_id
+        self.sell_agent_id = sellOrder.agent_id
         self.price = price
         self.quantity = quantity
 
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in __class__.__slots__}
+
     def __str__(self):
-        retval = {}
-        for k, v in self.__dict__.items():
-            if k.lower() == "timestamp":
-                assert isinstance(v, float)
-                retval[k] = v
-            else:
-                retval[k] = v
-        return str(retval)
+        return str(self.to_dict())
 
     def __repr__(self):
         return self.__str__()
@@ -57,13 +73,52 @@ class Transaction:
 
 
 class Transactions:
-    def __init__(self, agents: dict):
+    def __init__(
+        self,
+        agents: dict,
+        shared: bool = True,
+        manager=None,
+        chunkSize: int = 4096,
+        sampleEvery: int = 1,
+        retention: int = None,
+        spillDir: str = None,
+        tapeFile: str = None,
+        barIntervals: list = (1, 60, 3600),
+    ):
+        """shared keeps the history in containers of manager, the default one unless given, readable from
+        other processes. Plain lists and dicts serve an order book run in the caller's process, as in a
+        Simulation. Trades go to a TradeTape of chunkSize rows a chunk, the agents' positions to a Ledger
+        sampling one fill in sampleEvery, the bars of every interval of barIntervals, in seconds, to Bars.
+        All keep the last retention rows in memory, the older ones go to segments under spillDir, see
+        ColumnTape. With a tapeFile every trade also goes to a MappedTradeTape there, created anew, for
+        any local process to read as it is written"""
         assert agents is not None
-        self._history = mp.Manager().list()
-        self._history_list = mp.Manager().list()
-        self._history_market_agent = mp.Manager().dict()
-        self._transactions = mp.Manager().dict()
+        manager = (manager or default_manager()) if shared else None
+        spill = {"trades": None, "ledger": None, "bars": None}
+        if spillDir is not None:
+            spill = {name: os.path.join(spillDir, name) for name in spill}
+        self._tape = TradeTape(
+            chunkSize=chunkSize, shared=shared, manager=manager, retention=retention, spillPath=spill["trades"]
+        )
+        self._ledger = Ledger(
+            sampleEvery=sampleEvery,
+            chunkSize=chunkSize,
+            shared=shared,
+            manager=manager,
+            retention=retention,
+            spillPath=spill["ledger"],
+        )
+        self._bars = Bars(
+            intervals=barIntervals,
+            chunkSize=chunkSize,
+            shared=shared,
+            manager=manager,
+            retention=retention,
+            spillPath=spill["bars"],
+        )
+        self._mapped = MappedTradeTape(tapeFile, create=True) if tapeFile is not None else None
         self._agents = agents
+        self._last_id = itertools.count()
 
     @property
     def agents(self):
@@ -73,55 +128,47 @@ class Transactions:
     def agents(self, value):
         self._agents = value
 
-    @property
-    def transactions(self):
-        return self._transactions
-
     @property
     def size(self) -> int:
-        return len(self._transactions)
+        return len(self._tape)
 
-    def create(self, buyOrder, sellOrder, marketId, price, quantity) -> Transaction:
+    def create(self, buyOrder, sellOrder, marketId, price, quantity) -> int:
+        """Record a trade between two orders, returns its id"""
         buy_order_agent = self._agents.get(buyOrder.agent_id)
         sell_order_agent = self._agents.get(sellOrder.agent_id)
         assert buy_order_agent is not None
         assert sell_order_agent is not None
+        assert buyOrder.market_id == marketId
+        assert sellOrder.market_id == marketId
 
-        transaction = Transaction(buyOrder, sellOrder, marketId, price, quantity)
-
-        # Register order agents
-        logging.debug(
-            f"{__class__.__name__}.create history: {self._history_market_agent} "
-            f"bid: {buyOrder.agent_id} sid: {sellOrder.agent_id}"
-        )
-        if buyOrder.agent_id not in self._history_market_agent:
-            self._history_market_agent[buyOrder.agent_id] = []
-        if sellOrder.agent_id not in self._history_market_agent:
-            self._history_market_agent[sellOrder.agent_id] = []
-        assert len(self._history_market_agent) > 0
+        transaction_id = next(self._last_id)
+        timestamp = max(buyOrder.timestamp, sellOrder.timestamp)
+        logging.debug(f"{__class__.__name__}.create bid: {buyOrder.agent_id} sid: {sellOrder.agent_id}")
 
         # Record history
-        self._history.append(transaction)
-        self._history_list.append([transaction.id, transaction.timestamp, transaction.price])
-        buy_history = [
-            [
-                transaction.id,
-                buy_order_agent.position,
-                Transaction.calculate_profit(buy_order_agent, marketId),
-            ],
-        ]
-        assert buyOrder.agent_id in self._history_market_agent
-        self._history_market_agent[buyOrder.agent_id].append(buy_history)
-        self._history_market_agent[buyOrder.agent_id] += buy_history
-        sell_history = [
-            [
-                transaction.id,
-                sell_order_agent.position,
-                Transaction.calculate_profit(sell_order_agent, marketId),
-            ],
-        ]
-        assert sellOrder.agent_id in self._history_market_agent
-        self._history_market_agent[sellOrder.agent_id] += sell_history
+        self._tape.append(
+            transaction_id,
+            timestamp,
+            price,
+            quantity,
+            buyOrder.agent_id,
+            sellOrder.agent_id,
+            buyOrder.id,
+            sellOrder.id,
+        )
+        if self._mapped is not None:
+            self._mapped.append(
+                transaction_id,
+                timestamp,
+                price,
+                quantity,
+                buyOrder.agent_id,
+                sellOrder.agent_id,
+                buyOrder.id,
+                sellOrder.id,
+            )
+        self._ledger.record(transaction_id, timestamp, buyOrder.agent_id, sellOrder.agent_id, price, quantity)
+        self._bars.update(timestamp, price, quantity)
 
         buy_order_agent.position += quantity
         sell_order_agent.position -= quantity
@@ -130,36 +177,35 @@ class Transactions:
         sell_order_agent.value_sold += price * quantity
         sell_order_agent.quantity_sold += quantity
 
-        # Register transaction
-        self._transactions[transaction.id] = transaction
-        logging.debug(f"{__class__.__name__}.create {transaction} size: {len(self._transactions)}")
-        return transaction
+        logging.debug(f"{__class__.__name__}.create id: {transaction_id} price: {price} quantity: {quantity}")
+        return transaction_id
 
-    def remove(self, transactionId):
-        if transactionId in self._transactions:
-            del self._transactions[transactionId]
-        else:
-            logging.error(f"{__class__.__name__}.remove id: {transactionId} not found")
+    def publish(self) -> int:
+        """Make the trades recorded since the last call, the ledger samples and the bars visible to other
+        processes, returns how many trades were sent, see ColumnTape.publish"""
+        self._ledger.publish()
+        self._bars.publish()
+        return self._tape.publish()
+
+    def flush(self):
+        """Wait for the history being sealed to disk"""
+        self._tape.flush()
+        self._ledger.flush()
+        self._bars.flush()
 
     @property
-    def history(self):
-        return self._history
+    def history(self) -> TradeTape:
+        return self._tape
 
     @property
-    def history_list(self):
-        return self._history_list
-
-    def history_market_agent(self, agentId, agentName) -> list:
-        retval = []
-        if len(self._history_market_agent) > 0:
-            if agentId in self._history_market_agent:
-                agents = self._history_market_agent[agentId]
-                if agentName in agents:
-                    retval = agents[agentName]
-                else:
-                    logging.debug(f"{__class__.__name__}.history_market_agent missing agent: {agentName}")
-            else:
-                logging.debug(f"{__class__.__name__}.history_market_agent missing agent id: {agentId}")
-        else:
-            logging.warning(f"{__class__.__name__}.history_market_agent empty history market agent")
-        return retval
+    def ledger(self) -> Ledger:
+        return self._ledger
+
+    @property
+    def bars(self) -> Bars:
+        return self._bars
+
+    @property
+    def tape_file(self) -> str:
+        """Path of the MappedTradeTape, None without one"""
+        return self._mapped.path if self._mapped is not None else None
@@ -0,0 +1,478 @@
+import collections
+import enum
+import math
+import multiprocessing as mp
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+from synthetic_exchange import wire
+from synthetic_exchange.order import Order
+
+
+class Transport(enum.Enum):
+    # multiprocessing.Queue, orders are pickled and go through a pipe
+    Queue = "queue"
+    # OrderRing, orders are fixed-size binary records in shared memory
+    Ring = "ring"
+    # LocalQueue, producers and consumer in one process, as in a Simulation
+    Local = "local"
+    # BinaryQueue, orders go through a multiprocessing.Queue as wire frames
+    Binary = "binary"
+
+
+def create_queue(transport: Transport, size: int, symbol: str = None):
+    """Order queue of a market for the given transport"""
+    transport = Transport(transport)
+    if transport == Transport.Ring:
+        return OrderRing(size, symbol=symbol)
+    if transport == Transport.Local:
+        return LocalQueue(size)
+    if transport == Transport.Binary:
+        return BinaryQueue(size, symbol=symbol)
+    return mp.Queue(maxsize=size)
+
+
+class Watermark:
+    """High and low watermarks on the backlog of an order queue, the orders its book has yet to take.
+
+    Producers hold back their orders once the backlog reaches high and send again once the book has
+    brought it down to low, a busy book gets a quiet spell to catch up instead of a queue flipping
+    between full and not full. Watermarks are given as parts of the queue's capacity. The state is
+    kept by the process checking it, agents hosted in one process share it.
+    """
+
+    def __init__(self, capacity: int, high: float = 0.8, low: float = 0.5):
+        assert 0 <= low <= high <= 1, f"{__class__.__name__} invalid watermarks high: {high} low: {low}"
+        self._high = max(1, int(capacity * high))
+        self._low = int(capacity * low)
+        self._throttled = False
+
+    @property
+    def high(self) -> int:
+        return self._high
+
+    @property
+    def low(self) -> int:
+        return self._low
+
+    @property
+    def throttled(self) -> bool:
+        return self._throttled
+
+    def throttle(self, orders) -> bool:
+        """Whether producers should hold back their orders, given the backlog of the orders queue"""
+        try:
+            backlog = orders.qsize()
+        except NotImplementedError:
+            # mp.Queue where sem_getvalue() is missing, as on macOS
+            return False
+        if self._throttled:
+            self._throttled = backlog > self._low
+        else:
+            self._throttled = backlog >= self._high
+        return self._throttled
+
+
+class LocalQueue:
+    """Order queue whose producers and consumer live in the same process, orders are handed over
+    as they are. Nobody can make room while a put waits, so a full queue fails right away"""
+
+    def __init__(self, maxsize: int = 0):
+        self._maxsize = maxsize
+        self._items = collections.deque()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return 0 < self._maxsize <= len(self._items)
+
+    def put(self, kwargs: dict, block: bool = True, timeout: float = None):
+        if self.full():
+            raise queue.Full
+        self._items.append(kwargs)
+
+    def put_nowait(self, kwargs: dict):
+        self.put(kwargs, block=False)
+
+    def put_many(self, items: list, block: bool = True, timeout: float = None):
+        room = len(items) if self._maxsize <= 0 else self._maxsize - len(self._items)
+        self._items.extend(items[:room])
+        if room < len(items):
+            raise queue.Full
+
+    def get(self, block: bool = True, timeout: float = None) -> dict:
+        if not self._items:
+            raise queue.Empty
+        return self._items.popleft()
+
+    def get_nowait(self) -> dict:
+        return self.get(block=False)
+
+    def get_many(self, maxItems: int, block: bool = True, timeout: float = None) -> list:
+        if not self._items:
+            raise queue.Empty
+        items = self._items
+        return [items.popleft() for _ in range(min(maxItems, len(items)))]
+
+    def close(self):
+        self._items.clear()
+
+
+class BinaryQueue:
+    """multiprocessing.Queue of wire frames rather than pickled Order kwargs.
+
+    put() sends an order as a frame of one, put_many() the orders of a batch in as few frames as
+    their message types allow. The consumer gets Order kwargs back, what get_many() takes off the
+    queue beyond maxItems is kept for the next call. qsize() counts the orders put and not handed
+    over yet, in every process, whatever the frames they came in. put(None) hands the consumer a
+    None, as an mp.Queue does, to wake it.
+    """
+
+    def __init__(self, maxsize: int = 0, symbol: str = None):
+        self._queue = mp.Queue(maxsize=maxsize)
+        self._symbol = symbol
+        self._count = mp.Value("q", 0)
+        # Orders decoded but not handed over yet, only meaningful in the consumer
+        self._items = collections.deque()
+
+    def qsize(self) -> int:
+        return self._count.value
+
+    def empty(self) -> bool:
+        return not self._items and self._queue.empty()
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def _put(self, frame: bytes, count: int, block: bool, timeout: float):
+        # Counted first, the consumer may take the frame before put() returns
+        with self._count.get_lock():
+            self._count.value += count
+        try:
+            self._queue.put(frame, block, timeout)
+        except BaseException:
+            with self._count.get_lock():
+                self._count.value -= count
+            raise
+
+    def put(self, kwargs: dict, block: bool = True, timeout: float = None):
+        if kwargs is None:
+            self._put(None, 1, block, timeout)
+            return
+        message = wire.message_of(kwargs)
+        self._put(wire.encode(message, [kwargs]), 1, block, timeout)
+
+    def put_nowait(self, kwargs: dict):
+        self.put(kwargs, block=False)
+
+    def put_many(self, items: list, block: bool = True, timeout: float = None):
+        for frame in wire.encode_orders(items):
+            self._put(frame, wire.count(frame), block, timeout)
+
+    def get(self, block: bool = True, timeout: float = None) -> dict:
+        return self.get_many(1, block, timeout)[0]
+
+    def get_nowait(self) -> dict:
+        return self.get(block=False)
+
+    def get_many(self, maxItems: int, block: bool = True, timeout: float = None) -> list:
+        """Up to maxItems orders as Order kwargs, oldest first. Waits for the first frame unless not
+        block, raises queue.Empty when none came in time"""
+        items = self._items
+        if not items:
+            items.extend(self._decode(self._queue.get(block, timeout)))
+        while len(items) < maxItems:
+            try:
+                items.extend(self._decode(self._queue.get_nowait()))
+            except queue.Empty:
+                break
+        retval = [items.popleft() for _ in range(min(maxItems, len(items)))]
+        with self._count.get_lock():
+            self._count.value -= len(retval)
+        return retval
+
+    def _decode(self, frame) -> list:
+        return [None] if frame is None else wire.decode_items(frame, self._symbol)
+
+    def close(self):
+        self._queue.close()
+
+
+class RecordRing:
+    """Many producer, single consumer queue of fixed-size binary records in shared memory.
+
+    Items are packed into records of the _record struct in a ring of capacity slots, no pickling
+    involved. The header holds the write (head) and read (tail) counters, slot i is counter %
+    capacity. Producers take the lock to claim, fill and publish slots. The consumer reads whatever
+    was published without holding it, get_many() only takes the lock to read the head and to hand
+    back the slots it read, which also orders the reads and writes of the records around them.
+
+    The consumer that finds the ring empty flags itself asleep and waits on a semaphore, the producer
+    publishing next wakes it, so nothing spins. Subclasses give the record and its _encode() and
+    _decode(), and stand in for the mp.Queue methods their producers and consumer use.
+    """
+
+    _record = None
+    # head, tail, consumer asleep
+    _header = struct.Struct("<qqq")
+
+    def __init__(self, capacity: int = 1 << 16):
+        assert capacity > 0, f"{self.__class__.__name__} invalid capacity: {capacity}"
+        self._capacity = capacity
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=__class__._header.size + capacity * self._record.size
+        )
+        self._memory.buf[: __class__._header.size] = bytes(__class__._header.size)
+        self._owner = True
+        self._lock = mp.Lock()
+        self._wakeup = mp.Semaphore(0)
+        self._attach()
+
+    def _attach(self):
+        self._counters = self._memory.buf[: __class__._header.size].cast("q")
+        self._records = self._memory.buf[__class__._header.size :]
+        # Next record to read, only meaningful in the consumer
+        self._tail = self._counters[1]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_memory"] = self._memory.name
+        for key in ["_counters", "_records"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        # Child processes share the creator's resource tracker, attaching again registers nothing new
+        self._memory = shared_memory.SharedMemory(name=state["_memory"])
+        self._owner = False
+        self._attach()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def qsize(self) -> int:
+        return self._counters[0] - self._counters[1]
+
+    def empty(self) -> bool:
+        return self.qsize() <= 0
+
+    def full(self) -> bool:
+        return self.qsize() >= self._capacity
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """Queue one item, raises queue.Full when there is no room in time"""
+        record = self._encode(item)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 1e-5
+        while not self._publish(record):
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Full
+            time.sleep(delay)
+            delay = min(delay * 2, 1e-3)
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def put_many(self, items: list, block: bool = True, timeout: float = None):
+        """Queue items in order, as many at a time as there is room for and waking the consumer once.
+        Raises queue.Full when the ones left find no room in time"""
+        records = [self._encode(item) for item in items]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 1e-5
+        while records:
+            records = records[self._publish_many(records) :]
+            if not records:
+                break
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Full
+            time.sleep(delay)
+            delay = min(delay * 2, 1e-3)
+
+    def get(self, block: bool = True, timeout: float = None):
+        return self.get_many(1, block, timeout)[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, maxItems: int, block: bool = True, timeout: float = None) -> list:
+        """Up to maxItems items, oldest first. Waits for the first one unless not block, raises
+        queue.Empty when none came in time"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                head = self._counters[0]
+                if head == self._tail and block:
+                    self._counters[2] = 1
+            if head != self._tail:
+                break
+            if not block:
+                raise queue.Empty
+            wait = None if deadline is None else deadline - time.monotonic()
+            if (wait is None or wait > 0) and self._wakeup.acquire(timeout=wait):
+                continue
+            with self._lock:
+                self._counters[2] = 0
+            raise queue.Empty
+        count = min(head - self._tail, maxItems)
+        start = self._tail % self._capacity
+        end = min(start + count, self._capacity)
+        size = self._record.size
+        records = list(self._record.iter_unpack(self._records[start * size : end * size]))
+        if end - start < count:
+            records += self._record.iter_unpack(self._records[: (count - end + start) * size])
+        self._tail += count
+        with self._lock:
+            self._counters[1] = self._tail
+        return [self._decode(record) for record in records]
+
+    def close(self):
+        """Detach from the shared memory, the process that created the ring also frees it"""
+        self._release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+            self._owner = False
+
+    def _release(self):
+        # SharedMemory can't be closed while views of it are around
+        self._counters.release()
+        self._records.release()
+
+    def __del__(self):
+        if hasattr(self, "_records"):
+            self._release()
+
+    def _publish(self, record: bytes) -> bool:
+        with self._lock:
+            head = self._counters[0]
+            if head - self._counters[1] >= self._capacity:
+                return False
+            i = (head % self._capacity) * self._record.size
+            self._records[i : i + self._record.size] = record
+            self._counters[0] = head + 1
+            if self._counters[2]:
+                self._counters[2] = 0
+                self._wakeup.release()
+        return True
+
+    def _publish_many(self, records: list) -> int:
+        """Publish as many of records as there is room for, returns how many"""
+        size = self._record.size
+        with self._lock:
+            head = self._counters[0]
+            count = min(len(records), self._capacity - (head - self._counters[1]))
+            for record in records[:count]:
+                i = (head % self._capacity) * size
+                self._records[i : i + size] = record
+                head += 1
+            if count > 0:
+                self._counters[0] = head
+                if self._counters[2]:
+                    self._counters[2] = 0
+                    self._wakeup.release()
+        return count
+
+    def _encode(self, item) -> bytes:
+        raise NotImplementedError()
+
+    def _decode(self, record: tuple):
+        raise NotImplementedError()
+
+
+class OrderRing(RecordRing):
+    """RecordRing of orders, given and handed over as Order kwargs. Stands in for the mp.Queue
+    methods OrderBook and the agents use, put(None) included"""
+
+    # market id, agent id, order id (cancels and amends), client order id (new orders), price, quantity,
+    # timestamp, side code, kind
+    _record = struct.Struct("<qqqqdddBB6x")
+    _new, _cancel, _amend, _none = 0, 1, 2, 3
+    _no_side = 255
+    _sides = (Order.Side.Buy, Order.Side.Sell)
+
+    def __init__(self, capacity: int = 1 << 16, symbol: str = None):
+        self._symbol = symbol
+        RecordRing.__init__(self, capacity)
+
+    @staticmethod
+    def _encode(kwargs: dict) -> bytes:
+        if kwargs is None:
+            return __class__._record.pack(
+                0, 0, -1, -1, math.nan, math.nan, math.nan, __class__._no_side, __class__._none
+            )
+        side = Order.Side.parse(kwargs.get("side"))
+        price, quantity, timestamp = kwargs.get("price"), kwargs.get("quantity"), kwargs.get("timestamp")
+        if kwargs.get("cancel", False):
+            kind = __class__._cancel
+        elif kwargs.get("amend", False):
+            kind = __class__._amend
+        else:
+            kind = __class__._new
+        client_id = kwargs.get("clientid") if kind == __class__._new else None
+        return __class__._record.pack(
+            kwargs.get("marketid"),
+            kwargs.get("agentid"),
+            kwargs.get("orderid", -1) if kind != __class__._new else -1,
+            -1 if client_id is None else client_id,
+            math.nan if price is None else price,
+            math.nan if quantity is None else quantity,
+            math.nan if timestamp is None else timestamp,
+            __class__._no_side if side is None else side,
+            kind,
+        )
+
+    def _decode(self, record: tuple) -> dict:
+        market_id, agent_id, order_id, client_id, price, quantity, timestamp, side, kind = record
+        if kind == __class__._none:
+            return None
+        kwargs = {
+            "marketid": market_id,
+            "agentid": agent_id,
+            "symbol": self._symbol,
+            "side": __class__._sides[side] if side != __class__._no_side else None,
+            "price": None if price != price else price,
+            "quantity": None if quantity != quantity else quantity,
+            "timestamp": None if timestamp != timestamp else timestamp,
+        }
+        if kind == __class__._cancel:
+            kwargs["cancel"] = True
+            kwargs["orderid"] = order_id
+        elif kind == __class__._amend:
+            kwargs["amend"] = True
+            kwargs["orderid"] = order_id
+        elif client_id >= 0:
+            kwargs["clientid"] = client_id
+        return kwargs
+
+
+class ReportRing(RecordRing):
+    """RecordRing of the execution reports order books send to the agents of one process, see
+    OrderBook. Records are wire Fill messages. A report is a dict, its event is "partial_fill", "fill"
+    or "cancel", quantity is what was filled or cancelled, timestamp the order's, in milliseconds, and
+    time when the book sent it, in seconds since the epoch. client_id is the agent's id of the order,
+    None for one sent without"""
+
+    _record = wire.layout(wire.Message.Fill)
+
+    def __init__(self, capacity: int = 1 << 12):
+        RecordRing.__init__(self, capacity)
+
+    @staticmethod
+    def _encode(report: dict) -> bytes:
+        return wire.pack(wire.Message.Fill, report)
+
+    @staticmethod
+    def _decode(record: tuple) -> dict:
+        return wire.to_item(wire.Message.Fill, record)
@@ -6,6 +6,7 @@ import os
 import tracemalloc
 
 from .application import Application
+from .manager import default_manager
 from .observer import Event, ProcessEvent
 
 
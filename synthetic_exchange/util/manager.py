@@ -0,0 +1,13 @@
+import multiprocessing as mp
+from multiprocessing.managers import SyncManager
+
+_manager = None
+
+
+def default_manager() -> SyncManager:
+    """Manager of the shared containers of objects that weren't given one, a single server process
+    started on first use rather than one per container"""
+    global _manager
+    if _manager is None:
+        _manager = mp.Manager()
+    return _manager
@@ -1,4 +1,4 @@
-import multiprocessing as mp
+from synthetic_exchange.util.manager import default_manager
 
 
 class Event:
@@ -14,8 +14,8 @@ class Event:
 
 
 class ProcessEvent:
-    def __init__(self):
-        self._handlers = mp.Manager().list()
+    def __init__(self, manager=None):
+        self._handlers = (manager or default_manager()).list()
 
     def subscribe(self, handler):
         self._handlers.append(handler)
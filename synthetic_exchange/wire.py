@@ -0,0 +1,364 @@
+"""Binary wire format of the messages between agents and order books.
+
+Every message type is a fixed-size little-endian record, defined once as a NumPy structured dtype,
+to encode and decode batches at once, and as the struct layout it has in memory, for one message at
+a time. A frame is the header (version, message type, record count) and the records, all of one
+type. Items are the dicts the rest of the exchange passes around: Order kwargs for new orders,
+cancels and amends, execution reports for fills, {"market_id", "version", "side", "price",
+"quantity"} for depth deltas.
+"""
+import enum
+import math
+import operator
+import struct
+
+import numpy as np
+
+VERSION = 2
+
+
+class Message(enum.IntEnum):
+    NewOrder = 1
+    Cancel = 2
+    # New, smaller, quantity of a resting order, which keeps its queue position
+    Amend = 3
+    # Execution report, of a partial fill, a fill or a cancel
+    Fill = 4
+    # One level of a book's depth delta
+    Depth = 5
+
+
+def _layout(fields: list, size: int) -> tuple:
+    """(dtype, struct) of the [(name, format), ...] fields packed in order in size bytes"""
+    names, formats, offsets, offset = [], [], [], 0
+    for name, fmt in fields:
+        names.append(name)
+        formats.append("<" + fmt)
+        offsets.append(offset)
+        offset += struct.calcsize("<" + fmt)
+    layout = struct.Struct("<" + "".join(fmt for _, fmt in fields) + f"{size - offset}x")
+    dtype = np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": size})
+    assert layout.size == dtype.itemsize == size
+    return dtype, layout
+
+
+# version, message type, record count
+_header = struct.Struct("<BBxxI")
+_layouts = {
+    Message.NewOrder: _layout(
+        [
+            ("market_id", "q"),
+            ("agent_id", "q"),
+            ("client_id", "q"),
+            ("price", "d"),
+            ("quantity", "d"),
+            ("timestamp", "d"),
+            ("side", "B"),
+        ],
+        56,
+    ),
+    Message.Cancel: _layout(
+        [("market_id", "q"), ("agent_id", "q"), ("order_id", "q"), ("timestamp", "d"), ("side", "B")], 40
+    ),
+    Message.Amend: _layout(
+        [
+            ("market_id", "q"),
+            ("agent_id", "q"),
+            ("order_id", "q"),
+            ("quantity", "d"),
+            ("timestamp", "d"),
+            ("side", "B"),
+        ],
+        48,
+    ),
+    Message.Fill: _layout(
+        [
+            ("market_id", "q"),
+            ("agent_id", "q"),
+            ("order_id", "q"),
+            ("client_id", "q"),
+            ("price", "d"),
+            ("quantity", "d"),
+            ("remaining", "d"),
+            ("timestamp", "d"),
+            ("time", "d"),
+            ("event", "B"),
+            ("side", "B"),
+        ],
+        80,
+    ),
+    Message.Depth: _layout(
+        [("market_id", "q"), ("version", "q"), ("price", "d"), ("quantity", "d"), ("side", "B")], 40
+    ),
+}
+
+_no_side = 255
+# Client order id of an order without one
+_no_client = -1
+_side_names = {"buy": 0, "sell": 1}
+_sides = ("BUY", "SELL")
+_events = ("partial_fill", "fill", "cancel")
+_event_codes = {event: i for i, event in enumerate(_events)}
+_depth_sides = ("bids", "asks")
+_depth_side_codes = {"bids": 0, "asks": 1}
+
+
+def dtype(message: Message) -> np.dtype:
+    return _layouts[Message(message)][0]
+
+
+def layout(message: Message) -> struct.Struct:
+    return _layouts[Message(message)][1]
+
+
+def message_of(kwargs: dict) -> Message:
+    """Message type of Order kwargs"""
+    if kwargs.get("cancel", False):
+        return Message.Cancel
+    if kwargs.get("amend", False):
+        return Message.Amend
+    return Message.NewOrder
+
+
+def _side_code(side) -> int:
+    if isinstance(side, str):
+        return _side_names.get(side.lower(), _no_side)
+    return _no_side if side is None else int(side)
+
+
+def _float(value) -> float:
+    return math.nan if value is None else value
+
+
+def _client_id(value) -> int:
+    return _no_client if value is None else value
+
+
+def _new_order_item(fields: tuple, symbol: str) -> dict:
+    market_id, agent_id, client_id, price, quantity, timestamp, side = fields
+    item = {
+        "marketid": market_id,
+        "agentid": agent_id,
+        "symbol": symbol,
+        "side": _sides[side] if side != _no_side else None,
+        "price": None if price != price else price,
+        "quantity": None if quantity != quantity else quantity,
+        "timestamp": None if timestamp != timestamp else timestamp,
+    }
+    if client_id != _no_client:
+        item["clientid"] = client_id
+    return item
+
+
+def _cancel_item(fields: tuple, symbol: str) -> dict:
+    market_id, agent_id, order_id, timestamp, side = fields
+    return {
+        "marketid": market_id,
+        "agentid": agent_id,
+        "symbol": symbol,
+        "side": _sides[side] if side != _no_side else None,
+        "timestamp": None if timestamp != timestamp else timestamp,
+        "cancel": True,
+        "orderid": order_id,
+    }
+
+
+def _amend_item(fields: tuple, symbol: str) -> dict:
+    market_id, agent_id, order_id, quantity, timestamp, side = fields
+    return {
+        "marketid": market_id,
+        "agentid": agent_id,
+        "symbol": symbol,
+        "side": _sides[side] if side != _no_side else None,
+        "quantity": None if quantity != quantity else quantity,
+        "timestamp": None if timestamp != timestamp else timestamp,
+        "amend": True,
+        "orderid": order_id,
+    }
+
+
+def _fill_item(fields: tuple, symbol: str) -> dict:
+    market_id, agent_id, order_id, client_id, price, quantity, remaining, timestamp, sent, event, side = fields
+    return {
+        "event": _events[event],
+        "market_id": market_id,
+        "agent_id": agent_id,
+        "id": order_id,
+        "client_id": client_id if client_id != _no_client else None,
+        "side": _sides[side],
+        "price": price,
+        "quantity": quantity,
+        "remaining": remaining,
+        "timestamp": timestamp,
+        "time": sent,
+    }
+
+
+def _depth_item(fields: tuple, symbol: str) -> dict:
+    market_id, version, price, quantity, side = fields
+    return {
+        "market_id": market_id,
+        "version": version,
+        "side": _depth_sides[side],
+        "price": price,
+        "quantity": quantity,
+    }
+
+
+_items = {
+    Message.NewOrder: _new_order_item,
+    Message.Cancel: _cancel_item,
+    Message.Amend: _amend_item,
+    Message.Fill: _fill_item,
+    Message.Depth: _depth_item,
+}
+
+
+# Per message, the item key of every record field in layout order, and how its values are coded: as they
+# are, floats with None as NaN, or codes of the names. Fills and depth deltas have every key. pack() and
+# records() both code items by it
+_columns = {
+    Message.NewOrder: [
+        ("marketid", None),
+        ("agentid", None),
+        ("clientid", _client_id),
+        ("price", _float),
+        ("quantity", _float),
+        ("timestamp", _float),
+        ("side", _side_code),
+    ],
+    Message.Cancel: [
+        ("marketid", None),
+        ("agentid", None),
+        ("orderid", None),
+        ("timestamp", _float),
+        ("side", _side_code),
+    ],
+    Message.Amend: [
+        ("marketid", None),
+        ("agentid", None),
+        ("orderid", None),
+        ("quantity", _float),
+        ("timestamp", _float),
+        ("side", _side_code),
+    ],
+    Message.Fill: [
+        ("market_id", None),
+        ("agent_id", None),
+        ("id", None),
+        ("client_id", _client_id),
+        ("price", None),
+        ("quantity", None),
+        ("remaining", None),
+        ("timestamp", None),
+        ("time", None),
+        ("event", _event_codes.__getitem__),
+        ("side", _side_code),
+    ],
+    Message.Depth: [
+        ("market_id", None),
+        ("version", None),
+        ("price", None),
+        ("quantity", None),
+        ("side", _depth_side_codes.__getitem__),
+    ],
+}
+
+_complete = {Message.Fill, Message.Depth}
+
+
+def _coder(message: Message):
+    """Function of an item to its record fields for message, as _columns has them"""
+    keys = [key for key, _ in _columns[message]]
+    codes = [(i, code) for i, (_, code) in enumerate(_columns[message]) if code is not None]
+    get = operator.itemgetter(*keys) if message in _complete else None
+
+    def fields(item: dict) -> list:
+        values = list(get(item) if get is not None else map(item.get, keys))
+        for i, code in codes:
+            values[i] = code(values[i])
+        return values
+
+    return fields
+
+
+_coders = {message: _coder(message) for message in Message}
+
+
+def to_fields(message: Message, item: dict) -> tuple:
+    """Record fields of an item, in layout order"""
+    return tuple(_coders[message](item))
+
+
+def to_item(message: Message, fields: tuple, symbol: str = None) -> dict:
+    """Item of the record fields, the inverse of to_fields()"""
+    return _items[message](fields, symbol)
+
+
+def pack(message: Message, item: dict) -> bytes:
+    """One record, without a frame"""
+    return _layouts[message][1].pack(*_coders[message](item))
+
+
+def records(message: Message, items: list) -> np.ndarray:
+    """Structured array of items, filled a field at a time"""
+    # Zeroed, the padding goes out as it is
+    array = np.zeros(len(items), dtype=_layouts[message][0])
+    for name, (key, code) in zip(array.dtype.names, _columns[message]):
+        values = [item[key] for item in items] if message in _complete else [item.get(key) for item in items]
+        if code is _float:
+            # None converts to NaN
+            array[name] = np.array(values, dtype=np.float64)
+        elif code is not None:
+            array[name] = [code(value) for value in values]
+        else:
+            array[name] = values
+    return array
+
+
+def encode(message: Message, items: list) -> bytes:
+    """Frame of items, all of type message"""
+    header = _header.pack(VERSION, message, len(items))
+    if len(items) == 1:
+        return header + pack(message, items[0])
+    return header + records(message, items).tobytes()
+
+
+def encode_orders(items: list) -> list:
+    """Frames of Order kwargs, one for each run of orders of the same message type"""
+    frames, start = [], 0
+    messages = [message_of(item) for item in items]
+    for i in range(1, len(items) + 1):
+        if i == len(items) or messages[i] != messages[start]:
+            frames.append(encode(messages[start], items[start:i]))
+            start = i
+    return frames
+
+
+def _header_of(frame) -> tuple:
+    version, message, count = _header.unpack_from(frame)
+    if version != VERSION:
+        raise ValueError(f"wire.decode unsupported version: {version}")
+    return Message(message), count
+
+
+def count(frame) -> int:
+    """Records in a frame"""
+    return _header_of(frame)[1]
+
+
+def decode(frame) -> tuple:
+    """(message type, structured array of the records) of a frame, raises ValueError for a version it
+    doesn't know"""
+    message, count = _header_of(frame)
+    return message, np.frombuffer(frame, dtype=_layouts[message][0], count=count, offset=_header.size)
+
+
+def decode_items(frame, symbol: str = None) -> list:
+    """Items of a frame, unpacked record by record, which beats going through decode() for dicts"""
+    message, count = _header_of(frame)
+    record, item_of = _layouts[message][1], _items[message]
+    if count == 1:
+        return [item_of(record.unpack_from(frame, _header.size), symbol)]
+    data = memoryview(frame)[_header.size : _header.size + count * record.size]
+    return [item_of(fields, symbol) for fields in record.iter_unpack(data)]
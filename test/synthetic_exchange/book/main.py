@@ -0,0 +1,30 @@
+import logging
+import unittest as ut
+from test.synthetic_exchange.book.test_compiled import CompiledBookTest, MatchingCoreTest
+from test.synthetic_exchange.book.test_dense import DenseBookTest
+from test.synthetic_exchange.book.test_depth import DepthCacheTest
+from test.synthetic_exchange.book.test_price_level import PriceLevelBookTest
+from test.synthetic_exchange.book.test_snapshot import SnapshotBufferTest
+
+
+def main():
+    loader = ut.TestLoader()
+    tests = [
+        loader.loadTestsFromTestCase(test)
+        for test in [
+            PriceLevelBookTest,
+            DenseBookTest,
+            CompiledBookTest,
+            MatchingCoreTest,
+            SnapshotBufferTest,
+            DepthCacheTest,
+        ]
+    ]
+    suite = ut.TestSuite(tests)
+    runner = ut.TextTestRunner(verbosity=2)
+    runner.run(suite)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,116 @@
+import logging
+import random
+import unittest
+
+from synthetic_exchange.book import CompiledBook, PriceLevelBook, SelfTradePolicy
+from synthetic_exchange.order import Order
+from test.synthetic_exchange.book import test_price_level
+from test.synthetic_exchange.book.test_price_level import _order
+
+if CompiledBook.available():
+    from synthetic_exchange.detail.matching import MatchingCore
+
+
+@unittest.skipUnless(CompiledBook.available(), "matching extension not built")
+class MatchingCoreTest(unittest.TestCase):
+    def setUp(self):
+        self.core = MatchingCore()
+
+    def test_match(self):
+        self.core.add(1, Order.Side.Sell, 101, 2, 7)
+        self.core.add(2, Order.Side.Sell, 101, 3, 8)
+        self.core.add(3, Order.Side.Sell, 102, 1, 8)
+        self.assertEqual(101, self.core.best(Order.Side.Sell))
+        self.assertIsNone(self.core.best(Order.Side.Buy))
+        self.assertEqual([(101, 5, 2), (102, 1, 1)], self.core.levels(Order.Side.Sell))
+        self.assertEqual((2, [(1, 101, 2)], [], False), self.core.match(Order.Side.Buy, 102, 4, 8))
+        self.assertNotIn(1, self.core)
+        self.assertEqual([2, 3], self.core.order_ids(Order.Side.Sell))
+        self.assertEqual((0, [(2, 101, 3), (3, 102, 1)], [], False), self.core.match(Order.Side.Buy, 102, 4, 9))
+        self.assertEqual(0, len(self.core))
+        self.assertEqual(0, self.core.depth(Order.Side.Sell))
+
+    def test_self_trade(self):
+        for order_id, agent_id in [(1, 7), (2, 8), (3, 9)]:
+            self.core.add(order_id, Order.Side.Sell, 101, 1, agent_id)
+        self.assertEqual((2, [(1, 101, 1)], [], True), self.core.match(Order.Side.Buy, 101, 3, 8, 1))
+        self.assertEqual([2, 3], self.core.order_ids(Order.Side.Sell))
+        self.assertEqual((1, [(3, 101, 1)], [2], False), self.core.match(Order.Side.Buy, 101, 2, 8, 2))
+        self.assertEqual(0, len(self.core))
+        self.assertIsNone(self.core.level(Order.Side.Sell, 101))
+
+    def test_duplicate_id(self):
+        self.core.add(1, Order.Side.Buy, 100, 5, 7)
+        self.assertRaises(ValueError, self.core.add, 1, Order.Side.Sell, 101, 1, 8)
+        self.assertEqual(Order.Side.Buy, self.core.side_of(1))
+        self.assertEqual([(100, 5, 1)], self.core.levels(Order.Side.Buy))
+        self.assertIsNone(self.core.level(Order.Side.Sell, 101))
+
+    def test_amend(self):
+        for order_id in range(3):
+            self.core.add(order_id, Order.Side.Buy, 100, 5, order_id)
+        self.assertEqual(5, self.core.amend(0, 2))
+        self.assertEqual([0, 1, 2], self.core.order_ids(Order.Side.Buy))
+        self.assertEqual(2, self.core.amend(0, 6))
+        self.assertEqual([1, 2, 0], self.core.order_ids(Order.Side.Buy))
+        self.assertEqual((16, 3), self.core.level(Order.Side.Buy, 100))
+        self.assertEqual(6, self.core.amend(0, 0))
+        self.assertEqual(-1, self.core.amend(0, 1))
+        self.assertEqual(2, self.core.size(Order.Side.Buy))
+
+    def test_cancel(self):
+        self.core.add(1, Order.Side.Buy, 100, 5, 1)
+        self.assertEqual(-1, self.core.cancel(1, Order.Side.Sell))
+        self.assertEqual(Order.Side.Buy, self.core.side_of(1))
+        self.assertEqual(5, self.core.cancel(1))
+        self.assertEqual(-1, self.core.cancel(1))
+        self.assertIsNone(self.core.level(Order.Side.Buy, 100))
+
+
+@unittest.skipUnless(CompiledBook.available(), "matching extension not built")
+class CompiledBookTest(test_price_level.PriceLevelBookTest):
+    """Runs every PriceLevelBook test against the compiled backend"""
+
+    def _new_book(self, **kwargs) -> CompiledBook:
+        return CompiledBook(**kwargs)
+
+    def test_same_as_price_levels(self):
+        for policy in SelfTradePolicy:
+            with self.subTest(policy=policy):
+                self._compare(policy)
+
+    def _compare(self, policy: SelfTradePolicy):
+        rng = random.Random(11)
+        kwargs = {"tickSize": 0.5, "lotSize": 0.1, "selfTradePolicy": policy}
+        compiled, levels = CompiledBook(**kwargs), PriceLevelBook(**kwargs)
+        for _ in range(2000):
+            side = rng.choice(["BUY", "SELL"])
+            kwargs = {"marketid": 0, "agentid": rng.randrange(5), "symbol": "SMBL0", "side": side}
+            kwargs.update({"price": 100 + rng.randint(-40, 40) * 0.5, "quantity": rng.randint(1, 50) / 10})
+            fills, cancels = [], []
+            for book in [compiled, levels]:
+                order, cancelled = Order(**kwargs), []
+                fills.append([(price, quantity) for _, price, quantity in book.match(order, cancelled)])
+                cancels.append([(o.price, o.remaining) for o in cancelled])
+                if order.remaining > 0 and order not in cancelled:
+                    book.add(order)
+            self.assertEqual(fills[0], fills[1])
+            self.assertEqual(cancels[0], cancels[1])
+            if rng.random() < 0.2 and len(levels) > 0:
+                i = rng.randrange(len(levels))
+                reduce = rng.random() < 0.5
+                for book in [compiled, levels]:
+                    order = (book.bids.orders() + book.asks.orders())[i]
+                    self.assertIsNotNone(book.reduce(order.id, 0.2) if reduce else book.cancel(order.id))
+        self.assertEqual(levels.l2(), compiled.l2())
+        self.assertEqual(len(levels), len(compiled))
+        self.assertEqual([o.remaining for o in levels.asks.orders()], [o.remaining for o in compiled.asks.orders()])
+        for agent_id in range(5):
+            self.assertEqual(
+                [o.remaining for o in levels.orders_of(agent_id)], [o.remaining for o in compiled.orders_of(agent_id)]
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
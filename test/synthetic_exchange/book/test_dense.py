@@ -0,0 +1,71 @@
+import logging
+import random
+import unittest
+
+from synthetic_exchange.book import DenseBook, PriceLevelBook
+from synthetic_exchange.order import Order
+from test.synthetic_exchange.book import test_price_level
+from test.synthetic_exchange.book.test_price_level import _order
+
+
+class DenseBookTest(test_price_level.PriceLevelBookTest):
+    """Runs every PriceLevelBook test against the dense backend"""
+
+    def _new_book(self, **kwargs) -> DenseBook:
+        return DenseBook(minPrice=1, maxPrice=200, **kwargs)
+
+    def test_band(self):
+        book = DenseBook(minPrice=90, maxPrice=110, tickSize=0.5)
+        self.assertTrue(book.normalize(_order("BUY", 90, 1)))
+        self.assertTrue(book.normalize(_order("SELL", 110, 1)))
+        self.assertFalse(book.normalize(_order("BUY", 89.5, 1)))
+        self.assertFalse(book.normalize(_order("SELL", 110.5, 1)))
+
+    def test_best_moves(self):
+        for price in [100, 105, 110]:
+            self.book.add(_order("BUY", price, 1, agentId=1))
+        self.book.match(_order("SELL", 105, 2, agentId=2))
+        self.assertEqual(100, self.book.best_bid())
+        self.assertEqual(1, self.book.bids.depth)
+        self.book.match(_order("SELL", 100, 1, agentId=2))
+        self.assertIsNone(self.book.best_bid())
+        self.assertEqual(0, self.book.bids.depth)
+
+    def test_skip_own_level(self):
+        self.book.add(_order("SELL", 100, 1, agentId=1))
+        self.book.add(_order("SELL", 101, 1, agentId=2))
+        self.book.add(_order("SELL", 102, 1, agentId=2))
+        buy = _order("BUY", 102, 3, agentId=1)
+        self.assertEqual([101, 102], [price for _, price, _ in self.book.match(buy)])
+        self.assertEqual(100, self.book.best_ask())
+        self.assertEqual(1, buy.remaining)
+
+    def test_same_as_price_levels(self):
+        rng = random.Random(7)
+        dense, levels = DenseBook(minPrice=50, maxPrice=150, tickSize=0.5), PriceLevelBook(tickSize=0.5)
+        for _ in range(2000):
+            side = rng.choice(["BUY", "SELL"])
+            kwargs = {"marketid": 0, "agentid": rng.randrange(5), "symbol": "SMBL0", "side": side}
+            kwargs.update({"price": 100 + rng.randint(-40, 40) * 0.5, "quantity": rng.randint(1, 5)})
+            fills = []
+            for book in [dense, levels]:
+                order = Order(**kwargs)
+                fills.append([(price, quantity) for _, price, quantity in book.match(order)])
+                if order.remaining > 0:
+                    book.add(order)
+            self.assertEqual(fills[0], fills[1])
+            if rng.random() < 0.2 and len(levels) > 0:
+                orders = levels.bids.orders() + levels.asks.orders()
+                cancelled = rng.choice(orders)
+                self.assertIsNotNone(levels.cancel(cancelled.id))
+                resting = dense.bids.orders() + dense.asks.orders()
+                self.assertIsNotNone(dense.cancel(resting[orders.index(cancelled)].id))
+        self.assertEqual(levels.l2(), dense.l2())
+        self.assertEqual(levels.l2(5), dense.l2(5))
+        self.assertEqual(levels.best_bid(), dense.best_bid())
+        self.assertEqual(levels.asks.depth, dense.asks.depth)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,86 @@
+import logging
+import random
+import unittest
+
+from synthetic_exchange.book import DepthCache, PriceLevelBook
+from synthetic_exchange.order import Order
+
+
+class DepthCacheTest(unittest.TestCase):
+    def test_update(self):
+        cache = DepthCache(depth=2)
+        self.assertEqual((0, {"bids": [], "asks": []}), cache.snapshot())
+        deltas = cache.update({"bids": [(100, 1), (99, 2), (98, 1)], "asks": [(101, 3)]})
+        self.assertEqual([("bids", 100, 1), ("bids", 99, 2), ("asks", 101, 3)], deltas)
+        self.assertEqual((1, {"bids": [(100, 1), (99, 2)], "asks": [(101, 3)]}), cache.snapshot())
+        self.assertEqual([], cache.update({"bids": [(100, 1), (99, 2)], "asks": [(101, 3)]}))
+        self.assertEqual(1, cache.version)
+
+        # Best bid gone, 98 moves into the top two
+        deltas = cache.update({"bids": [(99, 2), (98, 1)], "asks": [(101, 1)]})
+        self.assertEqual([("bids", 100, 0), ("bids", 98, 1), ("asks", 101, 1)], deltas)
+        self.assertEqual((2, {"bids": [(99, 2)], "asks": [(101, 1)]}), cache.snapshot(1))
+
+    def test_change(self):
+        book = {"bids": [(100, 1), (99, 2), (98, 1)], "asks": [(101, 3), (102, 1)]}
+        cache = DepthCache(depth=2)
+        cache.update(book)
+        l2_calls = []
+
+        def l2():
+            l2_calls.append(1)
+            return book
+
+        # A better bid pushes 99 out, a level behind a full side is ignored
+        self.assertEqual([("bids", 99, 0), ("bids", 101, 1)], cache.change([("bids", 101, 1), ("bids", 97, 5)], l2))
+        self.assertEqual([], l2_calls)
+        self.assertEqual([], cache.change([("asks", 103, 1)], l2))
+
+        # The best offer is gone, the side is refilled from the book
+        book = {"bids": [(101, 1), (100, 1)], "asks": [(102, 1), (103, 1)]}
+        self.assertEqual([("asks", 101, 0), ("asks", 103, 1)], cache.change([("asks", 101, 0)], l2))
+        self.assertEqual(1, len(l2_calls))
+        self.assertEqual((3, {"bids": [(101, 1), (100, 1)], "asks": [(102, 1), (103, 1)]}), cache.snapshot())
+
+    def test_deltas(self):
+        cache = DepthCache(depth=10, history=2)
+        self.assertEqual([], cache.deltas(0))
+        for price in [100, 101, 102]:
+            cache.update({"bids": [(price, 1)], "asks": []})
+        self.assertIsNone(cache.deltas(0))
+        self.assertEqual([2, 3], [version for version, _ in cache.deltas(1)])
+        self.assertEqual([3], [version for version, _ in cache.deltas(2)])
+        self.assertEqual([], cache.deltas(3))
+
+    def test_resync(self):
+        """Fed the levels each order touched, the cache follows the book, and a reader starting from
+        any snapshot and applying the deltas after it sees the cached levels"""
+        rng = random.Random(7)
+        book = PriceLevelBook()
+        cache = DepthCache(depth=5)
+        readers = []
+        for i in range(500):
+            side = rng.choice(["BUY", "SELL"])
+            price = rng.randint(95, 105)
+            order = Order(marketid=0, agentid=rng.randint(1, 3), symbol="SMBL0", side=side, price=price, quantity=1)
+            touched = {(1 - order.side_code, resting.ticks) for resting, _, _ in book.match(order)}
+            if order.remaining > 0:
+                book.add(order)
+                touched.add((order.side_code, order.ticks))
+            levels = []
+            for side_code, ticks in touched:
+                level = book.ladder(side_code).level(ticks)
+                levels.append((["bids", "asks"][side_code], ticks, level.lots if level is not None else 0))
+            cache.change(levels, lambda: book.l2(cache.depth))
+            self.assertEqual(book.l2(cache.depth), cache.snapshot()[1])
+            if i % 50 == 0:
+                readers.append(cache.snapshot())
+        for version, levels in readers:
+            for _, deltas in cache.deltas(version):
+                levels = DepthCache.apply(levels, deltas, cache.depth)
+            self.assertEqual(cache.snapshot()[1], levels)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,239 @@
+import logging
+import unittest
+
+from synthetic_exchange.book import PriceLevelBook, SelfTradePolicy
+from synthetic_exchange.order import Order
+
+
+def _order(side: str, price: float, quantity: float, agentId: int = 0) -> Order:
+    return Order(marketid=0, agentid=agentId, symbol="SMBL0", side=side, price=price, quantity=quantity)
+
+
+class PriceLevelBookTest(unittest.TestCase):
+    def _new_book(self, **kwargs) -> PriceLevelBook:
+        return PriceLevelBook(**kwargs)
+
+    def setUp(self):
+        self.book = self._new_book()
+
+    def test_best_prices(self):
+        self.assertIsNone(self.book.best_bid())
+        self.assertIsNone(self.book.best_ask())
+        for price in [99, 101, 100, 98]:
+            self.book.add(_order("BUY", price, 1))
+        for price in [105, 103, 104]:
+            self.book.add(_order("SELL", price, 1))
+        self.assertEqual(101, self.book.best_bid())
+        self.assertEqual(103, self.book.best_ask())
+        self.assertEqual([101, 100, 99, 98], [o.price for o in self.book.bids.orders()])
+        self.assertEqual([103, 104, 105], [o.price for o in self.book.asks.orders()])
+        self.assertEqual([101, 100], [o.price for o in self.book.bids.orders(2)])
+        self.assertEqual(7, len(self.book))
+
+    def test_level_fifo(self):
+        first = _order("SELL", 100, 2, agentId=1)
+        second = _order("SELL", 100, 3, agentId=2)
+        self.book.add(first)
+        self.book.add(second)
+        level = self.book.asks.best()
+        self.assertEqual(5, level.lots)
+        self.assertEqual(2, len(level))
+
+        buy = _order("BUY", 100, 3, agentId=3)
+        fills = self.book.match(buy)
+        self.assertEqual([(first, 100, 2), (second, 100, 1)], fills)
+        self.assertEqual(0, buy.remaining)
+        self.assertEqual(2, second.remaining)
+        self.assertEqual(2, level.lots)
+        self.assertEqual(1, len(self.book.asks))
+
+    def test_match_walks_levels(self):
+        for price in [100, 101, 102]:
+            self.book.add(_order("SELL", price, 1, agentId=1))
+        buy = _order("BUY", 101, 5, agentId=2)
+        fills = self.book.match(buy)
+        self.assertEqual([100, 101], [price for _, price, _ in fills])
+        self.assertEqual(3, buy.remaining)
+        self.assertEqual(102, self.book.best_ask())
+        self.assertEqual(1, self.book.asks.depth)
+
+    def test_match_sell(self):
+        for price in [98, 99, 100]:
+            self.book.add(_order("BUY", price, 1, agentId=1))
+        sell = _order("SELL", 99, 3, agentId=2)
+        fills = self.book.match(sell)
+        self.assertEqual([100, 99], [price for _, price, _ in fills])
+        self.assertEqual(1, sell.remaining)
+        self.assertEqual(98, self.book.best_bid())
+
+    def test_no_cross(self):
+        self.book.add(_order("SELL", 101, 1, agentId=1))
+        buy = _order("BUY", 100, 1, agentId=2)
+        self.assertEqual([], self.book.match(buy))
+        self.assertEqual(1, buy.remaining)
+
+    def test_skip_own_orders(self):
+        own = _order("SELL", 100, 1, agentId=1)
+        other = _order("SELL", 100, 1, agentId=2)
+        self.book.add(own)
+        self.book.add(other)
+        buy = _order("BUY", 100, 2, agentId=1)
+        fills = self.book.match(buy)
+        self.assertEqual([(other, 100, 1)], fills)
+        self.assertEqual([own], self.book.asks.orders())
+        self.assertEqual(1, buy.remaining)
+
+    def test_remove(self):
+        orders = [_order("BUY", 100, 1), _order("BUY", 100, 2), _order("BUY", 99, 1)]
+        for order in orders:
+            self.book.add(order)
+        self.assertIs(orders[1], self.book.find(orders[1].id))
+        self.assertTrue(self.book.remove(orders[1]))
+        self.assertFalse(self.book.remove(orders[1]))
+        self.assertEqual(1, self.book.bids.best().lots)
+        self.assertTrue(self.book.remove(orders[0]))
+        self.assertEqual(99, self.book.best_bid())
+        self.assertIsNone(self.book.find(orders[0].id))
+
+    def test_cancel(self):
+        orders = [_order("SELL", 100, 1, agentId=i) for i in range(3)]
+        for order in orders:
+            self.book.add(order)
+        self.assertIsNone(self.book.cancel(orders[1].id, "buy"))
+        self.assertIs(orders[1], self.book.cancel(orders[1].id, "sell"))
+        self.assertIsNone(self.book.cancel(orders[1].id))
+        self.assertNotIn(orders[1].id, self.book)
+        self.assertEqual([orders[0], orders[2]], self.book.asks.orders())
+        self.assertEqual(2, self.book.asks.best().lots)
+        self.assertIs(orders[2], self.book.cancel(orders[2].id))
+        self.assertIs(orders[0], self.book.cancel(orders[0].id))
+        self.assertIsNone(self.book.best_ask())
+        self.assertEqual(0, len(self.book))
+
+    def test_reduce(self):
+        first = _order("BUY", 100, 5, agentId=1)
+        second = _order("BUY", 100, 1, agentId=2)
+        self.book.add(first)
+        self.book.add(second)
+        self.assertIs(first, self.book.reduce(first.id, 2))
+        self.assertEqual(3, first.remaining)
+        self.assertEqual(4, self.book.bids.best().lots)
+        self.assertEqual([first, second], self.book.bids.orders())
+        self.book.reduce(first.id, 10)
+        self.assertNotIn(first.id, self.book)
+        self.assertEqual([second], self.book.bids.orders())
+        self.assertIsNone(self.book.reduce(first.id, 1))
+
+    def test_duplicate_id(self):
+        order = _order("BUY", 100, 1)
+        self.book.add(order)
+        self.assertRaises(ValueError, self.book.add, order)
+        self.assertEqual([order], self.book.bids.orders())
+        self.assertEqual(1, len(self.book))
+
+    def test_no_agent(self):
+        resting = _order("SELL", 100, 1, agentId=None)
+        self.book.add(resting)
+        self.book.add(_order("SELL", 101, 1, agentId=2))
+        buy = _order("BUY", 101, 1, agentId=None)
+        self.assertEqual(101, self.book.match(buy)[0][1])
+        self.assertEqual([resting], self.book.orders_of(None))
+
+    def test_fills_leave_index(self):
+        resting = [_order("SELL", 100 + i, 1, agentId=1) for i in range(3)]
+        for order in resting:
+            self.book.add(order)
+        self.book.match(_order("BUY", 101, 2, agentId=2))
+        self.assertNotIn(resting[0].id, self.book)
+        self.assertNotIn(resting[1].id, self.book)
+        self.assertIn(resting[2].id, self.book)
+        self.assertEqual(1, len(self.book))
+
+    def test_normalize(self):
+        book = PriceLevelBook(tickSize=0.1, lotSize=0.5)
+        buy = _order("BUY", 100.37, 1.2)
+        self.assertTrue(book.normalize(buy))
+        self.assertEqual((1003, 2), (buy.ticks, buy.lots))
+        self.assertEqual((100.3, 1.0, 1.0), (buy.price, buy.quantity, buy.remaining))
+        sell = _order("SELL", 100.31, 0.5)
+        self.assertTrue(book.normalize(sell))
+        self.assertEqual((1004, 100.4), (sell.ticks, sell.price))
+        # Prices already on the grid stay there despite float noise
+        exact = _order("SELL", 100.3, 1)
+        book.normalize(exact)
+        self.assertEqual(1003, exact.ticks)
+        self.assertFalse(book.normalize(_order("BUY", 100, 0.4)))
+
+    def test_fractional_lots(self):
+        book = PriceLevelBook(tickSize=0.01, lotSize=0.1)
+        book.add(_order("SELL", 10.01, 0.3, agentId=1))
+        book.add(_order("SELL", 10.02, 0.2, agentId=1))
+        buy = _order("BUY", 10.02, 0.4, agentId=2)
+        fills = book.match(buy)
+        self.assertEqual([(10.01, 0.3), (10.02, 0.1)], [(price, quantity) for _, price, quantity in fills])
+        self.assertEqual(0, buy.remaining)
+        self.assertEqual(0.1, book.asks.orders()[0].remaining)
+        self.assertEqual(1, book.asks.best().lots)
+
+    def _self_trade_book(self, policy: SelfTradePolicy) -> tuple:
+        """Book with offers from agents 2 and 1 at 100 then agent 3 at 101, and agent 1's buy for all of it"""
+        book = self._new_book(selfTradePolicy=policy)
+        resting = [_order("SELL", 100, 1, agentId=agent_id) for agent_id in [2, 1]]
+        resting.append(_order("SELL", 101, 1, agentId=3))
+        for order in resting:
+            book.add(order)
+        return book, resting, _order("BUY", 101, 3, agentId=1)
+
+    def test_self_trade_skip(self):
+        book, resting, buy = self._self_trade_book(SelfTradePolicy.Skip)
+        cancelled = []
+        fills = book.match(buy, cancelled)
+        self.assertEqual([resting[0], resting[2]], [order for order, _, _ in fills])
+        self.assertEqual([], cancelled)
+        self.assertEqual(1, buy.remaining)
+        self.assertEqual([resting[1]], book.asks.orders())
+
+    def test_self_trade_cancel_newest(self):
+        book, resting, buy = self._self_trade_book(SelfTradePolicy.CancelNewest)
+        cancelled = []
+        fills = book.match(buy, cancelled)
+        self.assertEqual([resting[0]], [order for order, _, _ in fills])
+        self.assertEqual([buy], cancelled)
+        self.assertEqual(2, buy.remaining)
+        self.assertEqual(resting[1:], book.asks.orders())
+        self.assertEqual([resting[1]], book.orders_of(1))
+
+    def test_self_trade_cancel_oldest(self):
+        book, resting, buy = self._self_trade_book(SelfTradePolicy.CancelOldest)
+        cancelled = []
+        fills = book.match(buy, cancelled)
+        self.assertEqual([resting[0], resting[2]], [order for order, _, _ in fills])
+        self.assertEqual([resting[1]], cancelled)
+        self.assertEqual(1, buy.remaining)
+        self.assertEqual(0, len(book))
+        self.assertEqual([], book.orders_of(1))
+        self.assertEqual({"bids": [], "asks": []}, book.l2())
+
+    def test_orders_of(self):
+        orders = [_order("BUY", 99, 1, agentId=1), _order("SELL", 101, 1, agentId=1), _order("BUY", 100, 2, agentId=1)]
+        for order in orders:
+            self.book.add(order)
+        self.book.add(_order("BUY", 100, 1, agentId=2))
+        self.assertEqual([orders[0], orders[2]], self.book.orders_of(1, "BUY"))
+        self.assertEqual(orders, self.book.orders_of(1))
+        self.book.match(_order("SELL", 100, 2, agentId=3))
+        self.book.cancel(orders[1].id)
+        self.assertEqual([orders[0]], self.book.orders_of(1))
+        self.assertEqual([], self.book.orders_of(3))
+
+    def test_levels(self):
+        self.book.add(_order("BUY", 100, 1))
+        self.book.add(_order("BUY", 100, 2))
+        self.book.add(_order("BUY", 99, 4))
+        self.assertEqual([(100, 3), (99, 4)], [(lvl.price, lvl.lots) for lvl in self.book.bids.levels()])
+        self.assertEqual([(100, 3)], [(lvl.price, lvl.lots) for lvl in self.book.bids.levels(1)])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
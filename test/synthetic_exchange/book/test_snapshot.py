@@ -0,0 +1,42 @@
+import logging
+import multiprocessing as mp
+import unittest
+
+from synthetic_exchange.book import SnapshotBuffer
+
+
+def _publish(buffer: SnapshotBuffer, count: int):
+    for i in range(count):
+        buffer.publish({"bids": [i], "asks": []})
+
+
+class SnapshotBufferTest(unittest.TestCase):
+    def test_empty(self):
+        buffer = SnapshotBuffer(size=1024)
+        self.assertEqual((0, None), buffer.read())
+
+    def test_publish(self):
+        buffer = SnapshotBuffer(size=1024)
+        self.assertEqual(1, buffer.publish({"bids": [1], "asks": [2]}))
+        self.assertEqual((1, {"bids": [1], "asks": [2]}), buffer.read())
+        first = buffer.read()[1]
+        self.assertIs(first, buffer.read()[1])  # unchanged version is served from cache
+        buffer.publish({"bids": [], "asks": []})
+        self.assertEqual((2, {"bids": [], "asks": []}), buffer.read())
+
+    def test_too_large(self):
+        buffer = SnapshotBuffer(size=16)
+        self.assertEqual(0, buffer.publish(list(range(100))))
+        self.assertEqual((0, None), buffer.read())
+
+    def test_other_process(self):
+        buffer = SnapshotBuffer(size=1024)
+        process = mp.Process(target=_publish, args=(buffer, 5))
+        process.start()
+        process.join()
+        self.assertEqual((5, {"bids": [4], "asks": []}), buffer.read())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -99,6 +99,22 @@ class ClockTest(unittest.TestCase):
 		self.clock_backtest.backtest_til()
 		self.assertGreaterEqual(self.clock_backtest.current_timestamp, self.backtest_end_timestamp)
 
+	def test_python_iterator(self):
+		class Counter(TimeIterator):
+			def __init__(self):
+				TimeIterator.__init__(self)
+				self.ticks = []
+
+			def tick(self, timestamp: float):
+				TimeIterator.tick(self, timestamp)
+				self.ticks.append(timestamp)
+
+		counter = Counter()
+		self.clock_backtest.add_iterator(counter)
+		self.clock_backtest.backtest_til(self.backtest_start_timestamp + 3 * self.tick_size)
+		self.assertEqual([self.backtest_start_timestamp + i * self.tick_size for i in range(1, 4)], counter.ticks)
+		self.assertEqual(counter.ticks[-1], counter.current_timestamp)
+
 
 if __name__ == "__main__":
 	logging.basicConfig(level=logging.DEBUG)
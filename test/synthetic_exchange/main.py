@@ -2,11 +2,27 @@ import logging
 import unittest as ut
 import matplotlib.pyplot as plt
 from test.synthetic_exchange.test_agent import AgentTest
+from test.synthetic_exchange.test_bars import BarsTest
 from test.synthetic_exchange.test_exchange import ExchangeTest
 from test.synthetic_exchange.test_exchanges import ExchangesTest
+from test.synthetic_exchange.test_execution import ExecutionReportTest
+from test.synthetic_exchange.test_import import ImportTest
+from test.synthetic_exchange.test_ledger import LedgerTest
 from test.synthetic_exchange.test_market import MarketTest
 from test.synthetic_exchange.test_markets import MarketsTest
+from test.synthetic_exchange.test_order import OrderTest
+from test.synthetic_exchange.test_orderbook import (
+    OrderBookBatchTest,
+    OrderBookMatchingTest,
+    OrderBookSnapshotTest,
+)
+from test.synthetic_exchange.test_runtime import AgentPoolTest, AgentRuntimeTest
+from test.synthetic_exchange.test_scheduler import BookSchedulerTest
+from test.synthetic_exchange.test_simulation import SimulationTest
+from test.synthetic_exchange.test_tape import MappedTradeTapeTest, TradeTapeTest
 from test.synthetic_exchange.test_transactions import TransactionsTest
+from test.synthetic_exchange.test_transport import LocalQueueTest, OrderRingTest, WatermarkTest
+from test.synthetic_exchange.test_wire import WireTest
 
 
 def main():
@@ -14,10 +30,28 @@ def main():
     tests = [
         loader.loadTestsFromTestCase(test)
         for test in [
+            ImportTest,
             AgentTest,
             MarketTest,
             MarketsTest,
+            OrderTest,
+            OrderBookMatchingTest,
+            OrderBookSnapshotTest,
+            OrderBookBatchTest,
+            TradeTapeTest,
+            MappedTradeTapeTest,
             TransactionsTest,
+            LedgerTest,
+            BarsTest,
+            OrderRingTest,
+            LocalQueueTest,
+            WatermarkTest,
+            WireTest,
+            ExecutionReportTest,
+            SimulationTest,
+            AgentRuntimeTest,
+            AgentPoolTest,
+            BookSchedulerTest,
             ExchangeTest,
             ExchangesTest,
         ]
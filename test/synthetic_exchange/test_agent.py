@@ -3,7 +3,11 @@ import multiprocessing as mp
 import time
 import unittest
 
+from synthetic_exchange.order import Order
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.strategy.execution import ExecutionReceiver
 from synthetic_exchange.strategy.random_normal import RandomNormal
+from synthetic_exchange.transport import LocalQueue, Watermark
 from synthetic_exchange.strategy.random_uniform import RandomUniform
 
 
@@ -62,6 +66,83 @@ class AgentTest(unittest.TestCase):
         for agent in self._agents:
             agent.wait()
 
+    def test_inflight_retention(self):
+        agent = RandomNormal(
+            marketId=0,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=1,
+            maxQuantity=2,
+            queue=LocalQueue(),
+            hosted=True,
+            seed=1,
+            inflightRetention=3,
+        )
+        for i in range(5):
+            agent.step(float(i))
+        self.assertEqual(3, len(agent._inflight_orders))
+        self.assertEqual(list(agent._inflight_ids), list(agent._inflight_orders))
+
+    def test_inflight_throttled(self):
+        orders = LocalQueue()
+        agent = RandomNormal(
+            marketId=0,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=1,
+            maxQuantity=2,
+            queue=orders,
+            hosted=True,
+            seed=1,
+            watermark=Watermark(10, 0.8, 0.5),
+        )
+        for _ in range(8):
+            orders.put({})
+        # Held back, the second order replacing the first
+        agent.step(1.0)
+        agent.step(2.0)
+        self.assertEqual(0, len(agent._inflight_orders))
+        orders.get_many(8)
+        # The held order goes out first, then the new one, both in flight
+        agent.step(3.0)
+        self.assertEqual([2000.0, 3000.0], [order.timestamp for order in agent._inflight_orders.values()])
+        # The replaced order's client id is never seen again
+        self.assertEqual([1, 2], list(agent._inflight_orders))
+        self.assertEqual([2000.0, 3000.0], [kwargs["timestamp"] for kwargs in orders.get_many(2)])
+
+    def test_inflight_reports(self):
+        orders, reports = LocalQueue(), LocalQueue()
+        agent = RandomNormal(
+            marketId=0,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=2,
+            maxQuantity=4,
+            queue=orders,
+            hosted=True,
+            seed=1,
+        )
+        receiver = ExecutionReceiver(reports)
+        receiver.add(agent)
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=orders, reports={agent.id: reports})
+        agent.step(1.0)
+        agent.step(2.0)
+        orderbook.drain()
+        # The book's ids are its own, the reports carry the agent's back
+        first, second = sorted(orderbook.buy_orders() + orderbook.sell_orders(), key=lambda order: order.client_id)
+        self.assertEqual([0, 1], [first.client_id, second.client_id])
+        cancel = {"marketid": 0, "agentid": agent.id, "symbol": "SMBL0", "side": first.side, "cancel": True}
+        orders.put(dict(cancel, orderid=first.id))
+        side = "SELL" if second.is_buy else "BUY"
+        orders.put(
+            {"marketid": 0, "agentid": 99, "symbol": "SMBL0", "side": side, "price": second.price, "quantity": 1}
+        )
+        orderbook.drain()
+        self.assertEqual(2, receiver.receive())
+        self.assertEqual([1], list(agent._inflight_orders))
+        inflight = agent._inflight_orders[1]
+        self.assertEqual((second.remaining, Order.State.PartialFill), (inflight.remaining, inflight.state))
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
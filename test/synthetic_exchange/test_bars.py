@@ -0,0 +1,89 @@
+import multiprocessing as mp
+import random
+import unittest
+
+import numpy as np
+
+from synthetic_exchange.bars import Bars
+from synthetic_exchange.util import default_manager
+
+
+def _trades(count: int, seed: int = 5) -> list:
+    """(timestamp in ms, price, quantity) a few hundred ms apart"""
+    rng = random.Random(seed)
+    timestamp, trades = 0.0, []
+    for _ in range(count):
+        timestamp += rng.randint(0, 900)
+        trades.append((timestamp, 100.0 + rng.randint(-5, 5), float(rng.randint(1, 5))))
+    return trades
+
+
+def _expected(trades: list, interval: float) -> dict:
+    """Bars of the trades, grouped all at once"""
+    bars = {}
+    for timestamp, price, quantity in trades:
+        bars.setdefault(timestamp // (interval * 1000) * interval * 1000, []).append((price, quantity))
+    rows = []
+    for start, fills in sorted(bars.items()):
+        prices = [price for price, _ in fills]
+        volume = sum(quantity for _, quantity in fills)
+        vwap = sum(price * quantity for price, quantity in fills) / volume
+        rows.append((start, prices[0], max(prices), min(prices), prices[-1], volume, vwap, len(fills)))
+    names = ["start", "open", "high", "low", "close", "volume", "vwap", "count"]
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def _write(bars: Bars, trades: list):
+    for trade in trades:
+        bars.update(*trade)
+    bars.publish()
+
+
+class BarsTest(unittest.TestCase):
+    def test_update(self):
+        trades = _trades(2000)
+        bars = Bars(intervals=[1, 60, 3600], chunkSize=64)
+        for trade in trades:
+            bars.update(*trade)
+        for interval in bars.intervals:
+            expected = _expected(trades, interval)
+            columns = bars.bars(interval)
+            for name, column in columns.items():
+                self.assertTrue(np.allclose(expected[name], column), f"{interval} {name}")
+            # The open bar is the last one
+            self.assertEqual(len(expected["start"]) - 1, len(bars.tape(interval)))
+            self.assertEqual(len(expected["start"]) - 1, len(bars.bars(interval, current=False)["start"]))
+            self.assertEqual(expected["close"][-1], bars.last(interval)["close"])
+        frame = bars.to_frame(60, ["close", "count"])
+        self.assertEqual(["close", "count"], list(frame.columns))
+        self.assertEqual(sum(frame["count"]), len(trades))
+
+    def test_late_trade(self):
+        bars = Bars(intervals=[1])
+        bars.update(1500.0, 100.0, 1.0)
+        # Matched after a trade of the next second
+        bars.update(2100.0, 101.0, 1.0)
+        bars.update(1900.0, 99.0, 2.0)
+        columns = bars.bars(1)
+        self.assertEqual([1000.0, 2000.0], columns["start"].tolist())
+        self.assertEqual([1, 2], columns["count"].tolist())
+        self.assertEqual((99.0, 99.0, 3.0), (columns["low"][1], columns["close"][1], columns["volume"][1]))
+        self.assertAlmostEqual((101.0 + 2 * 99.0) / 3, columns["vwap"][1])
+
+    def test_empty(self):
+        bars = Bars(intervals=[60])
+        self.assertEqual(0, len(bars.bars(60)["start"]))
+        self.assertIsNone(bars.last(60))
+
+    def test_shared(self):
+        trades = _trades(500)
+        bars = Bars(intervals=[1, 60], chunkSize=16, shared=True, manager=default_manager())
+        process = mp.Process(target=_write, args=(bars, trades))
+        process.start()
+        process.join()
+        # The closed bars and the open one, as published
+        for interval in bars.intervals:
+            expected = _expected(trades, interval)
+            columns = bars.bars(interval)
+            for name, column in columns.items():
+                self.assertTrue(np.allclose(expected[name], column), f"{interval} {name}")
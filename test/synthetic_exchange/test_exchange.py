@@ -8,6 +8,7 @@ from synthetic_exchange.exchange import Exchange
 from synthetic_exchange.market import Market
 from synthetic_exchange.order import Order
 from synthetic_exchange.strategy import RandomNormal, RandomUniform
+from synthetic_exchange.util import default_manager
 
 
 class ExchangeTest(unittest.TestCase):
@@ -99,6 +100,21 @@ class ExchangeTest(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def test_shared_manager(self):
+        logging.info(f"{__class__.__name__}.test_shared_manager")
+        # The shared containers of every agent, book and trade history live in the one default manager
+        before = set(mp.active_children())
+        exchange = Exchange(config=self._config)
+        # Releases the agents' report rings
+        self.addCleanup(exchange.stop)
+        self.assertEqual(set(mp.active_children()) - before, set())
+        address = default_manager().address
+        for agents in exchange._agents.values():
+            for agent in agents.values():
+                self.assertEqual(agent._positions._token.address, address)
+        for transactions in exchange._transactions.values():
+            self.assertEqual(transactions.history._blocks._token.address, address)
+
     def test_exchange(self):
         logging.info(f"{__class__.__name__}.test_exchange")
 
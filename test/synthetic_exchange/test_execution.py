@@ -0,0 +1,162 @@
+import logging
+import queue
+import time
+import unittest
+
+from synthetic_exchange.exchange import Exchange
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.scheduler import BookWorker
+from synthetic_exchange.strategy.execution import ExecutionReceiver
+from synthetic_exchange.transport import LocalQueue, OrderRing, ReportRing
+from test.synthetic_exchange.test_simulation import _config
+
+
+def _kwargs(agentId: int, side: str, price: float, quantity: float = 1.0) -> dict:
+    return {"marketid": 0, "agentid": agentId, "symbol": "SMBL0", "side": side, "price": price, "quantity": quantity}
+
+
+def _report(agentId: int, orderId: int, event: str = "fill") -> dict:
+    return {
+        "event": event,
+        "market_id": 0,
+        "agent_id": agentId,
+        "id": orderId,
+        "client_id": orderId + 100,
+        "side": "SELL",
+        "price": 100.0,
+        "quantity": 2.0,
+        "remaining": 0.0,
+        "timestamp": 1000.0,
+        "time": 1.5,
+    }
+
+
+class _Channel(LocalQueue):
+    """LocalQueue counting the batches put on it"""
+
+    def __init__(self):
+        LocalQueue.__init__(self)
+        self.batches = 0
+
+    def put_many(self, items: list, block: bool = True, timeout: float = None):
+        self.batches += 1
+        LocalQueue.put_many(self, items, block, timeout)
+
+
+class _Agent:
+    def __init__(self, agentId: int):
+        self.id = agentId
+        self.market_id = 0
+        self.events = []
+
+    def execution_report(self, event: dict):
+        self.events.append(event)
+
+
+class ExecutionReportTest(unittest.TestCase):
+    def test_report_ring(self):
+        ring = ReportRing(4)
+        try:
+            reports = [_report(1, i, event) for i, event in enumerate(["partial_fill", "fill", "cancel"])]
+            ring.put_many(reports)
+            self.assertEqual(reports, ring.get_many(8))
+            # Wraps around, what doesn't fit is refused
+            with self.assertRaises(queue.Full):
+                ring.put_many([_report(1, i) for i in range(5)], block=False)
+            self.assertEqual(list(range(4)), [report["id"] for report in ring.get_many(8)])
+        finally:
+            ring.close()
+
+    def test_orderbook_reports(self):
+        orders, channels = LocalQueue(), {1: _Channel(), 2: _Channel()}
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=orders, reports=channels)
+        orders.put(dict(_kwargs(1, "SELL", 100.0, 2.0), clientid=10))
+        orders.put(dict(_kwargs(1, "SELL", 101.0, 2.0), clientid=11))
+        orders.put(dict(_kwargs(2, "BUY", 101.0, 3.0), clientid=20))
+        orderbook.drain()
+        # Maker and taker hear of every fill, each channel gets the batch's reports at once
+        self.assertEqual([1, 1], [channel.batches for channel in channels.values()])
+        maker = channels[1].get_many(8)
+        taker = channels[2].get_many(8)
+        self.assertEqual(
+            [("fill", 100.0, 2.0, 0.0), ("partial_fill", 101.0, 1.0, 1.0)],
+            [(report["event"], report["price"], report["quantity"], report["remaining"]) for report in maker],
+        )
+        self.assertEqual(
+            [("partial_fill", 100.0, 2.0, 1.0), ("fill", 101.0, 1.0, 0.0)],
+            [(report["event"], report["price"], report["quantity"], report["remaining"]) for report in taker],
+        )
+        self.assertTrue(all(report["time"] > 0 for report in maker + taker))
+        # Each report carries the agent's own id of its order
+        self.assertEqual([10, 11, 20, 20], [report["client_id"] for report in maker + taker])
+        resting = maker[1]["id"]
+        orders.put({"marketid": 0, "agentid": 1, "symbol": "SMBL0", "side": "SELL", "cancel": True, "orderid": resting})
+        orderbook.drain()
+        self.assertEqual(
+            [("cancel", resting, 1.0)],
+            [(report["event"], report["id"], report["quantity"]) for report in channels[1].get_many(8)],
+        )
+        self.assertTrue(channels[2].empty())
+
+    def test_receiver(self):
+        channel = LocalQueue()
+        receiver = ExecutionReceiver(channel)
+        agents = [_Agent(1), _Agent(2)]
+        for agent in agents:
+            receiver.add(agent)
+        channel.put_many([_report(2, 10), _report(1, 11), _report(3, 12)])
+        # Reports for agents it doesn't serve are left out
+        self.assertEqual(2, receiver.receive())
+        self.assertEqual([[11], [10]], [[event["id"] for event in agent.events] for agent in agents])
+
+    def test_book_worker(self):
+        orders, reports = OrderRing(1024, symbol="SMBL0"), ReportRing(1024)
+        orderbook = OrderBook(
+            marketId=0, symbol="SMBL0", transactions=None, queue=orders, reports={1: reports, 2: reports}
+        )
+        worker = BookWorker([orderbook])
+        worker.start()
+        try:
+            orders.put(_kwargs(1, "SELL", 100.0))
+            orders.put(_kwargs(2, "BUY", 100.0))
+            received = []
+            deadline = time.monotonic() + 5.0
+            while len(received) < 2 and time.monotonic() < deadline:
+                try:
+                    received += reports.get_many(8, timeout=0.1)
+                except queue.Empty:
+                    pass
+            received = sorted((report["agent_id"], report["event"]) for report in received)
+            self.assertEqual([(1, "fill"), (2, "fill")], received)
+        finally:
+            worker.stop()
+            worker.join()
+            orders.close()
+            reports.close()
+
+    def test_simulation(self):
+        exchange = Exchange(config=_config(seed=1, endTime=600.0))
+        filled = {}
+
+        def on_execution(event: dict):
+            if event["event"] != "cancel":
+                filled[event["agent_id"]] = filled.get(event["agent_id"], 0.0) + event["quantity"]
+
+        for agent in exchange._agents[0].values():
+            agent.orderbook_event = on_execution
+        exchange.start()
+        exchange.stop()
+        traded = {}
+        columns = exchange._transactions[0].history.columns(["buy_agent_id", "sell_agent_id", "quantity"])
+        for buy_agent_id, sell_agent_id, quantity in zip(*(column.tolist() for column in columns.values())):
+            for agent_id in [buy_agent_id, sell_agent_id]:
+                traded[agent_id] = traded.get(agent_id, 0.0) + quantity
+        self.assertGreater(len(traded), 0)
+        self.assertEqual(traded.keys(), filled.keys())
+        for agent_id, quantity in traded.items():
+            self.assertAlmostEqual(quantity, filled[agent_id])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
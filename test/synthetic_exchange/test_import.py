@@ -0,0 +1,41 @@
+import logging
+import subprocess
+import sys
+import unittest
+
+
+class ImportTest(unittest.TestCase):
+    """python -X importtime of the package, paid again by every agent and order book process"""
+
+    # Only loaded by Market.reports / Reports
+    _lazy = ["matplotlib", "pandas", "synthetic_exchange.reports"]
+
+    @staticmethod
+    def _importtime(module: str) -> dict:
+        """Cumulative microseconds of every module imported by import module, in a fresh interpreter"""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+        )
+        retval = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            retval[name.strip()] = int(cumulative)
+        return retval
+
+    def test_lazy_reports(self):
+        modules = __class__._importtime("synthetic_exchange")
+        for name in __class__._lazy:
+            loaded = [module for module in modules if module == name or module.startswith(name + ".")]
+            self.assertEqual([], loaded, f"{name} imported with synthetic_exchange")
+
+    def test_import_time(self):
+        # Only logged, wall clock time depends on the machine and its load
+        seconds = __class__._importtime("synthetic_exchange")["synthetic_exchange"] / 1e6
+        logging.info(f"{__class__.__name__}.test_import_time import synthetic_exchange: {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
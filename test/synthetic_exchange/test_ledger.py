@@ -0,0 +1,56 @@
+import random
+import types
+import unittest
+
+from synthetic_exchange.ledger import Ledger
+from synthetic_exchange.order import Order
+from synthetic_exchange.transaction import Transaction, Transactions
+from synthetic_exchange.util import default_manager
+
+
+def _agent() -> types.SimpleNamespace:
+    return types.SimpleNamespace(position=0.0, quantity_bought=0.0, quantity_sold=0.0, value_bought=0.0, value_sold=0.0)
+
+
+def _order(agentId: int, side: str, price: float) -> Order:
+    return Order(marketid=0, agentid=agentId, symbol="SMBL0", side=side, price=price, quantity=5.0, timestamp=1.0)
+
+
+class LedgerTest(unittest.TestCase):
+    def test_running_totals(self):
+        # The same figures as the agents' totals, kept the old way, after every trade
+        rng = random.Random(3)
+        agents = {agent_id: _agent() for agent_id in range(3)}
+        transactions = Transactions(agents, shared=False)
+        for _ in range(200):
+            buyer, seller = rng.sample(sorted(agents), 2)
+            price = 100.0 + rng.randint(-5, 5)
+            transactions.create(_order(buyer, "BUY", price), _order(seller, "SELL", price), 0, price, rng.randint(1, 5))
+        for agent_id, agent in agents.items():
+            position = transactions.ledger.position(agent_id)
+            self.assertAlmostEqual(agent.position, position["position"])
+            self.assertAlmostEqual(agent.value_bought, position["value_bought"])
+            self.assertAlmostEqual(Transaction.calculate_profit(agent, 0), position["realized"])
+            history = transactions.ledger.history(agent_id)
+            self.assertEqual(position["fills"], len(history["trade_id"]))
+            self.assertAlmostEqual(position["realized"], history["realized"][-1])
+
+    def test_sample_every(self):
+        ledger = Ledger(sampleEvery=3, chunkSize=2)
+        for i in range(10):
+            ledger.record(i, float(i), 1, 2, 100.0 + i, 1.0)
+        self.assertEqual([2, 5, 8], ledger.history(1, ["trade_id"])["trade_id"].tolist())
+        self.assertEqual([-3.0, -6.0, -9.0], ledger.history(2)["position"].tolist())
+        self.assertEqual(10, ledger.position(1)["fills"])
+        self.assertIsNone(ledger.position(3))
+        # A round trip realizes the difference of the VWAPs
+        ledger.fill(10, 10.0, 1, False, 110.0, 10.0)
+        self.assertAlmostEqual(10 * (110.0 - 104.5), ledger.position(1)["realized"])
+
+    def test_shared(self):
+        agents = {1: _agent(), 2: _agent()}
+        transactions = Transactions(agents, manager=default_manager())
+        transactions.create(_order(1, "BUY", 100.0), _order(2, "SELL", 100.0), 0, 100.0, 2.0)
+        self.assertEqual(1, transactions.publish())
+        self.assertEqual(2, len(transactions.ledger.samples._blocks[0]["agent_id"]))
+        self.assertEqual(0, transactions.publish())
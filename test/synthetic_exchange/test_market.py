@@ -93,9 +93,7 @@ class MarketTest(unittest.TestCase):
         # Empty transactions since there is no OrderBook process
         if self._transactions is not None:
             history = self._transactions.history
-            logging.info(f"---{__class__.__name__}.test_market history: {history}")
-            transactions = self._transactions.transactions
-            logging.info(f"---{__class__.__name__}.test_market transactions: {transactions}")
+            logging.info(f"---{__class__.__name__}.test_market history: {history.to_frame()}")
 
 
 if __name__ == "__main__":
@@ -117,6 +117,8 @@ class MarketsTest(unittest.TestCase):
                 transactions=cls._transactions[market_id],
                 queue=cls._queues[market_id],
                 wait=5,
+                tickSize=tick_size,
+                lotSize=min_quantity,
             )
             cls._markets[market_id] = Market(orderbook=cls._orderbooks[market_id])
 
@@ -141,17 +143,10 @@ class MarketsTest(unittest.TestCase):
         for _, market in self._markets.items():
             market.stop()
 
-        # Show all transactions
-        for _, market in self._markets.items():
-            print(f"******{market.symbol} transactions*******")
-            for k, v in market.transactions.transactions.items():
-                print(v)
-            print(f"******{market.symbol} transactions*******")
         # Show history
         for _, market in self._markets.items():
             print(f"******{market.symbol} history*******")
-            for v in market.transactions.history:
-                print(v)
+            print(market.transactions.history.to_frame())
             print(f"******{market.symbol} history*******")
 
         for _, ob in self._orderbooks.items():
@@ -0,0 +1,70 @@
+import logging
+import pickle
+import unittest
+
+from synthetic_exchange.order import Order
+from synthetic_exchange.transaction import Transaction
+
+
+class OrderTest(unittest.TestCase):
+    def test_side(self):
+        for side in ["BUY", "buy", "Buy", Order.Side.Buy, 0]:
+            order = Order(marketid=0, agentid=1, symbol="SMBL0", side=side, price=100, quantity=1)
+            self.assertIs(Order.Side.Buy, order.side_code)
+            self.assertEqual("BUY", order.side)
+            self.assertTrue(order.is_buy)
+        order = Order(marketid=0, agentid=1, symbol="SMBL0", side="sell", price=100, quantity=1)
+        self.assertEqual("SELL", order.side)
+        self.assertFalse(order.is_buy)
+        order = Order(marketid=0, agentid=1, symbol="SMBL0", side="hold", price=100, quantity=1)
+        self.assertIsNone(order.side_code)
+        self.assertIsNone(order.side)
+
+    def test_slots(self):
+        order = Order(marketid=0, agentid=1, symbol="SMBL0", side="BUY", price=100, quantity=1)
+        self.assertFalse(hasattr(order, "__dict__"))
+        with self.assertRaises(AttributeError):
+            order.unknown = 1
+
+    def test_timestamp(self):
+        self.assertEqual(5.0, Order(side="BUY", timestamp=5.0).timestamp)
+        self.assertEqual(5.0, Order(side="BUY", timestamp="5").timestamp)
+        self.assertIsInstance(Order(side="BUY").timestamp, float)
+
+    def test_create(self):
+        order = Order.create(0, 1, "SMBL0", Order.Side.Sell, 100, 2, 5.0)
+        expected = Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", price=100, quantity=2, timestamp=5.0)
+        expected.id = order.id
+        self.assertEqual(expected.to_dict(), order.to_dict())
+        self.assertEqual((None, 3), (order.client_id, Order.create(0, 1, "SMBL0", 0, 100, 2, 5.0, 3).client_id))
+        self.assertEqual(3, Order(marketid=0, agentid=1, side="BUY", clientid=3).client_id)
+
+    def test_to_dict(self):
+        order = Order(marketid=0, agentid=1, symbol="SMBL0", side="BUY", price=100, quantity=2, timestamp=5.0)
+        data = order.to_dict()
+        self.assertEqual("BUY", data["side"])
+        self.assertEqual(Order.State.Open, data["state"])
+        self.assertEqual(order.id, data["id"])
+        self.assertEqual(2, data["remaining"])
+        # Events are rebuilt into orders by the market
+        copy = Order(marketid=data["market_id"], agentid=data["agent_id"], **data)
+        self.assertEqual(order.side_code, copy.side_code)
+
+    def test_pickle(self):
+        order = Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", price=100, quantity=2)
+        order.state = Order.State.PartialFill
+        self.assertEqual(order.to_dict(), pickle.loads(pickle.dumps(order)).to_dict())
+
+    def test_transaction(self):
+        buy = Order(marketid=0, agentid=1, symbol="SMBL0", side="BUY", price=100, quantity=2, timestamp=5.0)
+        sell = Order(marketid=0, agentid=2, symbol="SMBL0", side="SELL", price=100, quantity=1, timestamp=6.0)
+        transaction = Transaction(buy, sell, 0, 100, 1)
+        self.assertEqual((buy.id, sell.id), (transaction.buy_order_id, transaction.sell_order_id))
+        self.assertEqual((1, 2), (transaction.buy_agent_id, transaction.sell_agent_id))
+        self.assertEqual(6.0, transaction.timestamp)
+        self.assertEqual(transaction.to_dict(), pickle.loads(pickle.dumps(transaction)).to_dict())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -1,12 +1,17 @@
 import logging
 import multiprocessing as mp
+import queue
+import threading
 import time
 import unittest
 
-from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.book import CompiledBook, PriceLevelBook
+from synthetic_exchange.order import Order
+from synthetic_exchange.orderbook import BookBackend, OrderBook
 from synthetic_exchange.strategy.random_normal import RandomNormal
 from synthetic_exchange.strategy.random_uniform import RandomUniform
 from synthetic_exchange.transaction import Transactions
+from synthetic_exchange.transport import BinaryQueue, OrderRing
 
 
 class OrderBookTest(unittest.TestCase):
@@ -107,9 +112,283 @@ class OrderBookTest(unittest.TestCase):
         # Empty transactions since there is no OrderBook process
         if self._transactions is not None:
             history = self._transactions.history
-            logging.info(f"---{__class__.__name__}.test_orderbook history: {history}")
-            transactions = self._transactions.transactions
-            logging.info(f"---{__class__.__name__}.test_orderbook transactions: {transactions}")
+            logging.info(f"---{__class__.__name__}.test_orderbook history: {history.to_frame()}")
+
+
+class OrderBookMatchingTest(unittest.TestCase):
+    """Drive the matching engine in process, without starting the OrderBook process"""
+
+    def setUp(self):
+        self._events = []
+        self._orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=mp.Queue())
+        self._orderbook.events.partial_fill.subscribe(self._events.append)
+        self._orderbook.events.fill.subscribe(self._events.append)
+        self._orderbook.events.cancel.subscribe(self._events.append)
+
+    def _submit(self, **kwargs) -> Order:
+        order = Order(marketid=0, symbol="SMBL0", **kwargs)
+        if order.cancel:
+            self._orderbook._process_cancel(order, None)
+        elif order.side == "BUY":
+            self._orderbook._process_buy(order, None)
+        else:
+            self._orderbook._process_sell(order, None)
+        return order
+
+    def test_match(self):
+        self._submit(agentid=1, side="SELL", price=101, quantity=1)
+        self._submit(agentid=1, side="SELL", price=102, quantity=2)
+        self._submit(agentid=2, side="BUY", price=99, quantity=1)
+        self.assertEqual([101, 102], [o.price for o in self._orderbook.sell_orders()])
+        self.assertEqual([99], [o.price for o in self._orderbook.buy_orders()])
+
+        buy = self._submit(agentid=2, side="BUY", price=102, quantity=2)
+        self.assertEqual(0, buy.remaining)
+        self.assertEqual(["partial_fill", "fill"], [e["event"] for e in self._events])
+        self.assertEqual([1, 0], [e["remaining"] for e in self._events])
+        self.assertEqual([(102, 1)], [(o.price, o.remaining) for o in self._orderbook.sell_orders()])
+        self.assertEqual([(102, 1)], [(o.price, o.remaining) for o in self._orderbook.active_sell_orders])
+
+        ob = self._orderbook.orderbook()
+        self.assertEqual([102], [item["price"] for item in ob["asks"]])
+        self.assertEqual([1], [item["quantity"] for item in ob["asks"]])
+        self.assertEqual([99], [item["price"] for item in ob["bids"]])
+
+    def test_rest_remaining(self):
+        self._submit(agentid=1, side="BUY", price=100, quantity=1)
+        sell = self._submit(agentid=2, side="SELL", price=100, quantity=3)
+        self.assertEqual(2, sell.remaining)
+        self.assertEqual([], self._orderbook.buy_orders())
+        self.assertEqual([sell], self._orderbook.sell_orders())
+        self.assertEqual(0, len(self._orderbook.active_buy_orders))
+
+    def test_cancel(self):
+        sell = self._submit(agentid=1, side="SELL", price=101, quantity=1)
+        self._submit(agentid=1, side="SELL", cancel=True, orderid=sell.id)
+        self.assertEqual([], self._orderbook.sell_orders())
+        self.assertEqual(0, len(self._orderbook.active_sell_orders))
+        self.assertEqual(["cancel"], [e["event"] for e in self._events])
+
+    def test_tick_lot(self):
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=mp.Queue(), tickSize=0.5, lotSize=2)
+        buy = Order(marketid=0, agentid=1, symbol="SMBL0", side="BUY", price=100.4, quantity=5)
+        orderbook.process(buy)
+        self.assertEqual((200, 100.0, 4), (buy.ticks, buy.price, buy.remaining))
+        odd = Order(marketid=0, agentid=2, symbol="SMBL0", side="SELL", price=99.9, quantity=1)
+        orderbook.process(odd)
+        self.assertEqual(Order.State.Fail, odd.state)
+        self.assertEqual([buy], orderbook.buy_orders())
+        sell = Order(marketid=0, agentid=2, symbol="SMBL0", side="SELL", price=99.9, quantity=2)
+        orderbook.process(sell)
+        self.assertEqual(0, sell.remaining)
+        self.assertEqual(2, buy.remaining)
+
+    def test_dense(self):
+        orderbook = OrderBook(
+            marketId=0,
+            symbol="SMBL0",
+            transactions=None,
+            queue=mp.Queue(),
+            bookBackend="dense",
+            minPrice=90,
+            maxPrice=110,
+        )
+        self.assertEqual(BookBackend.Dense, orderbook.backend)
+        for side, price, quantity in [("SELL", 101, 1), ("SELL", 101, 2), ("SELL", 102, 1), ("BUY", 99, 1)]:
+            orderbook.process(Order(marketid=0, agentid=1, symbol="SMBL0", side=side, price=price, quantity=quantity))
+        outside = Order(marketid=0, agentid=2, symbol="SMBL0", side="BUY", price=111, quantity=1)
+        orderbook.process(outside)
+        self.assertEqual(Order.State.Fail, outside.state)
+        buy = Order(marketid=0, agentid=2, symbol="SMBL0", side="BUY", price=101, quantity=2)
+        orderbook.process(buy)
+        self.assertEqual(0, buy.remaining)
+        self.assertEqual({"bids": [(99, 1)], "asks": [(101, 1), (102, 1)]}, orderbook.l2())
+
+    def test_compiled(self):
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=mp.Queue(), bookBackend="compiled")
+        self.assertIsInstance(orderbook.book, CompiledBook if CompiledBook.available() else PriceLevelBook)
+        events = []
+        orderbook.events.batch.subscribe(events.extend)
+        sell = Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", price=101, quantity=3)
+        orderbook.process(sell)
+        orderbook.process(Order(marketid=0, agentid=2, symbol="SMBL0", side="BUY", price=101, quantity=1))
+        self.assertEqual([(101, 2)], [(o.price, o.remaining) for o in orderbook.sell_orders()])
+        orderbook.process(Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", cancel=True, orderid=sell.id))
+        self.assertEqual([], orderbook.sell_orders())
+        self.assertEqual(["fill", "cancel"], [e["event"] for e in events])
+
+    def test_self_trade(self):
+        for policy, event_ids in [("cancel_oldest", "resting"), ("cancel_newest", "incoming")]:
+            with self.subTest(policy=policy):
+                orderbook = OrderBook(
+                    marketId=0, symbol="SMBL0", transactions=None, queue=mp.Queue(), selfTradePolicy=policy
+                )
+                events = []
+                orderbook.events.cancel.subscribe(events.append)
+                own = Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", price=101, quantity=1)
+                other = Order(marketid=0, agentid=2, symbol="SMBL0", side="SELL", price=102, quantity=1)
+                orderbook.process(own)
+                orderbook.process(other)
+                buy = Order(marketid=0, agentid=1, symbol="SMBL0", side="BUY", price=102, quantity=2)
+                orderbook.process(buy)
+                cancelled = own if event_ids == "resting" else buy
+                self.assertEqual([cancelled.id], [event["id"] for event in events])
+                self.assertEqual(Order.State.Cancel, cancelled.state)
+                if policy == "cancel_oldest":
+                    self.assertEqual((1, 0), (buy.remaining, len(orderbook.sell_orders())))
+                    self.assertEqual({"bids": [(102, 1)], "asks": []}, orderbook.depth()[1])
+                else:
+                    self.assertEqual([], orderbook.buy_orders())
+                    self.assertEqual([own, other], orderbook.sell_orders())
+
+
+class OrderBookSnapshotTest(unittest.TestCase):
+    """Read the book of a running OrderBook process from the parent process"""
+
+    def _run(self, bookMode: str) -> OrderBook:
+        queue = mp.Queue()
+        orderbook = OrderBook(
+            marketId=0, symbol="SMBL0", transactions=None, queue=queue, bookMode=bookMode, snapshotInterval=0.05
+        )
+        for agent_id, side, price in [(1, "BUY", 99), (1, "BUY", 100), (2, "SELL", 101), (2, "SELL", 103)]:
+            queue.put(
+                {"marketid": 0, "agentid": agent_id, "symbol": "SMBL0", "side": side, "price": price, "quantity": 1}
+            )
+        orderbook.start()
+        deadline = time.time() + 10
+        while time.time() < deadline and len(orderbook.buy_orders()) + len(orderbook.sell_orders()) < 4:
+            time.sleep(0.05)
+        orderbook.stop()
+        # Left on its own rather than terminated
+        self.assertEqual(0, orderbook.exitcode)
+        return orderbook
+
+    def test_local(self):
+        orderbook = self._run("local")
+        self.assertGreater(orderbook.snapshot_version, 0)
+        self.assertEqual([100, 99], [o.price for o in orderbook.buy_orders()])
+        self.assertEqual([101], [o.price for o in orderbook.sell_orders(1)])
+        self.assertEqual([101, 103], [item["price"] for item in orderbook.orderbook()["asks"]])
+        self.assertIs(orderbook.orderbook(), orderbook.orderbook())  # same snapshot, served from cache
+        self.assertEqual({"bids": [(100, 1)], "asks": [(101, 1)]}, orderbook.l2(1))
+        version, levels = orderbook.depth(1)
+        self.assertGreater(version, 0)
+        self.assertEqual({"bids": [(100, 1)], "asks": [(101, 1)]}, levels)
+
+    def test_shared(self):
+        orderbook = self._run("shared")
+        self.assertEqual(0, orderbook.snapshot_version)
+        self.assertEqual([100, 99], [o.price for o in orderbook.buy_orders()])
+        self.assertEqual([101, 103], [o.price for o in orderbook.sell_orders()])
+        self.assertEqual({"bids": [(100, 1)], "asks": [(101, 1)]}, orderbook.l2(1))
+
+    def test_idle_trades(self):
+        queue = mp.Queue()
+        agents = {
+            agent_id: RandomNormal(agentId=agent_id, marketId=0, symbol="SMBL0", initialPrice=100, hosted=True)
+            for agent_id in [1, 2]
+        }
+        transactions = Transactions(agents)
+        orderbook = OrderBook(
+            marketId=0, symbol="SMBL0", transactions=transactions, queue=queue, bookMode="shared", snapshotInterval=0.5
+        )
+        orderbook.start()
+        self.addCleanup(orderbook.stop)
+        for count in [1, 2]:
+            for agent_id, side in [(1, "SELL"), (2, "BUY")]:
+                kwargs = {"marketid": 0, "agentid": agent_id, "symbol": "SMBL0", "side": side}
+                queue.put(dict(kwargs, price=100, quantity=1))
+            # The second trade comes within snapshotInterval of the first one's publish, and the book goes
+            # idle after it
+            deadline = time.time() + 10
+            while time.time() < deadline and len(transactions.history) < count:
+                time.sleep(0.01)
+            self.assertEqual(count, len(transactions.history))
+
+    def test_stop(self):
+        for transport in [BinaryQueue, OrderRing]:
+            with self.subTest(transport=transport.__name__):
+                queue = transport(symbol="SMBL0")
+                self.addCleanup(queue.close)
+                orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=queue)
+                orderbook.start()
+                queue.put({"marketid": 0, "agentid": 1, "symbol": "SMBL0", "side": "BUY", "price": 99, "quantity": 1})
+                orderbook.stop()
+                self.assertEqual(0, orderbook.exitcode)
+
+
+class OrderBookBatchTest(unittest.TestCase):
+    def _orderbook(self, **kwargs) -> OrderBook:
+        self._queue = queue.Queue()
+        return OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=self._queue, **kwargs)
+
+    @staticmethod
+    def _kwargs(agentId: int, side: str, price: float, quantity: float = 1) -> dict:
+        return {
+            "marketid": 0,
+            "agentid": agentId,
+            "symbol": "SMBL0",
+            "side": side,
+            "price": price,
+            "quantity": quantity,
+        }
+
+    def test_batch_size(self):
+        orderbook = self._orderbook(batchSize=3)
+        for i in range(5):
+            self._queue.put(self._kwargs(1, "BUY", 100 - i))
+        self.assertEqual(3, len(orderbook._next_batch()))
+        self.assertEqual(2, len(orderbook._next_batch()))
+
+    def test_batch_latency(self):
+        orderbook = self._orderbook(batchSize=10, batchLatency=0.5)
+        self._queue.put(self._kwargs(1, "BUY", 100))
+        timer = threading.Timer(0.05, self._queue.put, args=(self._kwargs(1, "BUY", 99),))
+        timer.start()
+        start = time.monotonic()
+        batch = orderbook._next_batch()
+        self.assertEqual(2, len(batch))
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+    def test_batch_events(self):
+        orderbook = self._orderbook(batchSize=10)
+        batches, fills = [], []
+        orderbook.events.batch.subscribe(batches.append)
+        orderbook.events.fill.subscribe(fills.append)
+        orderbook.events.partial_fill.subscribe(fills.append)
+        batch = [
+            self._kwargs(1, "SELL", 100),
+            self._kwargs(1, "SELL", 101),
+            self._kwargs(2, "BUY", 101, 2),
+            self._kwargs(2, "BUY", 99),
+        ]
+        orderbook._process_batch(batch)
+        self.assertEqual(1, len(batches))
+        self.assertEqual(["partial_fill", "fill"], [event["event"] for event in batches[0]])
+        self.assertEqual(batches[0], fills)
+        self.assertEqual([99], [o.price for o in orderbook.buy_orders()])
+
+        orderbook.process(Order(marketid=0, agentid=1, symbol="SMBL0", side="SELL", price=99, quantity=1))
+        self.assertEqual(2, len(batches))
+        self.assertEqual(["fill"], [event["event"] for event in batches[1]])
+
+    def test_depth_events(self):
+        orderbook = self._orderbook(batchSize=10, snapshotDepth=2)
+        events = []
+        orderbook.events.depth.subscribe(events.append)
+        orderbook._process_batch(
+            [self._kwargs(1, "SELL", 101), self._kwargs(1, "SELL", 102, 2), self._kwargs(2, "BUY", 99)]
+        )
+        self.assertEqual([1], [event["version"] for event in events])
+        self.assertEqual({("bids", 99, 1), ("asks", 101, 1), ("asks", 102, 2)}, set(events[0]["deltas"]))
+
+        orderbook._process_batch([self._kwargs(2, "BUY", 101), self._kwargs(1, "SELL", 103)])
+        self.assertEqual({("asks", 101, 0), ("asks", 103, 1)}, set(events[1]["deltas"]))
+        self.assertEqual((2, {"bids": [(99, 1)], "asks": [(102, 2), (103, 1)]}), orderbook.depth())
+
+        # A rejected order leaves the depth alone
+        orderbook._process_batch([self._kwargs(2, "BUY", 100, 0.5)])
+        self.assertEqual(2, len(events))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import time
+import unittest
+
+from synthetic_exchange.exchange import Exchange
+from synthetic_exchange.strategy import AgentPool, AgentRuntime, RandomNormal, RandomUniform
+from synthetic_exchange.transport import LocalQueue, OrderRing
+
+
+def _agent(agentId: int, queue, wait: float) -> RandomNormal:
+    return RandomNormal(
+        marketId=0,
+        agentId=agentId,
+        symbol="SMBL0",
+        initialPrice=100,
+        minQuantity=1,
+        maxQuantity=2,
+        queue=queue,
+        wait=wait,
+        hosted=True,
+        seed=agentId,
+    )
+
+
+def _exchange_config(**kwargs) -> dict:
+    agent = {
+        "type": "randomnormal",
+        "initialPrice": 100.0,
+        "minPrice": 90.0,
+        "maxPrice": 110.0,
+        "tickSize": 1,
+        "minQuantity": 1.0,
+        "maxQuantity": 5.0,
+        "wait": 0.05,
+    }
+    return {
+        "exchangeId": 0,
+        "exchange": "asyncio",
+        "agentRuntime": "asyncio",
+        **kwargs,
+        "markets": [
+            {
+                "marketId": 0,
+                "symbol": "SMBL0",
+                "initialPrice": 100.0,
+                "minPrice": 1.0,
+                "maxPrice": 200.0,
+                "tickSize": 1,
+                "minQuantity": 0.5,
+                "maxQuantity": 5.0,
+                "agents": {f"agent_{i}": dict(agent, agentId=i) for i in range(10)},
+            },
+        ],
+    }
+
+
+class AgentRuntimeTest(unittest.TestCase):
+    def test_serve(self):
+        orders = LocalQueue()
+        runtime = AgentRuntime()
+        for agent_id in range(500):
+            runtime.add(_agent(agent_id, orders, 0.05))
+
+        async def stop_later():
+            await asyncio.sleep(0.5)
+            runtime.stop()
+
+        async def serve():
+            await asyncio.gather(runtime.serve(), stop_later())
+
+        asyncio.run(serve())
+        sent = orders.get_many(orders.qsize())
+        self.assertEqual(set(range(500)), {kwargs["agentid"] for kwargs in sent})
+        # Every agent sends about 0.5 / 0.05 times, the first within its first interval
+        self.assertGreater(len(sent), 500 * 5)
+
+    def test_process_agents(self):
+        orders = OrderRing(1 << 16, symbol="SMBL0")
+        runtime = AgentRuntime()
+        for agent_id in range(2000):
+            runtime.add(_agent(agent_id, orders, 0.5))
+        runtime.start()
+        time.sleep(2)
+        runtime.stop()
+        runtime.join()
+        sent = orders.get_many(orders.qsize())
+        orders.close()
+        self.assertEqual(set(range(2000)), {kwargs["agentid"] for kwargs in sent})
+
+    def test_add(self):
+        runtime = AgentRuntime()
+        with self.assertRaises(AssertionError):
+            runtime.add(RandomUniform(marketId=0, symbol="SMBL0", minPrice=1, maxPrice=2, queue=LocalQueue()))
+
+    def test_exchange(self):
+        exchange = Exchange(config=_exchange_config())
+        self.assertIsInstance(exchange._queues[0], OrderRing)
+        self.assertEqual(1, len(exchange.agent_pool.runtimes))
+        exchange.start()
+        time.sleep(3)
+        exchange.stop()
+        self.assertGreater(len(exchange._transactions[0].history), 0)
+
+
+class AgentPoolTest(unittest.TestCase):
+    def test_balance(self):
+        pool = AgentPool(workers=3)
+        agents = [_agent(i, LocalQueue(), 0.1) for i in range(3)] + [_agent(i, LocalQueue(), 1.0) for i in range(3, 33)]
+        self.assertEqual([0, 1, 2], [pool.add(agent) for agent in agents[:3]])
+        for agent in agents[3:]:
+            pool.add(agent)
+        # 60 orders a second in all, 20 each
+        self.assertEqual([20.0] * 3, [round(load, 6) for load in pool.loads])
+        self.assertEqual([11] * 3, [len(runtime.agents) for runtime in pool.runtimes])
+        self.assertEqual(33, len(pool.agents))
+
+    def test_processes(self):
+        orders = OrderRing(1 << 16, symbol="SMBL0")
+        pool = AgentPool(workers=2)
+        for agent_id in range(500):
+            pool.add(_agent(agent_id, orders, 0.2))
+        before = len(mp.active_children())
+        pool.start()
+        # However many agents, one process per worker
+        self.assertEqual(before + 2, len(mp.active_children()))
+        time.sleep(1)
+        pool.stop()
+        sent = orders.get_many(orders.qsize())
+        orders.close()
+        self.assertEqual(set(range(500)), {kwargs["agentid"] for kwargs in sent})
+
+    def test_idle_workers(self):
+        pool = AgentPool(workers=4)
+        pool.add(_agent(0, LocalQueue(), 1.0))
+        pool.start()
+        self.assertEqual(1, len([runtime for runtime in pool.runtimes if runtime.pid is not None]))
+        pool.stop()
+
+    def test_exchange(self):
+        exchange = Exchange(config=_exchange_config(agentRuntime="pool", agentWorkers=2))
+        self.assertEqual([5, 5], [len(runtime.agents) for runtime in exchange.agent_pool.runtimes])
+        exchange.start()
+        time.sleep(3)
+        exchange.stop()
+        self.assertGreater(len(exchange._transactions[0].history), 0)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
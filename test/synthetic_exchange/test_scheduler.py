@@ -0,0 +1,145 @@
+import logging
+import multiprocessing as mp
+import os
+import time
+import unittest
+
+from synthetic_exchange.exchange import Exchange
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.scheduler import BookScheduler, BookWorker, Placement
+from synthetic_exchange.transport import OrderRing
+
+
+def _orderbook(marketId: int, queue=None) -> OrderBook:
+    return OrderBook(marketId=marketId, symbol=f"SMBL{marketId}", transactions=None, queue=queue, snapshotInterval=0.01)
+
+
+def _kwargs(marketId: int, side: str, price: float) -> dict:
+    return {
+        "marketid": marketId,
+        "agentid": 1,
+        "symbol": f"SMBL{marketId}",
+        "side": side,
+        "price": price,
+        "quantity": 1.0,
+    }
+
+
+class BookSchedulerTest(unittest.TestCase):
+    def test_round_robin(self):
+        scheduler = BookScheduler(workers=2)
+        for market_id in range(5):
+            scheduler.add(_orderbook(market_id))
+        placed = [[orderbook.market_id for orderbook in orderbooks] for orderbooks in scheduler.place()]
+        self.assertEqual([[0, 2, 4], [1, 3]], placed)
+
+    def test_weighted(self):
+        scheduler = BookScheduler(workers=3, placement="weighted")
+        for market_id, rate in enumerate([1.0, 50.0, 10.0, 30.0, 5.0, 20.0, 15.0]):
+            scheduler.add(_orderbook(market_id), rate)
+        placed = scheduler.place()
+        self.assertEqual(
+            [[1], [3, 2, 0], [5, 6, 4]], [[orderbook.market_id for orderbook in books] for books in placed]
+        )
+        # 131 orders a second split 50 / 41 / 40
+        rates = {1: 50.0, 3: 30.0, 5: 20.0, 6: 15.0, 2: 10.0, 4: 5.0, 0: 1.0}
+        self.assertEqual([50.0, 41.0, 40.0], [sum(rates[book.market_id] for book in books) for books in placed])
+
+    def test_fewer_books_than_workers(self):
+        scheduler = BookScheduler(workers=8, placement=Placement.Weighted)
+        scheduler.add(_orderbook(0))
+        self.assertEqual(1, len(scheduler.place()))
+
+    def test_workers(self):
+        rings = [OrderRing(1024, symbol=f"SMBL{market_id}") for market_id in range(3)]
+        orderbooks = [_orderbook(market_id, rings[market_id]) for market_id in range(3)]
+        scheduler = BookScheduler(workers=2, affinity=True)
+        for orderbook in orderbooks:
+            scheduler.add(orderbook)
+        before = len(mp.active_children())
+        scheduler.start()
+        try:
+            self.assertEqual(before + 2, len(mp.active_children()))
+            self.assertTrue(all(orderbook.hosted for orderbook in orderbooks))
+            cpus = sorted(os.sched_getaffinity(0))
+            for i, worker in enumerate(scheduler.workers):
+                self.assertEqual({cpus[i % len(cpus)]}, os.sched_getaffinity(worker.pid))
+            for market_id, ring in enumerate(rings):
+                for i in range(5):
+                    ring.put(_kwargs(market_id, "BUY", 100.0 + i + market_id))
+                ring.put(_kwargs(market_id, "SELL", 200.0))
+            time.sleep(1)
+            # Read back from the workers' snapshots
+            for market_id, orderbook in enumerate(orderbooks):
+                self.assertEqual(104.0 + market_id, orderbook.buy_orders(1)[0].price)
+                self.assertEqual([(200.0, 1.0)], orderbook.l2()["asks"])
+        finally:
+            scheduler.stop()
+            for ring in rings:
+                ring.close()
+        self.assertFalse(any(worker.is_alive() for worker in scheduler.workers))
+
+    def test_worker_budget(self):
+        ring = OrderRing(1024, symbol="SMBL0")
+        orderbook = _orderbook(0, ring)
+        worker = BookWorker([orderbook], budget=3)
+        for i in range(5):
+            ring.put(_kwargs(0, "BUY", 100.0 + i))
+        # Before the worker starts the book is read and driven right here
+        self.assertEqual(3, orderbook.drain(3))
+        self.assertEqual(2, orderbook.drain(3))
+        self.assertEqual(5, len(orderbook.buy_orders()))
+        self.assertIs(worker, orderbook._host)
+        ring.close()
+
+    def test_drain_queue(self):
+        queue = mp.Queue()
+        orderbook = _orderbook(0, queue)
+        for i in range(3):
+            queue.put(_kwargs(0, "SELL", 100.0 + i))
+        time.sleep(0.1)
+        self.assertEqual(3, orderbook.drain())
+        self.assertEqual(0, orderbook.drain())
+
+    def test_exchange(self):
+        agent = {
+            "type": "randomnormal",
+            "initialPrice": 100.0,
+            "minPrice": 90.0,
+            "maxPrice": 110.0,
+            "tickSize": 1,
+            "minQuantity": 1.0,
+            "maxQuantity": 5.0,
+            "wait": 0.05,
+        }
+        market = {
+            "initialPrice": 100.0,
+            "minPrice": 1.0,
+            "maxPrice": 200.0,
+            "tickSize": 1,
+            "minQuantity": 0.5,
+            "maxQuantity": 5.0,
+            "agents": {f"agent_{i}": dict(agent, agentId=i) for i in range(4)},
+        }
+        config = {
+            "exchangeId": 0,
+            "exchange": "scheduled",
+            "agentRuntime": "pool",
+            "agentWorkers": 1,
+            "bookScheduler": {"workers": 2, "placement": "weighted"},
+            "markets": [dict(market, marketId=i, symbol=f"SMBL{i}") for i in range(4)],
+        }
+        exchange = Exchange(config=config)
+        before = len(mp.active_children())
+        exchange.start()
+        # One agent worker and two book workers, whatever the markets and agents
+        self.assertEqual(before + 3, len(mp.active_children()))
+        time.sleep(3)
+        exchange.stop()
+        for market_id in range(4):
+            self.assertGreater(len(exchange._transactions[market_id].history), 0)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,152 @@
+import logging
+import tempfile
+import time
+import unittest
+
+from synthetic_exchange.exchange import Exchange
+from synthetic_exchange.strategy import RandomNormal
+from synthetic_exchange.transport import LocalQueue
+
+
+def _config(seed: int, endTime: float) -> dict:
+    agent = {
+        "type": "randomnormal",
+        "initialPrice": 100.0,
+        "minPrice": 90.0,
+        "maxPrice": 110.0,
+        "tickSize": 1,
+        "minQuantity": 1.0,
+        "maxQuantity": 5.0,
+    }
+    return {
+        "exchangeId": 0,
+        "exchange": "simulated",
+        "simulation": {"seed": seed, "startTime": 0.0, "endTime": endTime, "tickSize": 1.0},
+        "markets": [
+            {
+                "marketId": 0,
+                "symbol": "SMBL0",
+                "initialPrice": 100.0,
+                "minPrice": 1.0,
+                "maxPrice": 200.0,
+                "tickSize": 1,
+                "minQuantity": 0.5,
+                "maxQuantity": 5.0,
+                "agents": {
+                    "agent_0": dict(agent, agentId=0),
+                    "agent_1": dict(agent, agentId=1, wait=3),
+                    "agent_2": dict(agent, agentId=2, type="randomuniform"),
+                },
+            },
+        ],
+    }
+
+
+def _tape(exchange: Exchange) -> list:
+    """Trades and resting orders"""
+    columns = exchange._transactions[0].history.columns()
+    trades = list(zip(*(column.tolist() for column in columns.values())))
+    book = exchange.orderbook("SMBL0")
+    resting = [
+        (entry["id"], entry["price"], entry["quantity"], entry["timestamp"], entry["agent_id"])
+        for entry in book["bids"] + book["asks"]
+    ]
+    return [trades, resting]
+
+
+class SimulationTest(unittest.TestCase):
+    _end_time = 3600.0
+
+    def _run(self, seed: int, endTime: float = _end_time) -> Exchange:
+        exchange = Exchange(config=_config(seed, endTime))
+        exchange.start()
+        exchange.stop()
+        return exchange
+
+    def test_run(self):
+        start = time.monotonic()
+        exchange = self._run(seed=1)
+        # An hour of trading in well under a minute of it
+        self.assertLess(time.monotonic() - start, 60)
+        self.assertEqual(self._end_time, exchange.simulation.current_timestamp)
+        trades, resting = _tape(exchange)
+        self.assertGreater(len(trades), 0)
+        self.assertGreater(len(resting), 0)
+        # Orders carry the simulated time they were sent at, every wait seconds from the first tick
+        for _, _, _, timestamp, agent_id in resting:
+            self.assertLessEqual(timestamp, self._end_time * 1000)
+            self.assertEqual(0, (timestamp - 1000) % ((3 if agent_id == 1 else 5) * 1000))
+        # The book keeps up, every order goes out on time
+        for agent_id, flow in exchange.flow("SMBL0").items():
+            self.assertEqual(self._end_time // (3 if agent_id == 1 else 5), flow["sent"])
+            self.assertEqual(0, flow["throttled"] + flow["dropped"])
+
+    def test_reproducible(self):
+        self.assertEqual(_tape(self._run(seed=1)), _tape(self._run(seed=1)))
+        self.assertNotEqual(_tape(self._run(seed=1)), _tape(self._run(seed=2)))
+
+    def test_run_in_steps(self):
+        exchange = Exchange(config=_config(1, self._end_time))
+        exchange.run(self._end_time / 2)
+        self.assertEqual(self._end_time / 2, exchange.simulation.current_timestamp)
+        exchange.run()
+        exchange.stop()
+        self.assertEqual(_tape(self._run(seed=1)), _tape(exchange))
+
+    def test_tape_dir(self):
+        with tempfile.TemporaryDirectory() as tape_dir:
+            exchange = Exchange(config=dict(_config(1, self._end_time), tapeDir=tape_dir))
+            exchange.start()
+            exchange.stop()
+            tape = exchange.tape("SMBL0")
+            self.assertGreater(len(tape), 0)
+            self.assertEqual(
+                exchange._transactions[0].history.column("price").tolist(), tape.columns()["price"].tolist()
+            )
+            self.assertIsNone(self._run(seed=1).tape("SMBL0"))
+
+    def test_bars(self):
+        exchange = self._run(seed=1)
+        trades = exchange._transactions[0].history.columns(["timestamp", "price"])
+        for interval in [1, 60, 3600]:
+            bars = exchange.bars("SMBL0", interval)
+            self.assertEqual(len(trades["price"]), bars["count"].sum())
+            self.assertEqual(trades["price"].max(), bars["high"].max())
+        # An hour of simulated time from 0, one bar of it
+        self.assertEqual([0.0], exchange.bars("SMBL0", 3600, ["start"])["start"].tolist())
+
+    def test_agent_step(self):
+        orders = LocalQueue()
+        agent = RandomNormal(
+            marketId=0,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=1,
+            maxQuantity=2,
+            queue=orders,
+            hosted=True,
+            seed=7,
+        )
+        agent.step(42.0)
+        order = orders.get()
+        self.assertEqual(42000.0, order["timestamp"])
+        other = RandomNormal(
+            marketId=0,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=1,
+            maxQuantity=2,
+            queue=orders,
+            hosted=True,
+            seed=7,
+        )
+        other.step(42.0)
+        same = orders.get()
+        self.assertEqual(
+            [order[key] for key in ["side", "price", "quantity"]], [same[key] for key in ["side", "price", "quantity"]]
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,208 @@
+import multiprocessing as mp
+import os
+import signal
+import tempfile
+import time
+import types
+import unittest
+
+import numpy as np
+
+from synthetic_exchange.order import Order
+from synthetic_exchange.tape import MappedTradeTape, TradeTape
+from synthetic_exchange.transaction import Transactions
+from synthetic_exchange.util import default_manager
+
+
+def _trade(tape: TradeTape, i: int):
+    tape.append(i, float(i), 100.0 + i, 1.0, 1, 2, 10 + i, 20 + i)
+
+
+def _write(tape: TradeTape, count: int):
+    for i in range(count):
+        _trade(tape, i)
+    tape.publish()
+    tape.flush()
+
+
+def _write_mapped(path: str, count: int):
+    tape = MappedTradeTape(path)
+    for i in range(count):
+        _trade(tape, i)
+
+
+def _read_mapped(path: str):
+    tape = MappedTradeTape(path)
+    while True:
+        tape.records(max(len(tape) - 1, 0))
+
+
+class TradeTapeTest(unittest.TestCase):
+    def test_append(self):
+        tape = TradeTape(chunkSize=4)
+        self.assertEqual((0, None), (len(tape), tape.last()))
+        self.assertEqual(0, len(tape.column("price")))
+        for i in range(10):
+            _trade(tape, i)
+        self.assertEqual(10, len(tape))
+        self.assertEqual([4, 4, 2], [len(chunk["id"]) for chunk in tape.chunks()])
+        self.assertEqual(list(range(10)), tape.column("id").tolist())
+        last = tape.last()
+        self.assertEqual((9, 109.0, 29), (last["id"], last["price"], last["sell_order_id"]))
+        frame = tape.to_frame(["price", "buy_agent_id"])
+        self.assertEqual(["price", "buy_agent_id"], list(frame.columns))
+        self.assertEqual(105.0, frame.loc[5, "price"])
+
+    def test_views(self):
+        tape = TradeTape(chunkSize=8)
+        for i in range(5):
+            _trade(tape, i)
+        # One chunk, the columns are views of the tape's arrays
+        price = tape.column("price")
+        self.assertTrue(np.shares_memory(price, tape._chunk[2]))
+        _trade(tape, 5)
+        self.assertEqual(5, len(price))
+        self.assertEqual(105.0, tape.column("price")[-1])
+
+    def test_shared(self):
+        tape = TradeTape(chunkSize=4, shared=True, manager=default_manager())
+        process = mp.Process(target=_write, args=(tape, 10))
+        process.start()
+        process.join()
+        # Two full chunks and the rest, each sent once
+        self.assertEqual(3, len(tape._blocks))
+        self.assertEqual(10, len(tape))
+        self.assertEqual(list(range(10)), tape.column("id").tolist())
+        self.assertEqual(109.0, tape.last()["price"])
+        # The writer's own unpublished trades come last
+        _trade(tape, 10)
+        self.assertEqual((11, 10), (len(tape), tape.column("id")[-1]))
+        self.assertEqual(1, tape.publish())
+        self.assertEqual(0, tape.publish())
+
+    def test_retention(self):
+        with tempfile.TemporaryDirectory() as spill:
+            tape = TradeTape(chunkSize=4, retention=6, spillPath=spill)
+            for i in range(23):
+                _trade(tape, i)
+            tape.flush()
+            # The current chunk and the two full ones holding the last 6 trades stay in memory
+            self.assertEqual(["00000000.npz", "00000001.npz", "00000002.npz"], sorted(os.listdir(spill)))
+            self.assertEqual([str, str, str, tuple, tuple], [type(chunk) for chunk in tape._chunks])
+            self.assertEqual(23, len(tape))
+            self.assertEqual(list(range(23)), tape.column("id").tolist())
+            self.assertEqual(122.0, tape.last()["price"])
+
+    def test_retention_drop(self):
+        tape = TradeTape(chunkSize=4, retention=0)
+        for i in range(10):
+            _trade(tape, i)
+        self.assertEqual(10, len(tape))
+        self.assertEqual([8, 9], tape.column("id").tolist())
+
+    def test_shared_retention(self):
+        with tempfile.TemporaryDirectory() as spill:
+            tape = TradeTape(chunkSize=4, shared=True, manager=default_manager(), retention=4, spillPath=spill)
+            process = mp.Process(target=_write, args=(tape, 18))
+            process.start()
+            process.join()
+            # Segments of the first three chunks, the fourth chunk and the last two trades as published
+            self.assertEqual([str, str, str, dict, dict], [type(block) for block in tape._blocks[:]])
+            self.assertEqual(18, len(tape))
+            self.assertEqual(list(range(18)), tape.column("id").tolist())
+
+
+class MappedTradeTapeTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, "TEST.tape")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_append(self):
+        tape = MappedTradeTape(self._path, create=True, capacity=4)
+        # A reader mapping the file before it grows
+        reader = MappedTradeTape(self._path)
+        self.assertEqual((0, None), (len(reader), reader.last()))
+        for i in range(10):
+            _trade(tape, i)
+        self.assertEqual((10, 10), (len(tape), len(reader)))
+        self.assertEqual(64, reader.dtype.itemsize)
+        self.assertEqual(list(range(10)), reader.columns()["id"].tolist())
+        self.assertEqual([103.0, 104.0], reader.columns(3, 5)["price"].tolist())
+        last = reader.last()
+        self.assertEqual((9, 109.0, 29), (last["id"], last["price"], last["sell_order_id"]))
+        # Views of the file, no copies
+        records = reader.records()
+        self.assertTrue(np.shares_memory(records, reader.records(5)))
+        self.assertEqual(os.path.getsize(self._path), 64 + 16 * 64)
+
+    def test_reopen(self):
+        tape = MappedTradeTape(self._path, create=True, capacity=4)
+        for i in range(3):
+            _trade(tape, i)
+        tape.close()
+        # A writer opening the tape again appends after the last record
+        tape = MappedTradeTape(self._path)
+        _trade(tape, 3)
+        self.assertEqual(list(range(4)), MappedTradeTape(self._path).columns()["id"].tolist())
+        with open(os.path.join(self._dir.name, "other"), "wb") as file:
+            file.write(bytes(256))
+        with self.assertRaises(ValueError):
+            len(MappedTradeTape(os.path.join(self._dir.name, "other")))
+
+    def test_replaced(self):
+        tape = MappedTradeTape(self._path, create=True)
+        _trade(tape, 0)
+        reader = MappedTradeTape(self._path)
+        self.assertEqual((1, False), (len(reader), reader.replaced))
+        MappedTradeTape(self._path, create=True)
+        # The reader keeps the tape it mapped
+        self.assertEqual((1, True), (len(reader), reader.replaced))
+        self.assertEqual(0, len(MappedTradeTape(self._path)))
+
+    def test_tail(self):
+        MappedTradeTape(self._path, create=True, capacity=16)
+        reader = MappedTradeTape(self._path)
+        process = mp.Process(target=_write_mapped, args=(self._path, 5000))
+        process.start()
+        # Read as the writer goes, every record below the commit index is whole
+        seen, deadline = 0, time.monotonic() + 30
+        while seen < 5000 and time.monotonic() < deadline:
+            records = reader.records(seen)
+            self.assertEqual(list(range(seen, seen + len(records))), records["id"].tolist())
+            self.assertTrue(np.array_equal(records["price"], 100.0 + records["id"]))
+            seen += len(records)
+        process.join()
+        self.assertEqual(5000, seen)
+
+    def test_reader_killed(self):
+        tape = MappedTradeTape(self._path, create=True, capacity=16)
+        process = mp.Process(target=_read_mapped, args=(self._path,))
+        process.start()
+        for i in range(100):
+            _trade(tape, i)
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+        for i in range(100, 200):
+            _trade(tape, i)
+        self.assertEqual(list(range(200)), MappedTradeTape(self._path).columns()["id"].tolist())
+
+    def test_transactions(self):
+        agents = {
+            agent_id: types.SimpleNamespace(
+                position=0.0, quantity_bought=0.0, quantity_sold=0.0, value_bought=0.0, value_sold=0.0
+            )
+            for agent_id in (1, 2)
+        }
+        transactions = Transactions(agents, shared=False, tapeFile=self._path)
+        self.assertEqual(self._path, transactions.tape_file)
+        for i in range(3):
+            buy = Order(marketid=0, agentid=1, symbol="TEST", side="BUY", price=100.0 + i, quantity=1.0, timestamp=i)
+            sell = Order(marketid=0, agentid=2, symbol="TEST", side="SELL", price=100.0 + i, quantity=1.0, timestamp=i)
+            transactions.create(buy, sell, 0, 100.0 + i, 1.0)
+        # The same trades as the history
+        tape = MappedTradeTape(self._path)
+        for name, column in tape.columns().items():
+            self.assertEqual(transactions.history.column(name).tolist(), column.tolist())
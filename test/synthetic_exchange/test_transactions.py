@@ -65,9 +65,7 @@ class TransactionsTest(unittest.TestCase):
 
         # Empty transactions since there is no OrderBook process
         history = self._transactions.history
-        logging.info(f"---{__class__.__name__}.test_transactions history: {history}")
-        transactions = self._transactions.transactions
-        logging.info(f"---{__class__.__name__}.test_transactions transactions: {transactions}")
+        logging.info(f"---{__class__.__name__}.test_transactions history: {history.to_frame()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+import logging
+import multiprocessing as mp
+import queue
+import unittest
+
+from synthetic_exchange.order import Order
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.strategy import RandomNormal
+from synthetic_exchange.transport import BinaryQueue, LocalQueue, OrderRing, Transport, Watermark, create_queue
+
+
+def _kwargs(agentId: int, price: float, side: str = "BUY") -> dict:
+    return {"marketid": 0, "agentid": agentId, "symbol": "SMBL0", "side": side, "price": price, "quantity": 1.0}
+
+
+def _produce(ring: OrderRing, agentId: int, count: int):
+    for i in range(count):
+        ring.put(_kwargs(agentId, float(i)))
+
+
+class OrderRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = OrderRing(4, symbol="SMBL0")
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_round_trip(self):
+        self.ring.put_nowait(_kwargs(1, 100.5, "SELL") | {"timestamp": 12.0, "clientid": 5})
+        self.ring.put_nowait({"marketid": 0, "agentid": 1, "side": "BUY", "cancel": True, "orderid": 42})
+        self.assertEqual(2, self.ring.qsize())
+        order = Order(**self.ring.get())
+        self.assertEqual((1, "SMBL0", "SELL", 5), (order.agent_id, order.symbol, order.side, order.client_id))
+        self.assertEqual((100.5, 1.0, 12.0), (order.price, order.quantity, order.timestamp))
+        cancel = Order(**self.ring.get_nowait())
+        self.assertEqual((True, 42, "BUY", None), (cancel.cancel, cancel.id, cancel.side, cancel.client_id))
+        amend = {"marketid": 0, "agentid": 1, "side": "SELL", "quantity": 0.5, "amend": True, "orderid": 43}
+        self.ring.put(amend)
+        amend = self.ring.get()
+        self.assertEqual((True, 43, 0.5), (amend["amend"], amend["orderid"], amend["quantity"]))
+        # None, the wake-up OrderBook.stop() sends, as through an mp.Queue
+        self.ring.put(None)
+        self.assertIsNone(self.ring.get())
+        self.assertTrue(self.ring.empty())
+
+    def test_full_and_empty(self):
+        for i in range(4):
+            self.ring.put_nowait(_kwargs(1, float(i)))
+        self.assertTrue(self.ring.full())
+        with self.assertRaises(queue.Full):
+            self.ring.put_nowait(_kwargs(1, 4.0))
+        with self.assertRaises(queue.Full):
+            self.ring.put(_kwargs(1, 4.0), timeout=0.01)
+        self.assertEqual([0.0, 1.0, 2.0], [kwargs["price"] for kwargs in self.ring.get_many(3)])
+        # Wraps around the end of the ring
+        for i in range(4, 7):
+            self.ring.put_nowait(_kwargs(1, float(i)))
+        self.assertEqual([3.0, 4.0, 5.0, 6.0], [kwargs["price"] for kwargs in self.ring.get_many(10)])
+        with self.assertRaises(queue.Empty):
+            self.ring.get_nowait()
+        with self.assertRaises(queue.Empty):
+            self.ring.get(timeout=0.01)
+
+    def test_producers(self):
+        ring = OrderRing(16)
+        producers = [mp.Process(target=_produce, args=(ring, agent_id, 500)) for agent_id in range(3)]
+        for producer in producers:
+            producer.start()
+        prices = {agent_id: [] for agent_id in range(3)}
+        for _ in range(1500):
+            kwargs = ring.get(timeout=10)
+            prices[kwargs["agentid"]].append(kwargs["price"])
+        for producer in producers:
+            producer.join()
+        ring.close()
+        # Every producer's orders arrive, in the order it sent them
+        self.assertEqual({agent_id: [float(i) for i in range(500)] for agent_id in range(3)}, prices)
+
+    def test_orderbook_batch(self):
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=self.ring, batchSize=3)
+        for i in range(4):
+            self.ring.put(_kwargs(1, 100.0 - i))
+        self.assertEqual(3, len(orderbook._next_batch()))
+        self.assertEqual(1, len(orderbook._next_batch()))
+
+    def test_create_queue(self):
+        ring = create_queue(Transport.Ring, 8, symbol="SMBL0")
+        self.assertEqual(8, ring.capacity)
+        ring.close()
+        self.assertNotIsInstance(create_queue("queue", 8), OrderRing)
+        self.assertIsInstance(create_queue("local", 8), LocalQueue)
+        self.assertIsInstance(create_queue("binary", 8), BinaryQueue)
+
+
+class LocalQueueTest(unittest.TestCase):
+    def test_queue(self):
+        orders = LocalQueue(2)
+        with self.assertRaises(queue.Empty):
+            orders.get_nowait()
+        first, second = _kwargs(1, 100.0), _kwargs(2, 101.0)
+        orders.put(first)
+        orders.put_nowait(second)
+        self.assertTrue(orders.full())
+        with self.assertRaises(queue.Full):
+            orders.put(_kwargs(3, 102.0))
+        # Handed over as they are, oldest first
+        self.assertIs(first, orders.get())
+        self.assertEqual([second], orders.get_many(8))
+        self.assertTrue(orders.empty())
+
+    def test_orderbook_drain(self):
+        orders = LocalQueue()
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=orders, batchSize=2)
+        for i in range(5):
+            orders.put(_kwargs(1, 100.0 - i))
+        self.assertEqual(5, orderbook.drain())
+        self.assertEqual(0, orderbook.drain())
+        self.assertEqual(5, len(orderbook.buy_orders()))
+
+
+class WatermarkTest(unittest.TestCase):
+    @staticmethod
+    def _agent(orders, watermark: Watermark = None) -> RandomNormal:
+        return RandomNormal(
+            marketId=0,
+            agentId=1,
+            symbol="SMBL0",
+            initialPrice=100,
+            minQuantity=1,
+            maxQuantity=5,
+            queue=orders,
+            watermark=watermark,
+            wait=1,
+            hosted=True,
+            seed=1,
+        )
+
+    def test_hysteresis(self):
+        orders = LocalQueue(10)
+        watermark = Watermark(10, high=0.8, low=0.5)
+        self.assertEqual((8, 5), (watermark.high, watermark.low))
+        for i in range(8):
+            self.assertFalse(watermark.throttle(orders))
+            orders.put(_kwargs(1, 100.0 + i))
+        self.assertTrue(watermark.throttle(orders))
+        # Stays throttled until the backlog is down to the low watermark
+        orders.get_many(2)
+        self.assertTrue(watermark.throttle(orders))
+        orders.get_many(1)
+        self.assertFalse(watermark.throttle(orders))
+        orders.put(_kwargs(1, 100.0))
+        self.assertFalse(watermark.throttle(orders))
+
+    def test_agent_flow(self):
+        orders = LocalQueue(10)
+        agent = __class__._agent(orders, Watermark(10, high=0.8, low=0.5))
+        for i in range(10):
+            agent.step(float(i))
+        self.assertEqual({"sent": 8, "throttled": 2, "coalesced": 1, "dropped": 0}, agent.flow)
+        self.assertEqual(8, orders.qsize())
+        orders.get_many(4)
+        # The latest order held back goes out first
+        agent.step(10.0)
+        self.assertEqual({"sent": 10, "throttled": 2, "coalesced": 1, "dropped": 0}, agent.flow)
+        self.assertEqual([9000.0, 10000.0], [kwargs["timestamp"] for kwargs in orders.get_many(8)[-2:]])
+
+    def test_agent_dropped(self):
+        orders = LocalQueue(2)
+        agent = __class__._agent(orders)
+        for i in range(3):
+            agent.step(float(i))
+        self.assertEqual({"sent": 2, "throttled": 0, "coalesced": 0, "dropped": 1}, agent.flow)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
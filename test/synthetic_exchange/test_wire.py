@@ -0,0 +1,186 @@
+import logging
+import multiprocessing as mp
+import pickle
+import queue
+import unittest
+
+from synthetic_exchange import wire
+from synthetic_exchange.orderbook import OrderBook
+from synthetic_exchange.transport import BinaryQueue, LocalQueue
+
+
+def _kwargs(agentId: int, price: float, side: str = "BUY", quantity: float = 1.0) -> dict:
+    return {
+        "marketid": 0,
+        "agentid": agentId,
+        "symbol": "SMBL0",
+        "side": side,
+        "price": price,
+        "quantity": quantity,
+        "timestamp": 1000.0 + agentId,
+    }
+
+
+def _cancel(agentId: int, orderId: int) -> dict:
+    return {
+        "marketid": 0,
+        "agentid": agentId,
+        "symbol": "SMBL0",
+        "side": "SELL",
+        "timestamp": 1000.0,
+        "cancel": True,
+        "orderid": orderId,
+    }
+
+
+def _amend(agentId: int, orderId: int, quantity: float) -> dict:
+    return {
+        "marketid": 0,
+        "agentid": agentId,
+        "symbol": "SMBL0",
+        "side": "SELL",
+        "quantity": quantity,
+        "timestamp": 1000.0,
+        "amend": True,
+        "orderid": orderId,
+    }
+
+
+def _produce(orders: BinaryQueue, agentId: int, count: int):
+    for i in range(0, count, 2):
+        if i % 4 == 0:
+            orders.put(_kwargs(agentId, float(i)))
+            orders.put_nowait(_kwargs(agentId, float(i + 1)))
+        else:
+            orders.put_many([_kwargs(agentId, float(i)), _kwargs(agentId, float(i + 1))])
+
+
+class WireTest(unittest.TestCase):
+    def test_layouts(self):
+        for message in wire.Message:
+            self.assertEqual(wire.layout(message).size, wire.dtype(message).itemsize)
+        # Smaller than a pickled dict
+        frame = wire.encode(wire.Message.NewOrder, [_kwargs(1, 100.0)])
+        self.assertLess(len(frame), len(pickle.dumps(_kwargs(1, 100.0))))
+
+    def test_round_trip(self):
+        fill = {
+            "event": "partial_fill",
+            "market_id": 0,
+            "agent_id": 1,
+            "id": 7,
+            "client_id": 3,
+            "side": "BUY",
+            "price": 100.0,
+            "quantity": 2.0,
+            "remaining": 1.0,
+            "timestamp": 1000.0,
+            "time": 1.5,
+        }
+        depth = {"market_id": 0, "version": 3, "side": "asks", "price": 101.0, "quantity": 0}
+        no_price = dict(_kwargs(2, None), side=None, timestamp=None)
+        cases = [
+            (wire.Message.NewOrder, [_kwargs(1, 100.0), dict(_kwargs(2, 101.5, "SELL"), clientid=5), no_price]),
+            (wire.Message.Cancel, [_cancel(1, 42)]),
+            (wire.Message.Amend, [_amend(1, 42, 0.5), _amend(2, 43, 1.0), _amend(3, 44, None)]),
+            (wire.Message.Fill, [fill, dict(fill, event="cancel", side="SELL", client_id=None)]),
+            (wire.Message.Depth, [depth, dict(depth, side="bids", price=99.0, quantity=3.0)]),
+        ]
+        for message, items in cases:
+            # One at a time and as a batch
+            for batch in [items[:1], items]:
+                frame = wire.encode(message, batch)
+                self.assertEqual(8 + len(batch) * wire.dtype(message).itemsize, len(frame))
+                decoded_message, records = wire.decode(frame)
+                self.assertEqual((message, len(batch)), (decoded_message, len(records)))
+                self.assertEqual(batch, wire.decode_items(frame, "SMBL0"))
+                # Filled a field at a time, the same records as packed one by one
+                packed = b"".join(wire.pack(message, item) for item in batch)
+                self.assertEqual(packed, wire.records(message, batch).tobytes())
+
+    def test_vectorized(self):
+        items = [_kwargs(i, 100.0 + i, "SELL" if i % 2 else "BUY") for i in range(100)]
+        _, records = wire.decode(wire.encode(wire.Message.NewOrder, items))
+        self.assertEqual(sum(item["price"] for item in items), records["price"].sum())
+        self.assertEqual(50, (records["side"] == 1).sum())
+
+    def test_version(self):
+        frame = bytearray(wire.encode(wire.Message.Cancel, [_cancel(1, 42)]))
+        frame[0] = wire.VERSION + 1
+        with self.assertRaises(ValueError):
+            wire.decode(bytes(frame))
+
+    def test_encode_orders(self):
+        items = [_kwargs(1, 100.0), _kwargs(1, 101.0), _cancel(1, 42), _amend(1, 43, 0.5), _kwargs(2, 99.0)]
+        frames = wire.encode_orders(items)
+        self.assertEqual(
+            [wire.Message.NewOrder, wire.Message.Cancel, wire.Message.Amend, wire.Message.NewOrder],
+            [wire.decode(frame)[0] for frame in frames],
+        )
+        self.assertEqual(items, [item for frame in frames for item in wire.decode_items(frame, "SMBL0")])
+
+    def test_binary_queue_size(self):
+        orders = BinaryQueue(symbol="SMBL0")
+        orders.put(_kwargs(1, 100.0))
+        orders.put_many([_kwargs(1, 101.0 + i) for i in range(5)] + [_cancel(1, 42)])
+        # Orders, not the frames they came in
+        self.assertEqual(7, orders.qsize())
+        self.assertEqual(2, len(orders.get_many(2, timeout=10)))
+        self.assertEqual(5, orders.qsize())
+        self.assertEqual(5, len(orders.get_many(10, timeout=10)))
+        self.assertEqual(0, orders.qsize())
+        orders.put(None)
+        self.assertEqual([None], orders.get_many(10, timeout=10))
+        self.assertEqual(0, orders.qsize())
+        orders.close()
+
+    def test_binary_queue(self):
+        orders = BinaryQueue(symbol="SMBL0")
+        producers = [mp.Process(target=_produce, args=(orders, agent_id, 200)) for agent_id in range(2)]
+        for producer in producers:
+            producer.start()
+        prices = {agent_id: [] for agent_id in range(2)}
+        while sum(len(items) for items in prices.values()) < 400:
+            for kwargs in orders.get_many(3, timeout=10):
+                prices[kwargs["agentid"]].append(kwargs["price"])
+        for producer in producers:
+            producer.join()
+        self.assertEqual({agent_id: [float(i) for i in range(200)] for agent_id in range(2)}, prices)
+        with self.assertRaises(queue.Empty):
+            orders.get_nowait()
+        orders.close()
+
+    def test_orderbook_amend(self):
+        orders, reports = LocalQueue(), LocalQueue()
+        orderbook = OrderBook(marketId=0, symbol="SMBL0", transactions=None, queue=orders, reports={1: reports})
+        orders.put(_kwargs(1, 101.0, "SELL", 3.0))
+        orders.put(_kwargs(1, 101.0, "SELL", 2.0))
+        orderbook.drain()
+        first = orderbook.sell_orders()[0]
+        orders.put(_amend(1, first.id, 1.0))
+        # An amend up is refused
+        orders.put(_amend(1, first.id, 5.0))
+        orderbook.drain()
+        self.assertEqual(
+            [(first.id, 1.0), (first.id + 1, 2.0)], [(order.id, order.remaining) for order in orderbook.sell_orders()]
+        )
+        self.assertEqual(3.0, orderbook.l2()["asks"][0][1])
+        self.assertEqual(
+            [("cancel", 2.0, 1.0)],
+            [(report["event"], report["quantity"], report["remaining"]) for report in reports.get_many(8)],
+        )
+        # An off-grid target is floored to whole lots
+        second = orderbook.sell_orders()[1]
+        orders.put(_amend(1, second.id, 1.7))
+        orders.put(_amend(1, second.id, 0.5))
+        orderbook.drain()
+        self.assertEqual([first.id], [order.id for order in orderbook.sell_orders()])
+        self.assertEqual(
+            [("cancel", 1.0, 1.0), ("cancel", 1.0, 0.0)],
+            [(report["event"], report["quantity"], report["remaining"]) for report in reports.get_many(8)],
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()
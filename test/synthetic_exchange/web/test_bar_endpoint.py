@@ -0,0 +1,41 @@
+import types
+import unittest
+
+from synthetic_exchange.app.web.application import WebApplication
+from synthetic_exchange.bars import Bars
+from synthetic_exchange.market import Market
+
+
+class BarEndpointTest(unittest.TestCase):
+    def setUp(self):
+        bars = Bars(intervals=[1, 60])
+        for i in range(10):
+            bars.update(i * 500.0, 100.0 + i, 1.0)
+        # The endpoint looks markets up by symbol among those of the process
+        self._markets = dict(Market._markets)
+        Market._markets.clear()
+        Market._markets[0] = types.SimpleNamespace(
+            symbol="smbl0", transactions=types.SimpleNamespace(bars=bars), bars=bars.bars
+        )
+        self._client = WebApplication(application={}).flask.test_client()
+
+    def tearDown(self):
+        Market._markets.clear()
+        Market._markets.update(self._markets)
+
+    def test_bars(self):
+        response = self._client.get("/bars?symbol=SMBL0&interval=1&start=1&limit=3").get_json(force=True)
+        self.assertEqual(("SMBL0", 1.0, 1, 4), tuple(response[key] for key in ["symbol", "interval", "start", "next"]))
+        self.assertEqual([1000.0, 2000.0, 3000.0], response["bars"]["start"])
+        self.assertEqual([103.0, 105.0, 107.0], response["bars"]["close"])
+        # The open bar comes last, the next request starts from it again
+        response = self._client.get("/bars?symbol=SMBL0&interval=1&start=4").get_json(force=True)
+        self.assertEqual(([4000.0], 4), (response["bars"]["start"], response["next"]))
+
+    def test_unknown(self):
+        self.assertIn("error", self._client.get("/bars?symbol=NONE").get_json(force=True))
+        self.assertIn("error", self._client.get("/bars?symbol=SMBL0&interval=5").get_json(force=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
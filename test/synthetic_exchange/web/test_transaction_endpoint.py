@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from synthetic_exchange.app.web.application import WebApplication
+from synthetic_exchange.tape import MappedTradeTape
+
+
+class TransactionEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._tape = MappedTradeTape(os.path.join(self._dir.name, "SMBL0.tape"), create=True, capacity=4)
+        for i in range(10):
+            self._tape.append(i, float(i), 100.0 + i, 1.0, 1, 2, 10 + i, 20 + i)
+        self._client = WebApplication(application={"tapeDir": self._dir.name}).flask.test_client()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_tail(self):
+        response = self._client.get("/transactions?symbol=smbl0&start=4&limit=3").get_json(force=True)
+        self.assertEqual(("SMBL0", 4, 7), (response["symbol"], response["start"], response["next"]))
+        self.assertEqual([104.0, 105.0, 106.0], response["trades"]["price"])
+        # Trades written since the last request
+        self._tape.append(10, 10.0, 110.0, 1.0, 1, 2, 20, 30)
+        response = self._client.get("/transactions?symbol=SMBL0&start=7").get_json(force=True)
+        self.assertEqual(([7, 8, 9, 10], 11), (response["trades"]["id"], response["next"]))
+
+    def test_unknown(self):
+        response = self._client.get("/transactions?symbol=NONE").get_json(force=True)
+        self.assertIn("error", response)
+
+
+if __name__ == "__main__":
+    unittest.main()